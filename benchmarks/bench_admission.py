@@ -0,0 +1,121 @@
+"""
+Load test of admission control (src/utils/admission.py) under overload.
+
+A feed-like endpoint holds one of 10 pool connections for a 5 ms query,
+behind the app's access logging. Requests arrive at a fixed rate
+above what the pool can serve, first without admission control (requests
+queue for the pool, so latency grows for as long as the overload lasts)
+and then with it (requests beyond the adaptive limit are shed with 503 at
+once, so admitted requests keep a bounded p99).
+
+A second run sends a light, mixed load to one route class: a cached read
+(no query) alternating with a search holding a connection for 80 ms. Each
+route is judged against its own no-load latency, so nothing is shed and the
+limit does not shrink.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_admission
+"""
+
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from benchmarks.common import bench_pool, print_table
+from src.utils.access_log import AccessLog, AccessLogMiddleware
+from src.utils.admission import AdaptiveLimit, AdmissionMiddleware
+
+RATE = 1500
+MIXED_RATE = 100
+DURATION = 5.0
+QUERY = "SELECT pg_sleep(0.005)"
+SEARCH_QUERY = "SELECT pg_sleep(0.08)"
+
+
+def build_app(pool, limits) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/posts/feed")
+    async def feed(request: Request):
+        async with pool.acquire() as conn:
+            await conn.execute(QUERY)
+        return {"ok": True}
+
+    @app.get("/posts/search")
+    async def search(request: Request):
+        async with pool.acquire() as conn:
+            await conn.execute(SEARCH_QUERY)
+        return {"ok": True}
+
+    @app.get("/posts/{post_id}")
+    async def cached_post(post_id: str):
+        return {"id": post_id}
+
+    # Records are built but, with the log not started, never written
+    app.add_middleware(AccessLogMiddleware, log=AccessLog())
+    if limits is not None:
+        app.add_middleware(AdmissionMiddleware, limits=limits)
+    return app
+
+
+def percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+
+async def load(app: FastAPI, rate: int = RATE, paths=("/posts/feed",)) -> dict:
+    """Send ``rate`` requests per second (open loop: arrivals do not wait for responses) for DURATION"""
+    ok, shed = [], []
+
+    async def one(client, path):
+        start = time.perf_counter()
+        response = await client.get(path)
+        (ok if response.status_code == 200 else shed).append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        requests = []
+        start = time.perf_counter()
+        sent = 0
+        while time.perf_counter() - start < DURATION:
+            due = int((time.perf_counter() - start) * rate)
+            requests += [asyncio.create_task(one(client, paths[i % len(paths)])) for i in range(sent, due)]
+            sent = due
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*requests)
+    return {
+        "ok": len(ok),
+        "shed": len(shed),
+        "throughput": len(ok) / DURATION,
+        "p50": percentile(ok, 0.5),
+        "p99": percentile(ok, 0.99),
+        "shed_p99": percentile(shed, 0.99),
+    }
+
+
+async def main():
+    rows = []
+    async with bench_pool(min_size=10, max_size=10) as pool:
+        for admission in (False, True):
+            limits = {"feeds": AdaptiveLimit("feeds")} if admission else None
+            result = await load(build_app(pool, limits))
+            rows.append((
+                "adaptive limit" if admission else "unlimited",
+                result["ok"], result["shed"], result["throughput"],
+                result["p50"], result["p99"], result["shed_p99"],
+            ))
+        reads = AdaptiveLimit("reads")
+        mixed = await load(build_app(pool, {"reads": reads}), MIXED_RATE, ("/posts/1", "/posts/search"))
+    print(f"{RATE} requests/s for {DURATION:g}s against a 10-connection pool")
+    print_table(["admission", "ok", "shed", "ok/s", "p50 ms", "p99 ms", "shed p99 ms"], rows)
+    print(f"\n{MIXED_RATE} requests/s alternating a cached read and an 80 ms search in one class")
+    print_table(
+        ["ok", "shed", "final limit", "baselines ms"],
+        [(mixed["ok"], mixed["shed"], reads.limit, ", ".join(f"{route} {ms}" for route, ms in reads.stats()["baseline_ms"].items()))],
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
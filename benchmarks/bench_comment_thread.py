@@ -0,0 +1,89 @@
+"""
+Benchmark PostHandler.get_comment_thread on deep and wide synthetic threads.
+
+The same bounded tree is also fetched the way clients did before, one
+get_comments call per comment whose replies are shown, for comparison.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_comment_thread
+"""
+
+import asyncio
+import uuid
+
+from benchmarks.common import bench_pool, measure, print_table
+from src.utils.post_handler import PostHandler
+
+# (name, top-level comments, replies per comment, levels of replies)
+SHAPES = [
+    ("wide", 2000, 20, 1),
+    ("bushy", 200, 5, 3),
+    ("deep", 10, 1, 60),
+]
+# (limit, depth, replies) requested from the thread endpoint
+REQUESTS = [(10, 3, 5), (20, 10, 10)]
+
+
+async def seed_thread(conn, roots: int, fanout: int, levels: int) -> uuid.UUID:
+    post_id, user_id = uuid.uuid4(), uuid.uuid4()
+    parents = await conn.fetch(
+        """
+        INSERT INTO post_comments (id, post_id, user_id, content, created_at)
+        SELECT gen_random_uuid(), $1, $2, 'root ' || i, now() + i * interval '1 ms'
+        FROM generate_series(1, $3) i
+        RETURNING id
+        """,
+        post_id, user_id, roots,
+    )
+    for _ in range(levels):
+        parents = await conn.fetch(
+            """
+            INSERT INTO post_comments (id, post_id, user_id, content, parent_comment_id, created_at)
+            SELECT gen_random_uuid(), $1, $2, 'reply ' || i, p, now() + i * interval '1 ms'
+            FROM unnest($3::uuid[]) p, generate_series(1, $4) i
+            RETURNING id
+            """,
+            post_id, user_id, [r["id"] for r in parents], fanout,
+        )
+    await conn.execute("ANALYZE post_comments")
+    return post_id
+
+
+async def level_by_level(handler: PostHandler, post_id, limit: int, depth: int, replies: int) -> int:
+    """Fetch the same tree with one get_comments call per expanded comment"""
+    level = await handler.get_comments(post_id, None, limit)
+    fetched = len(level)
+    for _ in range(depth - 1):
+        children = []
+        for comment in level:
+            children += await handler.get_comments(post_id, comment.id, replies)
+        fetched += len(children)
+        level = children
+    return fetched
+
+
+def count_nodes(nodes) -> int:
+    return sum(1 + count_nodes(node.replies) for node in nodes)
+
+
+async def main():
+    async with bench_pool(min_size=1, max_size=2) as pool:
+        handler = PostHandler(pool)
+        rows = []
+        for name, roots, fanout, levels in SHAPES:
+            async with pool.acquire() as conn:
+                post_id = await seed_thread(conn, roots, fanout, levels)
+            for limit, depth, replies in REQUESTS:
+                thread = await handler.get_comment_thread(post_id, limit=limit, depth=depth, replies=replies)
+                nodes = count_nodes(thread["comments"])
+                assert nodes == await level_by_level(handler, post_id, limit, depth, replies), "trees differ"
+
+                current = await measure(lambda: handler.get_comment_thread(post_id, limit=limit, depth=depth, replies=replies))
+                baseline = await measure(lambda: level_by_level(handler, post_id, limit, depth, replies), repeat=10)
+                rows.append((name, f"{limit}/{depth}/{replies}", nodes,
+                             current["median_ms"], current["p95_ms"], baseline["median_ms"]))
+
+        print_table(["thread", "limit/depth/replies", "nodes", "thread p50 ms", "thread p95 ms", "per-level p50 ms"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
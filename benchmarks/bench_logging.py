@@ -0,0 +1,99 @@
+"""
+Benchmark log overhead per request: the old synchronous pipeline versus src.utils.log.
+
+A "request" logs what a chat frame in src/routes/ws_chat.py does: a dozen
+debug lines and two info lines. The old pipeline formats f-strings eagerly,
+has DEBUG on for the whole process and writes each line to a
+RotatingFileHandler on the calling thread. The new one leaves the module at
+INFO, passes arguments lazily and hands records to the queue-fed writer
+thread. Only time spent on the calling (event loop) thread is measured.
+
+No database is needed:
+
+    python -m benchmarks.bench_logging
+"""
+
+import logging
+import logging.handlers
+import queue
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import print_table
+from src.utils.log import DeferredQueueHandler, RingBuffer, RingBufferHandler, formatter
+
+REQUESTS = 5000
+REPEAT = 7
+DATA = '{"message": "hello there", "sender": "alice"}'
+
+
+def old_request(logger, user_id, room):
+    logger.debug(f"📨 Received message from user {user_id}: {DATA[:50]}...")
+    logger.debug(f"📝 Parsed message data: {DATA}")
+    for step in range(10):
+        logger.debug(f"🔍 Step {step} for user {user_id} in room {room}")
+    logger.info(f"✅ Group message saved to database for {user_id} in visionboard {room}")
+    logger.info(f"📤 Message published to Redis channel group:{room}")
+
+
+def new_request(logger, user_id, room):
+    logger.debug("📨 Received message from user %s: %s...", user_id, DATA[:50])
+    logger.debug("📝 Parsed message data: %s", DATA)
+    for step in range(10):
+        logger.debug("🔍 Step %s for user %s in room %s", step, user_id, room)
+    logger.info("✅ Group message saved to database for %s in visionboard %s", user_id, room)
+    logger.info("📤 Message published to Redis channel group:%s", room)
+
+
+def run(request, logger) -> float:
+    """Median microseconds per request on the calling thread"""
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for i in range(REQUESTS):
+            request(logger, f"user-{i}", "room-1")
+        samples.append((time.perf_counter() - start) / REQUESTS * 1e6)
+    return statistics.median(samples)
+
+
+def isolated_logger(name: str, level: int) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        old_handler = logging.handlers.RotatingFileHandler(Path(tmp) / "old.log", maxBytes=5 * 1024 * 1024, backupCount=5)
+        old_handler.setFormatter(formatter)
+        old = isolated_logger("bench.logging.old", logging.DEBUG)
+        old.addHandler(old_handler)
+        rows.append(("sync file, DEBUG, f-strings", run(old_request, old)))
+        old.removeHandler(old_handler)
+        old_handler.close()
+
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        new_handler = logging.handlers.RotatingFileHandler(Path(tmp) / "new.log", maxBytes=5 * 1024 * 1024, backupCount=5)
+        new_handler.setFormatter(formatter)
+        listener = logging.handlers.QueueListener(records, new_handler, RingBufferHandler(RingBuffer()))
+        listener.start()
+        new = isolated_logger("bench.logging.new", logging.INFO)
+        new.addHandler(DeferredQueueHandler(records))
+        rows.append(("queue writer, INFO, lazy args", run(new_request, new)))
+
+        # Same pipeline with the module turned up to DEBUG (LOG_LEVELS=...=DEBUG)
+        new.setLevel(logging.DEBUG)
+        rows.append(("queue writer, DEBUG, lazy args", run(new_request, new)))
+        listener.stop()
+        new_handler.close()
+
+    print(f"{REQUESTS} requests x {REPEAT} runs, 14 log calls per request")
+    print_table(["pipeline", "µs/request"], rows)
+
+
+if __name__ == "__main__":
+    main()
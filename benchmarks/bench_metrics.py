@@ -0,0 +1,85 @@
+"""
+Benchmark the cost of metrics instrumentation (src/utils/metrics.py).
+
+Times a histogram observation, a counter increment, the wrapper that
+@instrumented puts around handler methods, and MetricsMiddleware around a
+trivial ASGI app, each against the uninstrumented baseline. No database
+is needed:
+
+    python -m benchmarks.bench_metrics
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import print_table
+from src.utils.metrics import MetricsMiddleware, counter, histogram, instrumented, observe_query
+
+N = 200_000
+
+
+def per_call_us(fn, n: int = N) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def per_await_us(fn, n: int = N) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        await fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+class Plain:
+    async def get_feed(self):
+        observe_query(0.001)
+
+
+@instrumented("bench")
+class Instrumented(Plain):
+    async def get_feed(self):
+        observe_query(0.001)
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def main():
+    latency = histogram("bench_latency_seconds", "Benchmark histogram", ("route",)).labels("/posts/feed")
+    hits = counter("bench_hits_total", "Benchmark counter").labels()
+    baseline = per_call_us(lambda: None)
+    rows = [
+        ("histogram observe", per_call_us(lambda: latency.observe(0.003)) - baseline),
+        ("counter inc", per_call_us(hits.inc) - baseline),
+    ]
+
+    plain, wrapped = Plain(), Instrumented()
+    rows.append((
+        "@instrumented handler call",
+        await per_await_us(wrapped.get_feed) - await per_await_us(plain.get_feed),
+    ))
+
+    scope = {"type": "http", "method": "GET", "path": "/posts/feed", "headers": []}
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    middleware = MetricsMiddleware(endpoint)
+    rows.append((
+        "MetricsMiddleware request",
+        await per_await_us(lambda: middleware(scope, receive, send), N // 4)
+        - await per_await_us(lambda: endpoint(scope, receive, send), N // 4),
+    ))
+    print(f"Added cost per call, mean over {N} calls")
+    print_table(["instrumentation", "µs"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Benchmark post writes: PostHandler.create_post latency as media and tags grow,
+and PostHandler.import_posts (COPY) throughput in posts per second.
+
+The previous per-row insert loop is timed alongside create_post for comparison.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_post_create
+"""
+
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import bench_pool, measure, print_table
+from src.models.post import PostCreate, PostImport
+from src.utils.post_handler import PostHandler
+
+# (media items, tags) per post
+SIZES = [(0, 0), (1, 3), (5, 10), (10, 25), (20, 50)]
+IMPORT_BATCHES = [100, 1000, 5000]
+
+
+def make_post(model, media: int, tags: int):
+    return model(
+        caption="Benchmark post",
+        media=[{"url": f"https://cdn.example.com/{i}.jpg", "type": "image", "order": i} for i in range(media)],
+        tags=[f"tag{i}" for i in range(tags)],
+    )
+
+
+async def create_post_per_row(pool, post: PostCreate, user_id: uuid.UUID):
+    """create_post as it was: one round trip per child row"""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            post_id = uuid.uuid4()
+            await conn.execute(
+                """
+                INSERT INTO posts (id, user_id, caption, is_collaborative, status, visibility, created_at, updated_at)
+                VALUES ($1, $2, $3, false, $4, $5, now(), now())
+                """,
+                post_id, user_id, post.caption, post.status.value, post.visibility.value,
+            )
+            for m in post.media:
+                await conn.execute(
+                    'INSERT INTO post_media (id, post_id, url, type, "order") VALUES ($1, $2, $3, $4, $5)',
+                    uuid.uuid4(), post_id, m.url, m.type.value, m.order,
+                )
+            for tag in post.tags:
+                await conn.execute(
+                    "INSERT INTO post_tags (post_id, tag) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+                    post_id, tag,
+                )
+
+
+async def main():
+    async with bench_pool(min_size=1, max_size=2) as pool:
+        handler = PostHandler(pool)
+        user_id = uuid.uuid4()
+
+        rows = []
+        for media, tags in SIZES:
+            post = make_post(PostCreate, media, tags)
+            current = await measure(lambda: handler.create_post(post, user_id))
+            baseline = await measure(lambda: create_post_per_row(pool, post, user_id))
+            rows.append((media, tags, current["median_ms"], current["p95_ms"], baseline["median_ms"]))
+        print_table(["media", "tags", "create p50 ms", "create p95 ms", "per-row p50 ms"], rows)
+        print()
+
+        rows = []
+        for batch in IMPORT_BATCHES:
+            posts = [make_post(PostImport, 2, 5) for _ in range(batch)]
+            start = time.perf_counter()
+            await handler.import_posts(posts, user_id)
+            elapsed = time.perf_counter() - start
+            rows.append((batch, elapsed * 1000, batch / elapsed))
+        print_table(["import batch", "elapsed ms", "posts/s"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
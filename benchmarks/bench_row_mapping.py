@@ -0,0 +1,103 @@
+"""
+Benchmark row-to-model construction: Model(**dict(row)) versus src.utils.mapping.
+
+Rows are real asyncpg Records fetched from a throwaway schema; only the
+mapping step is timed.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_row_mapping
+"""
+
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import bench_pool, print_table
+from src.models.notification import Notification
+from src.models.post import PostCollaborator, PostComment, PostMedia, PostWithDetails
+from src.models.visionboard import GroupMessage, Invitation
+from src.utils.mapping import from_row, from_rows
+
+ROWS = 20000
+REPEAT = 7
+
+
+async def seed(conn):
+    await conn.execute(
+        """
+        INSERT INTO notifications (receiver_id, sender_id, object_type, object_id, event_type, status, data, message)
+        SELECT gen_random_uuid(), gen_random_uuid(), 'visionboard', gen_random_uuid(), 'invited', 'unread',
+               jsonb_build_object('work_type', 'Online', 'payment_type', 'Paid', 'n', i), 'You have been invited'
+        FROM generate_series(1, $1) i
+        """,
+        ROWS,
+    )
+    await conn.execute(
+        """
+        INSERT INTO invitations (receiver_id, sender_id, object_type, object_id, status, data)
+        SELECT gen_random_uuid(), gen_random_uuid(), 'genre', gen_random_uuid(),
+               (ARRAY['pending', 'accepted', 'rejected'])[1 + i % 3], jsonb_build_object('currency', 'USD')
+        FROM generate_series(1, $1) i
+        """,
+        ROWS,
+    )
+    await conn.execute(
+        """
+        INSERT INTO group_messages (visionboard_id, sender_id, message)
+        SELECT gen_random_uuid(), gen_random_uuid(), 'message ' || i FROM generate_series(1, $1) i
+        """,
+        ROWS,
+    )
+    await conn.execute(
+        """
+        INSERT INTO posts (id, user_id, caption, status, visibility)
+        SELECT gen_random_uuid(), gen_random_uuid(), 'caption ' || i, 'public', 'public'
+        FROM generate_series(1, $1) i
+        """,
+        ROWS,
+    )
+
+
+def best_rate(fn) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return ROWS / best
+
+
+async def main():
+    async with bench_pool(min_size=1, max_size=1) as pool:
+        async with pool.acquire() as conn:
+            await seed(conn)
+            tables = {
+                Notification: await conn.fetch("SELECT * FROM notifications"),
+                Invitation: await conn.fetch("SELECT * FROM invitations"),
+                GroupMessage: await conn.fetch("SELECT * FROM group_messages"),
+            }
+            post_rows = await conn.fetch("SELECT * FROM posts")
+
+        results = []
+        for model, rows in tables.items():
+            before = best_rate(lambda: [model(**dict(row)) for row in rows])
+            after = best_rate(lambda: from_rows(model, rows))
+            results.append((model.__name__, before, after, after / before))
+
+        post_id = uuid.uuid4()
+        details = dict(
+            media=[PostMedia(post_id=post_id, url="https://example.com/a.jpg", type="image", order=i) for i in range(2)],
+            tags=["music", "live"],
+            collaborators=[PostCollaborator(post_id=post_id, user_id=uuid.uuid4(), role="author")],
+            like_count=12, comment_count=3, view_count=40, author_name="Author",
+            top_comments=[PostComment(post_id=post_id, user_id=uuid.uuid4(), content="nice") for _ in range(3)],
+        )
+        before = best_rate(lambda: [PostWithDetails(**dict(row), **details) for row in post_rows])
+        after = best_rate(lambda: [from_row(PostWithDetails, row, **details) for row in post_rows])
+        results.append(("PostWithDetails", before, after, after / before))
+
+        print_table(["model", "validated rows/s", "mapped rows/s", "speedup"],
+                    [(name, round(b), round(a), s) for name, b, a, s in results])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""
+Benchmark the hot queries under each statement mode (see src/utils/db.py).
+
+direct and session mode cache named prepared statements per connection, so
+repeated SQL skips parsing and planning; transaction mode uses unnamed
+statements, which are parsed and planned on every execution and take two
+round trips (Parse and Describe, then Bind and Execute) instead of one. The
+pool is opened with each mode's statement_cache_size against the same data.
+
+Round trips cost little against a local database, so each row also counts
+the statements run and estimates p50 with NETWORK_RTT_MS per round trip, as
+behind a pooler on another host. The last two rows hydrate one post's
+details (7 queries) one query at a time and as one fetch_batch statement,
+which pays the round trips of a single query.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_statement_modes
+"""
+
+import asyncio
+import uuid
+
+from benchmarks.common import bench_pool, measure, print_table
+from src.utils.db import STATEMENT_MODES, fetch_batch, init_connection, statement_cache_size
+from src.utils.post_handler import PostHandler
+
+POSTS = 2000
+NETWORK_RTT_MS = 1.0
+WARMUP = 3
+
+MEMBERSHIP_QUERY = """
+    SELECT 1 FROM visionboards WHERE id = $1 AND created_by = $2
+    UNION
+    SELECT 1 FROM genre_assignments ga
+    JOIN genres g ON ga.genre_id = g.id
+    WHERE g.visionboard_id = $1 AND ga.user_id = $2 AND ga.status = 'Accepted'
+"""
+HYDRATION_QUERY = "SELECT COUNT(*) FROM post_comments WHERE post_id = $1 AND deleted_at IS NULL"
+POST_DETAIL_QUERIES = (
+    "SELECT * FROM post_media WHERE post_id = $1 ORDER BY \"order\" ASC",
+    "SELECT tag FROM post_tags WHERE post_id = $1",
+    "SELECT post_id, user_id, role FROM post_collaborators WHERE post_id = $1",
+    "SELECT COUNT(*) FROM post_likes WHERE post_id = $1",
+    "SELECT COUNT(*) FROM post_comments WHERE post_id = $1 AND deleted_at IS NULL",
+    "SELECT view_count, unique_viewers FROM post_view_stats WHERE post_id = $1",
+    "SELECT * FROM post_comments WHERE post_id = $1 AND parent_comment_id IS NULL AND deleted_at IS NULL ORDER BY created_at ASC LIMIT 3",
+)
+
+
+async def seed(conn) -> dict:
+    user_id = await conn.fetchval(
+        "INSERT INTO users (name, email, password) VALUES ('Bench', 'bench@example.com', 'x') RETURNING id"
+    )
+    board_id = await conn.fetchval(
+        "INSERT INTO visionboards (name, start_date, end_date, created_by) VALUES ('Board', now(), now() + interval '1 day', $1) RETURNING id",
+        user_id,
+    )
+    post_ids = await conn.fetch(
+        """
+        INSERT INTO posts (id, user_id, caption, created_at)
+        SELECT gen_random_uuid(), $1, 'post ' || i, now() - i * interval '1 minute'
+        FROM generate_series(1, $2) i
+        RETURNING id
+        """,
+        user_id, POSTS,
+    )
+    await conn.execute(
+        "INSERT INTO post_likes (user_id, post_id) SELECT gen_random_uuid(), id FROM posts WHERE random() < 0.3"
+    )
+    await conn.execute("ANALYZE")
+    return {"user_id": user_id, "board_id": board_id, "post_id": post_ids[0]["id"]}
+
+
+async def run_mode(mode: str) -> list:
+    statements = 0
+
+    def count(query) -> None:
+        nonlocal statements
+        # Not the pool's reset on release, which is the same in every mode
+        if not query.query.startswith("SELECT pg_advisory_unlock_all()"):
+            statements += 1
+
+    async def init(conn) -> None:
+        conn.add_query_logger(count)
+        await init_connection(conn)
+
+    cache_size = statement_cache_size(mode, 1024)
+    async with bench_pool(min_size=1, max_size=1, statement_cache_size=cache_size, init=init) as pool:
+        async with pool.acquire() as conn:
+            ids = await seed(conn)
+        handler = PostHandler(pool)
+
+        async def membership():
+            async with pool.acquire() as conn:
+                await conn.fetchrow(MEMBERSHIP_QUERY, ids["board_id"], uuid.uuid4())
+
+        async def hydration():
+            async with pool.acquire() as conn:
+                await conn.fetchval(HYDRATION_QUERY, ids["post_id"])
+
+        async def post_details():
+            async with pool.acquire() as conn:
+                for query in POST_DETAIL_QUERIES:
+                    await conn.fetch(query, ids["post_id"])
+
+        async def post_details_batched():
+            async with pool.acquire() as conn:
+                await fetch_batch(conn, *((query, ids["post_id"]) for query in POST_DETAIL_QUERIES))
+
+        rows = []
+        for name, fn, repeat in (
+            ("membership check", membership, 300),
+            ("hydration count", hydration, 300),
+            ("feed page (20 posts)", lambda: handler.get_feed(limit=20), 30),
+            ("post details, 7 queries", post_details, 300),
+            ("post details, fetch_batch", post_details_batched, 300),
+        ):
+            before = statements
+            timing = await measure(fn, repeat=repeat, warmup=WARMUP)
+            per_call = round((statements - before) / (repeat + WARMUP))
+            round_trips = per_call * (1 if cache_size else 2)
+            rows.append((
+                mode, name, timing["median_ms"], timing["p95_ms"], per_call, round_trips,
+                timing["median_ms"] + round_trips * NETWORK_RTT_MS,
+            ))
+        return rows
+
+
+async def main():
+    rows = []
+    for mode in STATEMENT_MODES:
+        rows += await run_mode(mode)
+    print_table(["mode", "query", "p50 ms", "p95 ms", "statements", "round trips", f"p50 at {NETWORK_RTT_MS:g} ms RTT"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
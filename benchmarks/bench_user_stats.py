@@ -0,0 +1,107 @@
+"""
+Benchmark VisionBoardHandler.get_user_stats as a user's boards, assignments and tasks grow.
+
+The previous single-join query is timed alongside for comparison: its
+intermediate row count is boards x assignments x tasks, while the current
+query aggregates each table on its own and should stay roughly flat.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.bench_user_stats
+"""
+
+import asyncio
+import uuid
+
+from benchmarks.common import bench_pool, measure, print_table
+from src.utils.visionboard_handler import VisionBoardHandler
+
+JOINED_STATS_QUERY = """
+    SELECT
+        COUNT(DISTINCT vb.id) as total_visionboards,
+        COUNT(DISTINCT CASE WHEN vb.status = 'Active' THEN vb.id END) as active_visionboards,
+        COUNT(DISTINCT CASE WHEN vb.status = 'Completed' THEN vb.id END) as completed_visionboards,
+        COUNT(DISTINCT ga.id) as total_assignments,
+        COUNT(DISTINCT CASE WHEN ga.status = 'Pending' THEN ga.id END) as pending_assignments,
+        COUNT(DISTINCT t.id) as total_tasks,
+        COUNT(DISTINCT CASE WHEN t.status = 'Completed' THEN t.id END) as completed_tasks,
+        COUNT(DISTINCT CASE WHEN t.due_date < NOW() AND t.status != 'Completed' THEN t.id END) as overdue_tasks
+    FROM users u
+    LEFT JOIN visionboards vb ON u.id = vb.created_by
+    LEFT JOIN genre_assignments ga ON u.id = ga.user_id
+    LEFT JOIN tasks t ON ga.id = t.genre_assignment_id
+    WHERE u.id = $1
+"""
+
+# (boards created by the user, assignments held by the user, tasks per assignment)
+SIZES = [(5, 5, 2), (20, 20, 5), (50, 50, 10), (100, 100, 20)]
+
+
+async def seed_user(conn, boards: int, assignments: int, tasks_per_assignment: int) -> uuid.UUID:
+    user_id = await conn.fetchval(
+        "INSERT INTO users (name, email, password) VALUES ('Bench', $1, 'x') RETURNING id",
+        f"{uuid.uuid4().hex}@bench.local",
+    )
+    board_ids = await conn.fetch(
+        """
+        INSERT INTO visionboards (name, start_date, end_date, status, created_by)
+        SELECT 'Board ' || i, now(), now() + interval '30 days',
+               (ARRAY['Draft', 'Active', 'Completed'])[1 + i % 3], $1
+        FROM generate_series(1, $2) i
+        RETURNING id
+        """,
+        user_id, boards,
+    )
+    genre_ids = await conn.fetch(
+        """
+        INSERT INTO genres (visionboard_id, name)
+        SELECT b, 'Genre' FROM unnest($1::uuid[]) b
+        RETURNING id
+        """,
+        [r["id"] for r in board_ids],
+    )
+    assignment_ids = await conn.fetch(
+        """
+        INSERT INTO genre_assignments (genre_id, user_id, status, work_type, payment_type, assigned_by)
+        SELECT ($1::uuid[])[1 + i % cardinality($1::uuid[])], $2,
+               (ARRAY['Pending', 'Accepted'])[1 + i % 2], 'Online', 'Unpaid', $2
+        FROM generate_series(1, $3) i
+        RETURNING id
+        """,
+        [r["id"] for r in genre_ids], user_id, assignments,
+    )
+    await conn.execute(
+        """
+        INSERT INTO tasks (genre_assignment_id, title, status, due_date, created_by)
+        SELECT a, 'Task ' || i, (ARRAY['Not Started', 'Completed'])[1 + i % 2],
+               now() + (i - $2 / 2) * interval '1 day', $3
+        FROM unnest($1::uuid[]) a, generate_series(1, $2) i
+        """,
+        [r["id"] for r in assignment_ids], tasks_per_assignment, user_id,
+    )
+    await conn.execute("ANALYZE")
+    return user_id
+
+
+async def main():
+    async with bench_pool(min_size=1, max_size=2) as pool:
+        handler = VisionBoardHandler(pool)
+        rows = []
+        for boards, assignments, tasks in SIZES:
+            async with pool.acquire() as conn:
+                user_id = await seed_user(conn, boards, assignments, tasks)
+
+            async def joined():
+                async with pool.acquire() as conn:
+                    return await conn.fetchrow(JOINED_STATS_QUERY, user_id)
+
+            current = await measure(lambda: handler.get_user_stats(user_id))
+            baseline = await measure(joined, repeat=5, warmup=1)
+            stats = await handler.get_user_stats(user_id)
+            assert dict(await joined()) == stats.model_dump(), "queries disagree"
+            rows.append((boards, assignments, assignments * tasks,
+                         current["median_ms"], current["p95_ms"], baseline["median_ms"]))
+
+        print_table(["boards", "assignments", "tasks", "stats p50 ms", "stats p95 ms", "joined p50 ms"], rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway schema in the database named by
+BENCH_DATABASE_URL (never point it at production). The schema is created
+from benchmarks/schema.sql plus everything in migrations/, and dropped again
+when the benchmark finishes.
+"""
+
+import os
+import statistics
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import asyncpg
+
+from src.utils.db import init_connection
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def database_url() -> str:
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        raise SystemExit("❌ BENCH_DATABASE_URL is not set (use a disposable database)")
+    return url
+
+
+@asynccontextmanager
+async def bench_pool(**pool_kwargs):
+    """Yield a pool whose search_path points at a fresh schema with the app tables"""
+    url = database_url()
+    schema = f"bench_{uuid.uuid4().hex[:12]}"
+    admin = await asyncpg.connect(url)
+    try:
+        await admin.execute(f"CREATE SCHEMA {schema}")
+        await admin.execute(f"SET search_path TO {schema}")
+        await admin.execute((ROOT / "benchmarks" / "schema.sql").read_text())
+        for migration in sorted((ROOT / "migrations").glob("*.sql")):
+            await admin.execute(migration.read_text())
+
+        server_settings = {"search_path": schema, **pool_kwargs.pop("server_settings", {})}
+        pool_kwargs.setdefault("init", init_connection)
+        pool = await asyncpg.create_pool(url, server_settings=server_settings, **pool_kwargs)
+        try:
+            yield pool
+        finally:
+            await pool.close()
+    finally:
+        await admin.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await admin.close()
+
+
+async def measure(fn, repeat: int = 30, warmup: int = 3) -> dict:
+    """Time an async callable; returns median and p95 in milliseconds"""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(_fmt(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(_fmt(v).rjust(w) for v, w in zip(row, widths)))
+
+
+def _fmt(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
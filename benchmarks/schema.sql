@@ -0,0 +1,82 @@
+-- Minimal copy of the production tables used by the benchmarks (Postgres 13+ for gen_random_uuid).
+-- Columns mirror what the handlers read and write; constraints are kept to keys and NOT NULLs.
+CREATE TABLE users (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    name text NOT NULL, username text, description text, email text NOT NULL, password text NOT NULL,
+    profile_image_url text, age int, genres jsonb, payment_mode text, work_mode text, location jsonb,
+    rating double precision, city text, country text
+);
+CREATE TABLE followers (user_id uuid, following_id uuid, PRIMARY KEY (user_id, following_id));
+CREATE TABLE visionboards (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), name text NOT NULL, description text,
+    start_date timestamptz NOT NULL, end_date timestamptz NOT NULL, status text NOT NULL DEFAULT 'Draft',
+    created_at timestamptz NOT NULL DEFAULT now(), updated_at timestamptz NOT NULL DEFAULT now(),
+    created_by uuid NOT NULL REFERENCES users(id)
+);
+CREATE TABLE genres (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), visionboard_id uuid NOT NULL REFERENCES visionboards(id) ON DELETE CASCADE,
+    name text NOT NULL, description text, min_required_people int DEFAULT 1, max_allowed_people int,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE genre_assignments (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), genre_id uuid NOT NULL REFERENCES genres(id) ON DELETE CASCADE,
+    user_id uuid NOT NULL REFERENCES users(id), status text NOT NULL DEFAULT 'Pending', work_type text NOT NULL,
+    payment_type text NOT NULL, payment_amount numeric, currency text,
+    invited_at timestamptz NOT NULL DEFAULT now(), responded_at timestamptz, assigned_by uuid NOT NULL
+);
+CREATE TABLE equipment (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), name text NOT NULL, description text, category text NOT NULL,
+    brand text, model text, specifications jsonb
+);
+CREATE TABLE required_equipment (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), genre_assignment_id uuid NOT NULL REFERENCES genre_assignments(id) ON DELETE CASCADE,
+    equipment_id uuid NOT NULL REFERENCES equipment(id), quantity int DEFAULT 1, is_provided_by_assignee boolean DEFAULT false,
+    notes text, status text DEFAULT 'Required'
+);
+CREATE TABLE tasks (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), genre_assignment_id uuid NOT NULL REFERENCES genre_assignments(id) ON DELETE CASCADE,
+    title text NOT NULL, description text, priority text DEFAULT 'Medium', status text DEFAULT 'Not Started',
+    due_date timestamptz, estimated_hours numeric, actual_hours numeric,
+    created_at timestamptz NOT NULL DEFAULT now(), updated_at timestamptz NOT NULL DEFAULT now(), created_by uuid NOT NULL
+);
+CREATE TABLE notifications (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), receiver_id uuid NOT NULL, sender_id uuid NOT NULL,
+    object_type text NOT NULL, object_id uuid NOT NULL, event_type text NOT NULL, status text NOT NULL,
+    data jsonb, message text, created_at timestamptz NOT NULL DEFAULT now(), updated_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE invitations (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), receiver_id uuid NOT NULL, sender_id uuid NOT NULL,
+    object_type text NOT NULL, object_id uuid NOT NULL, status text NOT NULL, data jsonb,
+    created_at timestamptz NOT NULL DEFAULT now(), responded_at timestamptz
+);
+CREATE TABLE group_messages (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), visionboard_id uuid NOT NULL, sender_id uuid NOT NULL,
+    message text NOT NULL, created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE direct_messages (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), sender_id uuid NOT NULL, receiver_id uuid NOT NULL,
+    message text NOT NULL, created_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE drafts (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), visionboard_id uuid NOT NULL, user_id uuid NOT NULL, media_url text NOT NULL,
+    media_type text, description text, created_at timestamptz NOT NULL DEFAULT now(), updated_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE posts (
+    id uuid PRIMARY KEY, user_id uuid NOT NULL, caption text, is_collaborative boolean DEFAULT false,
+    status text DEFAULT 'public', visibility text DEFAULT 'public', shared_from_post_id uuid, visionboard_id uuid,
+    created_at timestamptz NOT NULL DEFAULT now(), updated_at timestamptz NOT NULL DEFAULT now(), deleted_at timestamptz
+);
+CREATE TABLE post_media (id uuid PRIMARY KEY, post_id uuid NOT NULL, url text NOT NULL, type text NOT NULL, "order" int DEFAULT 0);
+CREATE TABLE post_tags (post_id uuid NOT NULL, tag text NOT NULL, PRIMARY KEY (post_id, tag));
+CREATE TABLE post_collaborators (post_id uuid NOT NULL, user_id uuid NOT NULL, role text NOT NULL, PRIMARY KEY (post_id, user_id));
+CREATE TABLE post_likes (user_id uuid NOT NULL, post_id uuid NOT NULL, created_at timestamptz DEFAULT now(), PRIMARY KEY (user_id, post_id));
+CREATE TABLE post_views (id uuid PRIMARY KEY DEFAULT gen_random_uuid(), post_id uuid NOT NULL, user_id uuid, viewed_at timestamptz DEFAULT now());
+CREATE TABLE post_comments (
+    id uuid PRIMARY KEY, post_id uuid NOT NULL, user_id uuid NOT NULL, content text NOT NULL,
+    parent_comment_id uuid, created_at timestamptz NOT NULL DEFAULT now(), deleted_at timestamptz
+);
+CREATE TABLE draft_comments (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), draft_id uuid NOT NULL REFERENCES drafts(id) ON DELETE CASCADE,
+    user_id uuid NOT NULL, comment text NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now(), updated_at timestamptz NOT NULL DEFAULT now()
+);
@@ -0,0 +1,7 @@
+-- Indexes backing the per-board summary and per-user stats aggregates in VisionBoardHandler.
+-- Safe to re-run; use CREATE INDEX CONCURRENTLY instead when applying to a busy database.
+CREATE INDEX IF NOT EXISTS idx_visionboards_created_by ON visionboards (created_by);
+CREATE INDEX IF NOT EXISTS idx_genres_visionboard_id ON genres (visionboard_id);
+CREATE INDEX IF NOT EXISTS idx_genre_assignments_genre_id ON genre_assignments (genre_id);
+CREATE INDEX IF NOT EXISTS idx_genre_assignments_user_id ON genre_assignments (user_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_genre_assignment_id ON tasks (genre_assignment_id);
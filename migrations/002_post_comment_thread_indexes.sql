@@ -0,0 +1,7 @@
+-- Keyset indexes for PostHandler.get_comment_thread and get_comments: one for a post's
+-- top-level comments and one for the replies under each comment, both in (created_at, id) order.
+-- Safe to re-run; use CREATE INDEX CONCURRENTLY instead when applying to a busy database.
+CREATE INDEX IF NOT EXISTS idx_post_comments_roots ON post_comments (post_id, created_at, id)
+    WHERE parent_comment_id IS NULL AND deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_post_comments_replies ON post_comments (parent_comment_id, created_at, id)
+    WHERE deleted_at IS NULL;
@@ -0,0 +1,19 @@
+-- Per-post view counters written by the view buffer (src/utils/view_buffer.py) instead of
+-- one post_views row per impression. `viewers` is a HyperLogLog sketch of viewer ids and
+-- unique_viewers its estimate plus unique_viewers_base, the distinct viewers carried over
+-- from post_views below (those cannot be deduplicated against later viewers).
+CREATE TABLE IF NOT EXISTS post_view_stats (
+    post_id uuid PRIMARY KEY REFERENCES posts (id) ON DELETE CASCADE,
+    view_count bigint NOT NULL DEFAULT 0,
+    unique_viewers bigint NOT NULL DEFAULT 0,
+    unique_viewers_base bigint NOT NULL DEFAULT 0,
+    viewers bytea,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO post_view_stats (post_id, view_count, unique_viewers, unique_viewers_base)
+SELECT v.post_id, count(*), count(DISTINCT v.user_id), count(DISTINCT v.user_id)
+FROM post_views v
+JOIN posts p ON p.id = v.post_id
+GROUP BY v.post_id
+ON CONFLICT (post_id) DO NOTHING;
@@ -0,0 +1,9 @@
+-- Composite indexes matching the (sort key, id) order of every cursor-paginated listing
+-- (src/utils/cursor.py). Comment listings are covered by 002.
+-- Safe to re-run; use CREATE INDEX CONCURRENTLY instead when applying to a busy database.
+CREATE INDEX IF NOT EXISTS idx_posts_feed ON posts (created_at DESC, id DESC)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_posts_user_feed ON posts (user_id, created_at DESC, id DESC)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_group_messages_board ON group_messages (visionboard_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_direct_messages_pair ON direct_messages (sender_id, receiver_id, created_at DESC, id DESC);
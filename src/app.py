@@ -1,24 +1,34 @@
 from __future__ import annotations
 
 import os
-import asyncpg
 import logging
-import json
 import time
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from src.utils import UserHandler  # type: ignore  # noqa
+from src.utils.access_log import AccessLogMiddleware, access_log
+from src.utils.admission import AdmissionMiddleware, limits_from_env
+from src.utils.cache import cache
+from src.utils.db import PoolSettings, create_pool
+from src.utils.deadline import DeadlineMiddleware
+from src.utils.loaders import LoaderScopeMiddleware
+from src.utils.log import configure_logging
+from src.utils.loop_monitor import loop_monitor
+from src.utils.metrics import MetricsMiddleware, register_pools
+from src.utils.replicas import ReplicaStickinessMiddleware, router as replica_router
+from src.utils.tracing import TracingMiddleware, tracer
+from src.utils.view_buffer import view_buffer
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Configure logging (queue-fed writer thread; levels from LOG_LEVEL and LOG_LEVELS)
+configure_logging()
+
 # Validate required environment variables
 required_env_vars = [
     "HOST", "PORT", "JWT_SECRET", "SUPABASE_URL", 
@@ -40,37 +50,12 @@ PORT = os.environ["PORT"]
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "development")
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Log request details
-        logger.info(f"📥 {request.method} {request.url.path}")
-        
-        # For POST requests to /posts, log the raw body
-        if request.method == "POST" and request.url.path == "/posts":
-            try:
-                body = await request.body()
-                logger.info(f"📄 Raw request body: {body.decode('utf-8')}")
-                
-                # Try to parse as JSON for better logging
-                try:
-                    json_body = json.loads(body.decode('utf-8'))
-                    logger.info(f"📄 Parsed JSON body: {json.dumps(json_body, indent=2)}")
-                except json.JSONDecodeError:
-                    logger.warning("📄 Request body is not valid JSON")
-                    
-            except Exception as e:
-                logger.error(f"❌ Error reading request body: {e}")
-        
-        response = await call_next(request)
-        
-        # Log response status
-        logger.info(f"📤 Response status: {response.status_code}")
-        
-        return response
-
-
 async def startup():
+    access_log.start()
+    tracer.start()
+    loop_monitor.start()
     await user_handler.init()
+    cache.start()
 
     # Initialize PostgreSQL connection pool with error handling
     try:
@@ -80,17 +65,27 @@ async def startup():
             app.state.pool = None
         else:
             logger.info("Connecting to database...")
-            app.state.pool = await asyncpg.create_pool(
+            settings = PoolSettings.from_env()
+            app.state.pool = await create_pool(
                 database_url,
-                min_size=1,
-                max_size=10,
-                command_timeout=60,
-                statement_cache_size=0,  # Disable prepared statements for pgbouncer compatibility
+                settings,
                 server_settings={
                     'application_name': 'creatist_backend'
                 }
             )
-            logger.info("Database connection pool created successfully")
+            logger.info(
+                f"Database connection pool created successfully ({settings.min_size}-{settings.max_size} connections, "
+                f"{app.state.pool.statement_mode} statements)"
+            )
+            view_buffer.start(app.state.pool)
+
+            replica_urls = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+            if replica_urls:
+                await replica_router.connect(
+                    app.state.pool, replica_urls, settings,
+                    server_settings={'application_name': 'creatist_backend'},
+                )
+                logger.info(f"Routing read-only queries to {len(replica_router.replicas)} of {len(replica_urls)} read replicas")
         
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
@@ -102,7 +97,13 @@ async def startup():
 
 async def shutdown():
     if hasattr(app.state, 'pool') and app.state.pool is not None:
+        await view_buffer.stop(app.state.pool)
         await app.state.pool.close()
+        await replica_router.close()
+    await cache.stop()
+    await loop_monitor.stop()
+    tracer.stop()
+    access_log.stop()
 
 
 app = FastAPI(title="Creatist API Documentation", on_startup=[startup], on_shutdown=[shutdown])
@@ -138,8 +139,34 @@ if cors_origins:
         allow_headers=["*"],
     )
 
-# Add request logging middleware
-app.add_middleware(RequestLoggingMiddleware)
+# Per-request batching and caching of lookups by id (src/utils/loaders.py)
+app.add_middleware(LoaderScopeMiddleware)
+
+# Keeps users who just wrote reading from the primary (src/utils/replicas.py)
+app.add_middleware(ReplicaStickinessMiddleware)
+
+# Per-route time budgets for DB, Redis, Supabase and SMTP calls (src/utils/deadline.py)
+app.add_middleware(DeadlineMiddleware)
+
+# A span per sampled request or WebSocket connection, with child spans for DB, Redis,
+# Supabase and SMTP calls (src/utils/tracing.py)
+app.add_middleware(TracingMiddleware)
+
+# Sheds requests beyond each route class's adaptive concurrency limit (src/utils/admission.py)
+admission_limits = limits_from_env()
+app.add_middleware(AdmissionMiddleware, limits=admission_limits)
+
+# Request latency histograms per route template, shed requests included (src/utils/metrics.py)
+app.add_middleware(MetricsMiddleware)
+
+# One structured access record per request, shed ones included (src/utils/access_log.py)
+app.add_middleware(AccessLogMiddleware)
+
+# Pool gauges on /metrics: the primary and each read replica in use
+register_pools(lambda: {
+    "primary": getattr(app.state, "pool", None),
+    **{f"replica{i}": replica for i, replica in enumerate(replica_router.replicas)},
+})
 
 # Health check endpoint
 @app.get("/health")
@@ -60,6 +60,12 @@ class PostComment(BaseModel):
     created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
     deleted_at: Optional[datetime.datetime] = None
 
+class PostCommentNode(PostComment):
+    depth: int = 1
+    reply_count: int = 0  # all direct replies, including those not returned
+    replies: List["PostCommentNode"] = []
+    next_cursor: Optional[str] = None  # fetch more replies with parent_id=id&cursor=next_cursor
+
 class PostCommentCreate(BaseModel):
     content: str
     parent_comment_id: Optional[uuid.UUID] = None
@@ -78,6 +84,9 @@ class PostView(BaseModel):
     user_id: Optional[uuid.UUID] = None
     viewed_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
 
+class PostViewBatch(BaseModel):
+    post_ids: List[uuid.UUID]
+
 class Hashtag(BaseModel):
     id: uuid.UUID = Field(default_factory=uuid.uuid4)
     tag: str
@@ -108,6 +117,11 @@ class PostCreate(BaseModel):
     shared_from_post_id: Optional[uuid.UUID] = None
     visionboard_id: Optional[uuid.UUID] = None  # Add visionboard_id field
 
+class PostImport(PostCreate):
+    # Bulk import may carry ids and timestamps over from another system
+    id: Optional[uuid.UUID] = None
+    created_at: Optional[datetime.datetime] = None
+
 class PostUpdate(BaseModel):
     caption: Optional[str] = None
     status: Optional[PostStatus] = None
@@ -121,5 +135,6 @@ class PostWithDetails(Post):
     like_count: int = 0
     comment_count: int = 0
     view_count: int = 0
+    unique_viewers: int = 0  # estimated
     author_name: Optional[str] = None
     top_comments: List[PostComment] = [] 
\ No newline at end of file
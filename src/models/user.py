@@ -10,14 +10,14 @@ class Location(BaseModel):
     latitude: float
     longitude: float
 
-class User(BaseModel):
+class UserProfile(BaseModel):
+    """A user as served and cached by id: every stored field but the password"""
     id: uuid.UUID = Field(default_factory=lambda: uuid.uuid4())
 
     name: str
     username: Optional[str] = None
     description: Optional[str] = None
     email: str
-    password: str
 
     profile_image_url: Optional[str] = None
     age: Optional[int] = None
@@ -32,6 +32,26 @@ class User(BaseModel):
     is_following: Optional[bool] = None  # This is computed, not stored in DB
 
 
+class User(UserProfile):
+    password: str
+
+
+class UserCard(BaseModel):
+    """Public profile of a user as shown in member lists (no email or password)"""
+    id: uuid.UUID
+    name: str
+    username: Optional[str] = None
+    description: Optional[str] = None
+    profile_image_url: Optional[str] = None
+    genres: Optional[List[UserGenre]] = None
+    payment_mode: Optional[PaymentMode] = None
+    work_mode: Optional[WorkMode] = None
+    location: Optional[Location] = None
+    rating: Optional[float] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+
+
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     username: Optional[str] = None
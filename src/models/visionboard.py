@@ -297,6 +297,12 @@ class VisionBoardSummary(BaseModel):
     completed_tasks: int
     created_by: uuid.UUID
 
+class VisionBoardCollaborator(BaseModel):
+    """A user with at least one accepted assignment on a vision board"""
+    user_id: uuid.UUID
+    work_type: WorkType  # from the user's earliest accepted assignment
+    roles: List[str] = []  # names of the genres the user is accepted in
+
 # Statistics Models
 class VisionBoardStats(BaseModel):
     total_visionboards: int
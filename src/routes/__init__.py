@@ -4,3 +4,4 @@ from .user import *  # noqa
 from .otp import *  # noqa
 from .visionboard import *  # noqa
 from .ws_chat import *  # noqa
+from .admin import *  # noqa
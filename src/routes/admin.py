@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from src.app import app
+from src.utils.loop_monitor import loop_monitor
+from src.utils.query_log import query_log
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+security = HTTPBearer(auto_error=False)
+
+
+def require_admin(credentials: HTTPAuthorizationCredentials = Depends(security)) -> None:
+    """Bearer ADMIN_TOKEN; without ADMIN_TOKEN set the admin routes do not exist"""
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Admin token is missing or invalid")
+
+
+@router.get("/queries", dependencies=[Depends(require_admin)])
+async def top_queries(limit: int = Query(20, ge=1, le=200), order: str = "total"):
+    """Statements ranked by total (or mean, max, calls) time, with the handler operations that ran them"""
+    try:
+        statements = query_log.top(limit, order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"slow_threshold_ms": query_log.threshold * 1000, "statements": statements}
+
+
+@router.get("/queries/slow", dependencies=[Depends(require_admin)])
+async def slow_queries(limit: int = Query(50, ge=1, le=200)):
+    """The latest slow queries, newest first, and the latest captured plans"""
+    return {
+        "slow": list(reversed(query_log.slow))[:limit],
+        "plans": list(reversed(query_log.plans)),
+    }
+
+
+@router.post("/queries/reset", dependencies=[Depends(require_admin)])
+async def reset_queries():
+    query_log.reset()
+    return {"message": "Query statistics reset"}
+
+
+@router.get("/loop", dependencies=[Depends(require_admin)])
+async def loop_health():
+    """Event loop lag and the code that blocked the loop, by site, with captured stacks"""
+    return loop_monitor.stats()
+
+
+@router.post("/loop/reset", dependencies=[Depends(require_admin)])
+async def reset_loop():
+    loop_monitor.reset()
+    return {"message": "Event loop statistics reset"}
+
+
+app.include_router(router)
@@ -8,7 +8,7 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, EmailStr
 
 from src.app import app, user_handler
-from src.models import User
+from src.models import User, UserProfile
 from src.utils import Token, TokenHandler
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -66,7 +66,7 @@ async def signup_route(request: Request, user: User) -> JSONResponse:
 
 
 @router.get("/fetch")
-async def fetch_user_route(token: Token = Depends(get_user_token)) -> User:
+async def fetch_user_route(token: Token = Depends(get_user_token)) -> UserProfile:
     user = await user_handler.fetch_user(user_id=token.sub)
     return user
 
@@ -1,15 +1,18 @@
 import logging
 import json
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 import uuid
+import asyncpg
 from src.models.post import (
-    Post, PostCreate, PostUpdate, PostWithDetails, PostComment, PostCommentCreate, PostCommentUpdate
+    Post, PostCreate, PostImport, PostUpdate, PostWithDetails, PostComment, PostCommentCreate, PostCommentUpdate, PostViewBatch
 )
+from src.utils.cursor import NEXT_CURSOR_HEADER, next_cursor_header
 from src.utils.post_handler import PostHandler
 from src.utils import Token
+from src.routes.admin import require_admin
 from src.routes.visionboard import get_user_token
 
 logger = logging.getLogger(__name__)
@@ -19,52 +22,63 @@ def get_post_handler(request: Request) -> PostHandler:
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
+MAX_IMPORT_BATCH = 5000
+MAX_VIEW_BATCH = 500
+MAX_THREAD_LIMIT = 50
+MAX_THREAD_DEPTH = 10
+
 @router.post("", response_model=dict)
 async def create_post(post: PostCreate, request: Request, token: Token = Depends(get_user_token)):
-    """Create a new post with comprehensive debug logging"""
-    logger.info("🚀 POST /posts - Create post request received")
-    logger.info(f"   User ID (from token): {token.sub}")
-    logger.info(f"   Post data received: {post.model_dump()}")
-    
+    """Create a new post"""
     try:
-        # Log individual fields for debugging
-        logger.debug(f"   Caption: {post.caption}")
-        logger.debug(f"   Media count: {len(post.media) if post.media else 0}")
-        logger.debug(f"   Tags count: {len(post.tags) if post.tags else 0}")
-        logger.debug(f"   Collaborators count: {len(post.collaborators) if post.collaborators else 0}")
-        logger.debug(f"   Visionboard ID: {post.visionboard_id}")
-        logger.debug(f"   Visibility: {post.visibility}")
-        
-        # Log collaborators details if present
-        if post.collaborators:
-            logger.debug("   Collaborators details:")
-            for i, collab in enumerate(post.collaborators):
-                logger.debug(f"     {i+1}. User ID: {collab.user_id}, Role: {collab.role}")
-        
-        # Log media details if present
-        if post.media:
-            logger.debug("   Media details:")
-            for i, media in enumerate(post.media):
-                logger.debug(f"     {i+1}. URL: {media.url}, Type: {media.type}")
-        
         handler = get_post_handler(request)
-        logger.info("✅ Post data validation passed, creating post...")
-        
         post_id = await handler.create_post(post, token.sub)
-        logger.info(f"✅ Post created successfully with ID: {post_id}")
-        
         return {"post_id": str(post_id)}
         
     except Exception as e:
-        logger.error(f"❌ Error creating post: {str(e)}")
-        logger.error(f"   Error type: {type(e).__name__}")
-        logger.error(f"   Post data that caused error: {post.model_dump()}")
+        logger.error(f"❌ Error creating post for {token.sub}: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create post: {str(e)}")
 
+@router.post("/batch", response_model=dict, dependencies=[Depends(require_admin)])
+async def import_posts(posts: List[PostImport], request: Request, user_id: uuid.UUID):
+    """Bulk-create posts authored by ``user_id``, for seeding and migrations (admin token only)"""
+    if not posts:
+        raise HTTPException(status_code=400, detail="No posts to import")
+    if len(posts) > MAX_IMPORT_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_IMPORT_BATCH} posts per batch")
+    try:
+        handler = get_post_handler(request)
+        post_ids = await handler.import_posts(posts, user_id)
+        return {"post_ids": [str(post_id) for post_id in post_ids], "count": len(post_ids)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except asyncpg.ForeignKeyViolationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except asyncpg.UniqueViolationError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error importing {len(posts)} posts for {user_id}: {type(e).__name__}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to import posts: {str(e)}")
+
+@router.post("/views", status_code=202)
+async def record_views(batch: PostViewBatch, request: Request, token: Token = Depends(get_user_token)):
+    """Record a batch of impressions by the caller; counters are updated asynchronously"""
+    if len(batch.post_ids) > MAX_VIEW_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VIEW_BATCH} views per batch")
+    handler = get_post_handler(request)
+    return {"recorded": handler.record_views(batch.post_ids, token.sub)}
+
 @router.get("/feed", response_model=dict)
 async def get_feed(request: Request, limit: int = 10, cursor: Optional[str] = None, token: Token = Depends(get_user_token)):
     handler = get_post_handler(request)
-    return await handler.get_feed(limit=limit, cursor=cursor)
+    try:
+        return await handler.get_feed(limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/following-feed", response_model=dict)
 async def get_following_feed(request: Request, limit: int = 10, cursor: Optional[str] = None, token: Token = Depends(get_user_token)):
@@ -72,7 +86,10 @@ async def get_following_feed(request: Request, limit: int = 10, cursor: Optional
     Get posts only from users that the logged-in user is following
     """
     handler = get_post_handler(request)
-    return await handler.get_following_feed(user_id=token.sub, limit=limit, cursor=cursor)
+    try:
+        return await handler.get_following_feed(user_id=token.sub, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/following-feed/{user_id}", response_model=dict)
 async def get_following_feed_by_user_id(request: Request, user_id: str, limit: int = 10, cursor: Optional[str] = None, token: Token = Depends(get_user_token)):
@@ -86,7 +103,10 @@ async def get_following_feed_by_user_id(request: Request, user_id: str, limit: i
         raise HTTPException(status_code=400, detail="Invalid user_id format. Must be a valid UUID.")
     
     handler = get_post_handler(request)
-    return await handler.get_following_feed_by_user_id(target_user_id=user_uuid, limit=limit, cursor=cursor)
+    try:
+        return await handler.get_following_feed_by_user_id(target_user_id=user_uuid, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/trending", response_model=dict)
 async def get_trending_posts(request: Request, limit: int = 10, cursor: Optional[str] = None):
@@ -98,6 +118,18 @@ async def get_trending_posts(request: Request, limit: int = 10, cursor: Optional
         logging.error(f"Error in /posts/trending: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/search", response_model=List[PostWithDetails])
+async def search_posts(request: Request, response: Response, q: str, tag: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None):
+    """Posts newest first; the next page's cursor is in the X-Next-Cursor header"""
+    handler = get_post_handler(request)
+    try:
+        page = await handler.search_posts(q, tag, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if page["nextCursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["nextCursor"]
+    return page["posts"]
+
 @router.get("/{post_id}", response_model=PostWithDetails)
 async def get_post(post_id: str, request: Request):
     import uuid
@@ -130,20 +162,61 @@ async def add_comment(post_id: str, comment: PostCommentCreate, request: Request
     return await handler.add_comment(uuid.UUID(post_id), token.sub, comment)
 
 @router.get("/{post_id}/comments", response_model=List[PostComment])
-async def get_comments(post_id: str, request: Request, parent_id: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None):
+async def get_comments(post_id: str, request: Request, response: Response, parent_id: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None):
+    """Comments oldest first; the next page's cursor is in the X-Next-Cursor header"""
     handler = get_post_handler(request)
-    parent_uuid = uuid.UUID(parent_id) if parent_id else None
-    return await handler.get_comments(uuid.UUID(post_id), parent_uuid, limit, cursor)
-
-@router.get("/user/{user_id}", response_model=List[PostWithDetails])
-async def get_user_posts(user_id: str, request: Request, limit: int = 10, cursor: Optional[str] = None):
+    try:
+        post_uuid = uuid.UUID(post_id)
+        parent_uuid = uuid.UUID(parent_id) if parent_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid post or comment ID")
+    try:
+        comments = await handler.get_comments(post_uuid, parent_uuid, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    response.headers.update(next_cursor_header(comments, limit, "asc"))
+    return comments
+
+@router.get("/{post_id}/comments/thread", response_model=dict)
+async def get_comment_thread(
+    post_id: str,
+    request: Request,
+    parent_id: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=MAX_THREAD_LIMIT),
+    depth: int = Query(3, ge=1, le=MAX_THREAD_DEPTH),
+    replies: int = Query(5, ge=1, le=MAX_THREAD_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """
+    Get a comment thread as a tree: up to `limit` comments under `parent_id`
+    (top-level when omitted), each with up to `replies` replies, `depth` levels deep.
+    """
     handler = get_post_handler(request)
-    return await handler.get_user_posts(uuid.UUID(user_id), limit, cursor)
+    try:
+        post_uuid = uuid.UUID(post_id)
+        parent_uuid = uuid.UUID(parent_id) if parent_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid post or comment ID")
+    try:
+        return await handler.get_comment_thread(post_uuid, parent_uuid, limit=limit, depth=depth, replies=replies, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@router.get("/search", response_model=List[PostWithDetails])
-async def search_posts(request: Request, q: str, tag: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None):
+@router.get("/user/{user_id}", response_model=List[PostWithDetails])
+async def get_user_posts(user_id: str, request: Request, response: Response, limit: int = 10, cursor: Optional[str] = None):
+    """A user's posts newest first; the next page's cursor is in the X-Next-Cursor header"""
     handler = get_post_handler(request)
-    return await handler.search_posts(q, tag, limit, cursor)
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id format. Must be a valid UUID.")
+    try:
+        page = await handler.get_user_posts(user_uuid, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if page["nextCursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["nextCursor"]
+    return page["posts"]
 
 @router.delete("/{post_id}")
 async def soft_delete_post(post_id: str, request: Request, token: Token = Depends(get_user_token)):
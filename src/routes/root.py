@@ -6,14 +6,17 @@ import logging
 from fastapi import Request, HTTPException, status, Depends
 
 logger = logging.getLogger(__name__)
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from typing import Optional
 from src.models.feedback import FeedbackCreate
 from src.models.user import User  # If user association is needed
 
-from src.app import app, user_handler
+from src.app import admission_limits, app, user_handler
 from src.routes.visionboard import get_user_token
 from src.utils import Token
+from src.utils import deadline, metrics, tracing
+from src.utils.replicas import router as replica_router
+from src.utils.single_flight import coalescing_stats
 
 
 @app.route("/")
@@ -52,6 +55,47 @@ async def health_check():
             }
         )
 
+@app.get("/health/db")
+async def database_health(request: Request):
+    """Connection pool sizes, acquire waits, timeouts and queries per connection"""
+    pool = getattr(request.app.state, "pool", None)
+    if pool is None or not hasattr(pool, "stats"):
+        return JSONResponse({"status": "unavailable"}, status_code=503)
+    return JSONResponse({"status": "ok", **pool.stats()})
+
+@app.get("/health/admission")
+async def admission_health():
+    """Current concurrency limit, load and shed requests of each route class"""
+    return JSONResponse({name: limit.stats() for name, limit in admission_limits.items()})
+
+@app.get("/health/deadlines")
+async def deadline_health():
+    """Time spent per dependency across requests, and how often each exhausted a request's budget"""
+    return JSONResponse(deadline.stats.snapshot())
+
+@app.get("/health/replicas")
+async def replica_health():
+    """Read replica health, where routed reads went, and each replica pool's stats"""
+    return JSONResponse({
+        **replica_router.stats(),
+        "pools": [replica.stats() for replica in replica_router.replicas],
+    })
+
+@app.get("/health/traces")
+async def trace_health(limit: int = 20):
+    """The latest sampled traces with their spans, when traces are kept in memory"""
+    return JSONResponse({"sample_rate": tracing.tracer.sample_rate, "traces": tracing.recent_traces(min(limit, 100))})
+
+@app.get("/health/coalescing")
+async def coalescing_health():
+    """Per-method counters of coalesced reads (calls, executions, shared, cached)"""
+    return JSONResponse(coalescing_stats())
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 # Dependency to get current user or None (pseudo, replace with your actual logic)
 async def get_current_user_optional(request: Request) -> Optional[User]:
     from fastapi.security.utils import get_authorization_scheme_param
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import logging
+import uuid
 
 from fastapi import Request, APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
@@ -10,6 +12,10 @@ from geopy.geocoders import Nominatim
 
 from src.app import app, user_handler
 from src.utils import Token, TokenHandler
+from src.utils.cursor import page_cursor
+from src.utils.deadline import dependency
+from src.utils.loaders import user_loader
+from src.utils.tracing import CLIENT, span
 from src.models.user import (
     User, UserUpdate, Showcase, Comment, VisionBoard,
     VisionBoardTask, Location
@@ -26,6 +32,9 @@ JWT_SECRET = os.environ["JWT_SECRET"]
 token_handler = TokenHandler(os.environ["JWT_SECRET"])
 security = HTTPBearer()
 
+# geopy's Nominatim client is blocking; reverse lookups run in a worker thread
+geolocator = Nominatim(user_agent="creatist-app", timeout=5)
+
 
 def get_user_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = token_handler.decode_token(credentials.credentials)
@@ -95,8 +104,9 @@ async def update_user_location(
     token: Token = Depends(get_user_token)
 ):
     # Reverse geocode to get city and country
-    geolocator = Nominatim(user_agent="creatist-app")
-    loc = geolocator.reverse((location.latitude, location.longitude), language='en')
+    with span("nominatim reverse", CLIENT, **{"server.address": "nominatim.openstreetmap.org"}):
+        async with dependency("nominatim"):
+            loc = await asyncio.to_thread(geolocator.reverse, (location.latitude, location.longitude), language='en')
     city, country = '', ''
     if loc and loc.raw and 'address' in loc.raw:
         address = loc.raw['address']
@@ -226,8 +236,8 @@ async def send_direct_message(user_id: str, msg: DirectMessageCreate, token: Tok
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
 @router.get("/message/{user_id}")
-async def get_direct_messages(user_id: str, limit: int = 50, before: str = None, token: Token = Depends(get_user_token)):
-    """Get direct messages with debug logging"""
+async def get_direct_messages(user_id: str, limit: int = 50, before: str = None, cursor: str = None, token: Token = Depends(get_user_token)):
+    """Get direct messages newest first; pass the returned nextCursor as `cursor` for older ones"""
     logger.info(f"📥 Direct message fetch attempt")
     logger.debug(f"   Requesting user (from token): {token.sub}")
     logger.debug(f"   Target user (from URL): {user_id}")
@@ -246,32 +256,27 @@ async def get_direct_messages(user_id: str, limit: int = 50, before: str = None,
     logger.info(f"✅ Permission granted. Fetching messages between {token.sub} and {user_id}")
     
     try:
-        messages = await user_handler.get_direct_messages(user_id=str(token.sub), other_user_id=user_id, limit=limit, before=before)
+        messages = await user_handler.get_direct_messages(user_id=str(token.sub), other_user_id=user_id, limit=limit, before=before, cursor=cursor)
         logger.info(f"✅ Retrieved {len(messages)} messages")
         
-        # Fetch avatar_url for each sender
-        from src.app import user_handler as user_handler_local
-        result = []
-        
+        # Fetch avatar_url for every sender in one query
         logger.debug(f"👤 Fetching avatars for {len(messages)} messages...")
-        for i, m in enumerate(messages):
-            sender_id = m.get("sender_id")
-            logger.debug(f"   Message {i+1}: sender_id = {sender_id}")
-            
-            try:
-                user = await user_handler_local.fetch_user(user_id=str(sender_id))
-                avatar_url = user.profile_image_url if user and hasattr(user, 'profile_image_url') and user.profile_image_url else "https://ui-avatars.com/api/?name=User"
-                logger.debug(f"   ✅ Avatar for {sender_id}: {avatar_url}")
-            except Exception as e:
-                logger.error(f"   ❌ Failed to fetch avatar for {sender_id}: {str(e)}")
-                avatar_url = "https://ui-avatars.com/api/?name=User"
-            
+        try:
+            senders = await user_loader(getattr(app.state, "pool", None)).load_many(uuid.UUID(str(m.get("sender_id"))) for m in messages)
+        except Exception as e:
+            logger.error(f"   ❌ Failed to fetch avatars: {str(e)}")
+            senders = [None] * len(messages)
+        result = []
+        for m, sender in zip(messages, senders):
+            avatar_url = sender.profile_image_url if sender and sender.profile_image_url else "https://ui-avatars.com/api/?name=User"
             m["avatar_url"] = avatar_url
             result.append(m)
         
         logger.info(f"✅ Returning {len(result)} messages with avatars")
-        return {"messages": result}
+        return {"messages": result, "nextCursor": page_cursor(messages, limit)}
         
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"❌ Failed to fetch direct messages: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch messages: {str(e)}")
@@ -382,7 +387,6 @@ async def get_users_by_genre(genre_name: str, token: Token = Depends(get_user_to
 @router.get("/users")
 async def get_users_by_genre(request: Request, genre: str, token: Token = Depends(get_user_token)):
     users = await user_handler.get_users_by_genre(genre)
-    print([user.model_dump(mode="json") for user in users])
     return [user.model_dump(mode="json") for user in users]
 
 @router.get("/users/{user_id}")
@@ -1,16 +1,19 @@
 from __future__ import annotations
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import decimal
 import datetime
-from typing import List
+from typing import List, Optional
 import logging
 
 from src.app import app
 from src.utils import Token, TokenHandler
-from src.utils.visionboard_handler import VisionBoardHandler
+from src.utils.cursor import page_cursor
+from src.utils.loaders import user_loader
+from src.utils.visionboard_handler import FULL_VISIONBOARD_FIELDS, VisionBoardHandler
+from src.utils.visionboard_cache import visionboard_cache
 from src.models.visionboard import (
     VisionBoardCreate, VisionBoardUpdate, VisionBoardWithGenres,
     GenreCreate, GenreUpdate, GenreWithAssignments,
@@ -69,6 +72,26 @@ def to_serializable(obj):
     return obj
 
 # Vision Board CRUD Operations
+async def get_board_etag(request: Request, visionboard_id: uuid.UUID):
+    """Return the board's current ETag and whether the client's copy (If-None-Match) is still fresh.
+
+    Raises 404 for a board that does not exist, so a 304 is never an answer
+    about a missing or deleted board, and only existing boards get versions.
+    """
+    if not await get_visionboard_handler().visionboard_exists(visionboard_id):
+        raise HTTPException(status_code=404, detail="Vision board not found")
+    etag = await visionboard_cache.etag(visionboard_id)
+    if etag is None:
+        return None, False
+    client_tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    return etag, etag in client_tags or "*" in client_tags
+
+def etag_headers(etag):
+    return {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else None
+
+def not_modified(etag):
+    return Response(status_code=304, headers=etag_headers(etag))
+
 @router.post("/create")
 async def create_visionboard(
     request: Request, 
@@ -96,14 +119,20 @@ async def get_visionboard(
 ):
     """Get a vision board by ID"""
     try:
-        visionboard = await get_visionboard_handler().get_visionboard(uuid.UUID(visionboard_id))
+        board_id = uuid.UUID(visionboard_id)
+        etag, fresh = await get_board_etag(request, board_id)
+        if fresh:
+            return not_modified(etag)
+        visionboard = await get_visionboard_handler().get_visionboard(board_id)
         if not visionboard:
             raise HTTPException(status_code=404, detail="Vision board not found")
         
         return JSONResponse({
             "message": "success",
             "visionboard": visionboard.model_dump(mode="json")
-        })
+        }, headers=etag_headers(etag))
+    except HTTPException:
+        raise
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid vision board ID")
     except Exception as e:
@@ -117,14 +146,57 @@ async def get_visionboard_with_genres(
 ):
     """Get a vision board with all its genres"""
     try:
-        visionboard = await get_visionboard_handler().get_visionboard_with_genres(uuid.UUID(visionboard_id))
+        board_id = uuid.UUID(visionboard_id)
+        etag, fresh = await get_board_etag(request, board_id)
+        if fresh:
+            return not_modified(etag)
+        visionboard = await get_visionboard_handler().get_visionboard_with_genres(board_id)
         if not visionboard:
             raise HTTPException(status_code=404, detail="Vision board not found")
         
         return JSONResponse({
             "message": "success",
             "visionboard": visionboard.model_dump(mode="json")
-        })
+        }, headers=etag_headers(etag))
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid vision board ID")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{visionboard_id}/full")
+async def get_visionboard_full(
+    request: Request,
+    visionboard_id: str,
+    fields: Optional[str] = None,
+    token: Token = Depends(get_user_token)
+):
+    """Get a vision board with genres, assignments, user cards, tasks and equipment in one request.
+
+    ``fields`` is a comma-separated subset of: genres, assignments, users, tasks, equipment.
+    """
+    selected = None
+    if fields:
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - set(FULL_VISIONBOARD_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    try:
+        board_id = uuid.UUID(visionboard_id)
+        etag, fresh = await get_board_etag(request, board_id)
+        if fresh:
+            return not_modified(etag)
+        visionboard = await get_visionboard_handler().get_visionboard_full(board_id, selected)
+        if not visionboard:
+            raise HTTPException(status_code=404, detail="Vision board not found")
+
+        return JSONResponse({
+            "message": "success",
+            "visionboard": visionboard
+        }, headers=etag_headers(etag))
+    except HTTPException:
+        raise
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid vision board ID")
     except Exception as e:
@@ -521,14 +593,20 @@ async def get_visionboard_summary(
 ):
     """Get comprehensive summary of a vision board"""
     try:
-        summary = await get_visionboard_handler().get_visionboard_summary(uuid.UUID(visionboard_id))
+        board_id = uuid.UUID(visionboard_id)
+        etag, fresh = await get_board_etag(request, board_id)
+        if fresh:
+            return not_modified(etag)
+        summary = await get_visionboard_handler().get_visionboard_summary(board_id)
         if not summary:
             raise HTTPException(status_code=404, detail="Vision board not found")
         
         return JSONResponse({
             "message": "success",
             "summary": summary.model_dump(mode="json")
-        })
+        }, headers=etag_headers(etag))
+    except HTTPException:
+        raise
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid vision board ID")
     except Exception as e:
@@ -625,20 +703,24 @@ async def get_visionboard_users(
 ):
     """Get all users involved in a vision board (creator + assigned users)"""
     try:
-        print(f"DEBUG: Raw visionboard_id received: '{visionboard_id}'")
         # Convert to lowercase to handle case sensitivity issues
         visionboard_id_lower = visionboard_id.lower()
-        print(f"DEBUG: Lowercase visionboard_id: '{visionboard_id_lower}'")
-        users = await get_visionboard_handler().get_visionboard_users(uuid.UUID(visionboard_id_lower))
+        board_id = uuid.UUID(visionboard_id_lower)
+        etag, fresh = await get_board_etag(request, board_id)
+        if fresh:
+            return not_modified(etag)
+        users = await get_visionboard_handler().get_visionboard_users(board_id)
         return JSONResponse({
             "message": "success",
             "users": [user.model_dump(mode="json") for user in users]
-        })
+        }, headers=etag_headers(etag))
+    except HTTPException:
+        raise
     except ValueError as ve:
-        print(f"DEBUG: ValueError for visionboard_id: '{visionboard_id}' - {ve}")
+        logger.debug("Invalid visionboard_id %r: %s", visionboard_id, ve)
         raise HTTPException(status_code=400, detail="Invalid vision board ID")
     except Exception as e:
-        print(f"DEBUG: Exception in get_visionboard_users: {e}")
+        logger.error("Error in get_visionboard_users: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/notifications/batch-create")
@@ -788,9 +870,10 @@ async def get_group_messages(
     visionboard_id: str,
     limit: int = 50,
     before: datetime.datetime = None,
+    cursor: Optional[str] = None,
     token: Token = Depends(get_user_token)
 ):
-    """Get group messages with debug logging"""
+    """Get group messages newest first; pass the returned nextCursor as `cursor` for older ones"""
     logger.info(f"📥 Group message fetch attempt")
     logger.debug(f"   Visionboard ID: {visionboard_id}")
     logger.debug(f"   Requesting user (from token): {token.sub}")
@@ -804,39 +887,34 @@ async def get_group_messages(
             visionboard_id=uuid.UUID(visionboard_id),
             user_id=token.sub,
             limit=limit,
-            before=before
+            before=before,
+            cursor=cursor
         )
         logger.info(f"✅ Retrieved {len(messages)} group messages")
         
-        # Fetch avatar_url for each sender
-        from src.utils.user_handler import UserHandler
-        user_handler = UserHandler()
-        result = []
-        
+        # Fetch avatar_url for every sender in one query
         logger.debug(f"👤 Fetching avatars for {len(messages)} group messages...")
-        for i, m in enumerate(messages):
-            sender_id = str(m.sender_id)
-            logger.debug(f"   Message {i+1}: sender_id = {sender_id}")
-            
-            try:
-                user = await user_handler.fetch_user(user_id=sender_id)
-                avatar_url = user.profile_image_url if user and hasattr(user, 'profile_image_url') else None
-                logger.debug(f"   ✅ Avatar for {sender_id}: {avatar_url}")
-            except Exception as e:
-                logger.error(f"   ❌ Failed to fetch avatar for {sender_id}: {str(e)}")
-                avatar_url = None
-            
+        try:
+            senders = await user_loader(getattr(app.state, 'pool', None)).load_many(uuid.UUID(str(m.sender_id)) for m in messages)
+        except Exception as e:
+            logger.error(f"   ❌ Failed to fetch avatars: {str(e)}")
+            senders = [None] * len(messages)
+        result = []
+        for m, sender in zip(messages, senders):
+            avatar_url = sender.profile_image_url if sender else None
             msg_dict = m.model_dump(mode="json")
             msg_dict["avatar_url"] = avatar_url
             result.append(msg_dict)
         
         logger.info(f"✅ Returning {len(result)} group messages with avatars")
-        return {"messages": result}
+        return {"messages": result, "nextCursor": page_cursor(messages, limit)}
     except PermissionError as e:
         logger.warning(f"🚫 Permission denied for group messages: {str(e)}")
         logger.warning(f"   User: {token.sub}")
         logger.warning(f"   Visionboard: {visionboard_id}")
         raise HTTPException(status_code=403, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid vision board ID or cursor")
     except Exception as e:
         logger.error(f"❌ Failed to fetch group messages: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch messages: {str(e)}")
@@ -921,15 +999,21 @@ async def delete_draft_comment(comment_id: str, token: Token = Depends(get_user_
     return {"message": "Comment deleted"}
 
 @router.get("/{visionboard_id}/collaborators")
-async def get_visionboard_collaborators(visionboard_id: str, token: Token = Depends(get_user_token)):
+async def get_visionboard_collaborators(request: Request, visionboard_id: str, token: Token = Depends(get_user_token)):
     """Get all collaborators (user_id, role) for a vision board."""
     handler = get_visionboard_handler()
     try:
         uuid_vb = uuid.UUID(visionboard_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid vision board ID")
+    etag, fresh = await get_board_etag(request, uuid_vb)
+    if fresh:
+        return not_modified(etag)
     collaborators = await handler.get_visionboard_collaborators(uuid_vb)
-    return [{"user_id": str(user_id), "role": role} for user_id, role in collaborators]
+    return JSONResponse(
+        [{"user_id": str(user_id), "role": role} for user_id, role in collaborators],
+        headers=etag_headers(etag)
+    )
 
 # Include the router in the main app
 app.include_router(router) 
\ No newline at end of file
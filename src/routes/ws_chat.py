@@ -8,12 +8,13 @@ import logging
 from typing import Dict, List
 import asyncio
 import redis.asyncio as redis
+from src.utils import metrics, tracing
+from src.utils.loaders import loader_scope, user_loader
 from src.utils.visionboard_handler import VisionBoardHandler
 from src.models.visionboard import GroupMessage, DirectMessage
 from src.models.user import User
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Levels are configured in src/utils/log.py (LOG_LEVELS=src.routes.ws_chat=DEBUG for chat tracing)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -22,6 +23,18 @@ router = APIRouter()
 active_group_connections: Dict[str, List[WebSocket]] = {}
 active_direct_connections: Dict[str, List[WebSocket]] = {}
 
+# Hub metrics, by channel / room type ("group" or "direct")
+redis_published = metrics.counter("redis_messages_published_total", "Chat messages published to Redis", ("channel",))
+redis_received = metrics.counter("redis_messages_received_total", "Chat messages received from Redis subscriptions", ("channel",))
+redis_subscriptions = metrics.counter("redis_subscriptions_total", "Redis channel subscriptions opened", ("channel",))
+metrics.collected(
+    "websocket_connections", "gauge", "Open chat WebSocket connections", ("room_type",),
+    lambda: [
+        (("group",), sum(map(len, active_group_connections.values()))),
+        (("direct",), sum(map(len, active_direct_connections.values()))),
+    ],
+)
+
 # Redis connection
 REDIS_URL = "redis://localhost:6379"
 redis_client = None
@@ -41,11 +54,11 @@ def get_token_handler():
 def get_user_id_from_token(token: str):
     """Extract user ID from JWT token with debug logging"""
     try:
-        logger.debug(f"🔐 Attempting to decode token: {token[:20]}...")
+        logger.debug("🔐 Attempting to decode token: %s...", token[:20])
         handler = get_token_handler()
         decoded = handler.decode_token(token)
         user_id = str(decoded.sub)
-        logger.debug(f"✅ Token decoded successfully. User ID: {user_id}")
+        logger.debug("✅ Token decoded successfully. User ID: %s", user_id)
         return user_id
     except Exception as e:
         logger.error(f"❌ Token decoding failed: {str(e)}")
@@ -58,7 +71,7 @@ async def get_redis():
     try:
         if redis_client is None:
             logger.debug("🔗 Creating new Redis connection...")
-            redis_client = redis.from_url(REDIS_URL)
+            redis_client = tracing.instrument_redis(redis.from_url(REDIS_URL))
             logger.debug("✅ Redis connection created successfully")
         return redis_client
     except Exception as e:
@@ -68,31 +81,36 @@ async def get_redis():
 # Helper: subscribe to a Redis channel and forward messages to local clients
 async def redis_subscriber(channel_name: str, connections: List[WebSocket]):
     """Redis subscriber with debug logging"""
-    logger.debug(f"📡 Starting Redis subscriber for channel: {channel_name}")
-    logger.debug(f"   Active connections: {len(connections)}")
+    logger.debug("📡 Starting Redis subscriber for channel: %s", channel_name)
+    logger.debug("   Active connections: %s", len(connections))
     
+    channel_type = channel_name.partition(":")[0]
+    received = redis_received.labels(channel_type)
     try:
         redis_client = await get_redis()
         pubsub = redis_client.pubsub()
         await pubsub.subscribe(channel_name)
-        logger.debug(f"✅ Subscribed to Redis channel: {channel_name}")
+        redis_subscriptions.labels(channel_type).inc()
+        logger.debug("✅ Subscribed to Redis channel: %s", channel_name)
         
         async for message in pubsub.listen():
             if message["type"] == "message":
+                received.inc()
                 msg = message["data"].decode("utf-8")
-                logger.debug(f"📨 Received message from Redis: {msg[:50]}...")
-                logger.debug(f"   Broadcasting to {len(connections)} connections")
+                logger.debug("📨 Received message from Redis: %s...", msg[:50])
+                logger.debug("   Broadcasting to %s connections", len(connections))
                 
                 # Broadcast to all connected clients
-                for i, ws in enumerate(connections):
-                    try:
-                        await ws.send_text(msg)
-                        logger.debug(f"   ✅ Message sent to connection {i+1}")
-                    except Exception as e:
-                        logger.error(f"   ❌ Failed to send to connection {i+1}: {str(e)}")
-                        # Remove dead connection
-                        connections.remove(ws)
-                        logger.debug(f"   🗑️ Removed dead connection. Remaining: {len(connections)}")
+                with tracing.span("ws broadcast", **{"messaging.system": "websocket", "messaging.destination.name": channel_type}):
+                    for i, ws in enumerate(connections):
+                        try:
+                            await ws.send_text(msg)
+                            logger.debug("   ✅ Message sent to connection %s", i+1)
+                        except Exception as e:
+                            logger.error(f"   ❌ Failed to send to connection {i+1}: {str(e)}")
+                            # Remove dead connection
+                            connections.remove(ws)
+                            logger.debug("   🗑️ Removed dead connection. Remaining: %s", len(connections))
                         
     except Exception as e:
         logger.error(f"❌ Redis subscriber error: {str(e)}")
@@ -100,18 +118,18 @@ async def redis_subscriber(channel_name: str, connections: List[WebSocket]):
         try:
             await pubsub.unsubscribe(channel_name)
             await pubsub.close()
-            logger.debug(f"🔌 Redis subscriber closed for channel: {channel_name}")
+            logger.debug("🔌 Redis subscriber closed for channel: %s", channel_name)
         except Exception as e:
             logger.error(f"❌ Error closing Redis subscriber: {str(e)}")
 
 async def get_avatar_url(user_id: str):
     """Get user avatar URL with debug logging"""
     try:
-        logger.debug(f"👤 Fetching avatar for user: {user_id}")
-        # Use the global user_handler
-        user = await user_handler.fetch_user(user_id=user_id)
-        avatar_url = user.profile_image_url if user and hasattr(user, 'profile_image_url') else None
-        logger.debug(f"✅ Avatar URL: {avatar_url}")
+        logger.debug("👤 Fetching avatar for user: %s", user_id)
+        # Looked up once per message: each received message gets its own loader scope
+        user = await user_loader(getattr(app.state, "pool", None)).load(uuid.UUID(str(user_id)))
+        avatar_url = user.profile_image_url if user else None
+        logger.debug("✅ Avatar URL: %s", avatar_url)
         return avatar_url
     except Exception as e:
         logger.error(f"❌ Failed to fetch avatar for user {user_id}: {str(e)}")
@@ -130,7 +148,7 @@ def get_visionboard_handler():
 async def group_chat_ws(websocket: WebSocket, visionboard_id: str, token: str = Query(...)):
     """Group chat WebSocket handler with comprehensive debug logging"""
     logger.info(f"🚀 Group chat connection attempt for visionboard: {visionboard_id}")
-    logger.debug(f"   Token: {token[:20]}...")
+    logger.debug("   Token: %s...", token[:20])
     
     try:
         # Extract user ID from token
@@ -138,7 +156,7 @@ async def group_chat_ws(websocket: WebSocket, visionboard_id: str, token: str =
         logger.info(f"👤 User {user_id} connecting to group chat")
         
         room = visionboard_id
-        logger.debug(f"🏠 Room ID: {room}")
+        logger.debug("🏠 Room ID: %s", room)
         
         # Accept the WebSocket connection
         await websocket.accept()
@@ -147,14 +165,14 @@ async def group_chat_ws(websocket: WebSocket, visionboard_id: str, token: str =
         # Add to active connections
         if room not in active_group_connections:
             active_group_connections[room] = []
-            logger.debug(f"🏠 Created new room: {room}")
+            logger.debug("🏠 Created new room: %s", room)
         
         active_group_connections[room].append(websocket)
         logger.info(f"👥 User {user_id} added to room {room}. Total users: {len(active_group_connections[room])}")
         
         # Start Redis subscriber task
         subscriber_task = asyncio.create_task(redis_subscriber(f"group:{room}", active_group_connections[room]))
-        logger.debug(f"📡 Redis subscriber task started for room {room}")
+        logger.debug("📡 Redis subscriber task started for room %s", room)
         
         # Get Redis client
         redis_client = await get_redis()
@@ -164,40 +182,43 @@ async def group_chat_ws(websocket: WebSocket, visionboard_id: str, token: str =
         while True:
             try:
                 data = await websocket.receive_text()
-                logger.debug(f"📨 Received message from user {user_id}: {data[:50]}...")
-                
-                # Parse incoming data as JSON
-                try:
-                    data_json = json.loads(data)
-                except Exception as e:
-                    logger.error(f"❌ Invalid message format: {str(e)}")
-                    continue
+                # A scope per message, so profile changes show up in the next message's avatar
+                with tracing.span("ws group message", **{"messaging.system": "websocket", "messaging.destination.name": "group"}), loader_scope():
+                    logger.debug("📨 Received message from user %s: %s...", user_id, data[:50])
                 
-                # Only save if it's a user message (not typing indicator, etc)
-                message_text = data_json.get("message")
-                if message_text:
+                    # Parse incoming data as JSON
                     try:
-                        visionboard_handler = get_visionboard_handler()
-                        await visionboard_handler.send_group_message(visionboard_id=visionboard_id, sender_id=user_id, message=message_text)
-                        logger.info(f"✅ Group message saved to database for {user_id} in visionboard {visionboard_id}")
+                        data_json = json.loads(data)
                     except Exception as e:
-                        logger.error(f"❌ Failed to save group message: {str(e)}")
+                        logger.error(f"❌ Invalid message format: {str(e)}")
+                        continue
                 
-                # Get user avatar
-                avatar_url = await get_avatar_url(user_id)
+                    # Only save if it's a user message (not typing indicator, etc)
+                    message_text = data_json.get("message")
+                    if message_text:
+                        try:
+                            visionboard_handler = get_visionboard_handler()
+                            await visionboard_handler.send_group_message(visionboard_id=visionboard_id, sender_id=user_id, message=message_text)
+                            logger.info(f"✅ Group message saved to database for {user_id} in visionboard {visionboard_id}")
+                        except Exception as e:
+                            logger.error(f"❌ Failed to save group message: {str(e)}")
                 
-                # Prepare message for broadcasting
-                msg = json.dumps({
-                    "user_id": user_id, 
-                    "message": data, 
-                    "avatar_url": avatar_url,
-                    "timestamp": str(uuid.uuid4())  # Add timestamp for debugging
-                })
+                    # Get user avatar
+                    avatar_url = await get_avatar_url(user_id)
                 
-                # Publish to Redis
-                await redis_client.publish(f"group:{room}", msg)
-                logger.info(f"📤 Message published to Redis channel group:{room}")
-                logger.debug(f"   Message content: {msg[:100]}...")
+                    # Prepare message for broadcasting
+                    msg = json.dumps({
+                        "user_id": user_id, 
+                        "message": data, 
+                        "avatar_url": avatar_url,
+                        "timestamp": str(uuid.uuid4())  # Add timestamp for debugging
+                    })
+                
+                    # Publish to Redis
+                    await redis_client.publish(f"group:{room}", msg)
+                    redis_published.labels("group").inc()
+                    logger.info(f"📤 Message published to Redis channel group:{room}")
+                    logger.debug("   Message content: %s...", msg[:100])
                 
             except WebSocketDisconnect:
                 logger.info(f"🔌 WebSocket disconnected for user {user_id} in room {room}")
@@ -239,8 +260,8 @@ async def group_chat_ws(websocket: WebSocket, visionboard_id: str, token: str =
 async def direct_chat_ws(websocket: WebSocket, other_user_id: str, token: str = Query(...)):
     """Direct chat WebSocket handler with comprehensive debug logging"""
     logger.info(f"🚀 Direct chat connection attempt")
-    logger.debug(f"   Other user ID: {other_user_id}")
-    logger.debug(f"   Token: {token[:20]}...")
+    logger.debug("   Other user ID: %s", other_user_id)
+    logger.debug("   Token: %s...", token[:20])
     
     try:
         # Extract user ID from token
@@ -249,13 +270,13 @@ async def direct_chat_ws(websocket: WebSocket, other_user_id: str, token: str =
         
         # Create room ID (sorted to ensure consistency)
         room = "-".join(sorted([user_id, other_user_id]))
-        logger.debug(f"🏠 Computed room ID: {room}")
+        logger.debug("🏠 Computed room ID: %s", room)
         
         # Permission check
-        logger.debug(f"🔒 Checking permissions...")
-        logger.debug(f"   Current user: {user_id}")
-        logger.debug(f"   Target user: {other_user_id}")
-        logger.debug(f"   Are they the same? {user_id == other_user_id}")
+        logger.debug("🔒 Checking permissions...")
+        logger.debug("   Current user: %s", user_id)
+        logger.debug("   Target user: %s", other_user_id)
+        logger.debug("   Are they the same? %s", user_id == other_user_id)
         
         # For direct chat, both users should be able to connect to the same room
         # The permission check is simple: the current user must be one of the two participants
@@ -272,14 +293,14 @@ async def direct_chat_ws(websocket: WebSocket, other_user_id: str, token: str =
         # Add to active connections
         if room not in active_direct_connections:
             active_direct_connections[room] = []
-            logger.debug(f"🏠 Created new direct chat room: {room}")
+            logger.debug("🏠 Created new direct chat room: %s", room)
         
         active_direct_connections[room].append(websocket)
         logger.info(f"💬 User {user_id} added to direct chat room {room}. Total users: {len(active_direct_connections[room])}")
         
         # Start Redis subscriber task
         subscriber_task = asyncio.create_task(redis_subscriber(f"direct:{room}", active_direct_connections[room]))
-        logger.debug(f"📡 Redis subscriber task started for direct chat room {room}")
+        logger.debug("📡 Redis subscriber task started for direct chat room %s", room)
         
         # Get Redis client
         redis_client = await get_redis()
@@ -289,39 +310,42 @@ async def direct_chat_ws(websocket: WebSocket, other_user_id: str, token: str =
         while True:
             try:
                 data = await websocket.receive_text()
-                logger.debug(f"📨 Received direct message from user {user_id}: {data[:50]}...")
-                
-                # Parse incoming data as JSON
-                try:
-                    data_json = json.loads(data)
-                except Exception as e:
-                    logger.error(f"❌ Invalid message format: {str(e)}")
-                    continue
+                # A scope per message, so profile changes show up in the next message's avatar
+                with tracing.span("ws direct message", **{"messaging.system": "websocket", "messaging.destination.name": "direct"}), loader_scope():
+                    logger.debug("📨 Received direct message from user %s: %s...", user_id, data[:50])
                 
-                # Only save if it's a user message (not typing indicator, etc)
-                message_text = data_json.get("message")
-                if message_text:
+                    # Parse incoming data as JSON
                     try:
-                        await user_handler.send_direct_message(sender_id=user_id, receiver_id=other_user_id, message=message_text)
-                        logger.info(f"✅ Direct message saved to database for {user_id} -> {other_user_id}")
+                        data_json = json.loads(data)
                     except Exception as e:
-                        logger.error(f"❌ Failed to save direct message: {str(e)}")
+                        logger.error(f"❌ Invalid message format: {str(e)}")
+                        continue
+                
+                    # Only save if it's a user message (not typing indicator, etc)
+                    message_text = data_json.get("message")
+                    if message_text:
+                        try:
+                            await user_handler.send_direct_message(sender_id=user_id, receiver_id=other_user_id, message=message_text)
+                            logger.info(f"✅ Direct message saved to database for {user_id} -> {other_user_id}")
+                        except Exception as e:
+                            logger.error(f"❌ Failed to save direct message: {str(e)}")
                 
-                # Get user avatar
-                avatar_url = await get_avatar_url(user_id)
+                    # Get user avatar
+                    avatar_url = await get_avatar_url(user_id)
                 
-                # Prepare message for broadcasting
-                msg = json.dumps({
-                    "user_id": user_id, 
-                    "message": data, 
-                    "avatar_url": avatar_url,
-                    "timestamp": str(uuid.uuid4())  # Add timestamp for debugging
-                })
+                    # Prepare message for broadcasting
+                    msg = json.dumps({
+                        "user_id": user_id, 
+                        "message": data, 
+                        "avatar_url": avatar_url,
+                        "timestamp": str(uuid.uuid4())  # Add timestamp for debugging
+                    })
                 
-                # Publish to Redis
-                await redis_client.publish(f"direct:{room}", msg)
-                logger.info(f"📤 Direct message published to Redis channel direct:{room}")
-                logger.debug(f"   Message content: {msg[:100]}...")
+                    # Publish to Redis
+                    await redis_client.publish(f"direct:{room}", msg)
+                    redis_published.labels("direct").inc()
+                    logger.info(f"📤 Direct message published to Redis channel direct:{room}")
+                    logger.debug("   Message content: %s...", msg[:100])
                 
             except WebSocketDisconnect:
                 logger.info(f"🔌 WebSocket disconnected for user {user_id} in direct chat room {room}")
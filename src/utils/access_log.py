@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import random
+import sys
+import time
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode
+
+import structlog
+from dotenv import load_dotenv
+
+from src.utils.log import add_channel, remove_channel
+
+# The module-level access log is configured at import, which can precede the app's load_dotenv()
+load_dotenv()
+
+REDACTED = "[redacted]"
+DEFAULT_REDACT = ("token", "access_token", "refresh_token", "password", "otp", "code", "key", "secret", "email")
+
+
+class RequestStats:
+    """Counters filled in while one request runs"""
+    __slots__ = ("db_time", "db_queries")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+
+
+_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("access_log_stats", default=None)
+
+
+def note_query(elapsed: float) -> None:
+    """Charge a database query to the current request's access record"""
+    stats = _stats.get()
+    if stats is not None:
+        stats.db_time += elapsed
+        stats.db_queries += 1
+
+
+class AccessLog:
+    """One structured (JSON) record per request, written off the event loop.
+
+    Records go to the "access" logger and through the application's log
+    queue (src/utils/log.py) to a channel of their own: the writer thread
+    renders them as JSON to stdout, so neither the rendering nor a slow
+    stream blocks a request. Until start() they are dropped.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        slow_ms: float = 1000.0,
+        redact: Iterable[str] = DEFAULT_REDACT,
+        stream=None,
+    ):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.redact = frozenset(name.lower() for name in redact)
+        self.stream = stream
+        self._logger = logging.getLogger("access")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._started = False
+        # The event dict is handed over as is and rendered by the channel's formatter
+        self._structured = structlog.wrap_logger(
+            self._logger,
+            processors=[
+                structlog.processors.TimeStamper(fmt="iso", utc=True),
+                structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+            ],
+            wrapper_class=structlog.stdlib.BoundLogger,
+        )
+
+    @classmethod
+    def from_env(cls) -> "AccessLog":
+        redact = os.environ.get("ACCESS_LOG_REDACT")
+        return cls(
+            sample_rate=float(os.environ.get("ACCESS_LOG_SAMPLE_RATE", "1")),
+            slow_ms=float(os.environ.get("ACCESS_LOG_SLOW_MS", "1000")),
+            redact=[name.strip() for name in redact.split(",") if name.strip()] if redact is not None else DEFAULT_REDACT,
+        )
+
+    def start(self) -> None:
+        if self._started:
+            return
+        output = logging.StreamHandler(self.stream or sys.stdout)
+        output.setFormatter(json_formatter())
+        add_channel(self._logger.name, output)
+        self._logger.propagate = self._started = True
+
+    def stop(self) -> None:
+        """Stop after writing every queued record"""
+        if not self._started:
+            return
+        self._logger.propagate = self._started = False
+        remove_channel(self._logger.name)
+
+    def write(self, **fields) -> None:
+        self._structured.info("request", **fields)
+
+    def redact_query(self, query_string: bytes) -> str:
+        if not query_string:
+            return ""
+        params = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+        return urlencode([(name, REDACTED if name.lower() in self.redact else value) for name, value in params])
+
+    def keep(self, status: int, duration_ms: float) -> bool:
+        """Errors and slow requests are always logged; the rest are sampled"""
+        return status >= 500 or duration_ms >= self.slow_ms or random.random() < self.sample_rate
+
+
+def json_formatter() -> logging.Formatter:
+    """Renders the event dict of a structlog record as one line of JSON"""
+    return structlog.stdlib.ProcessorFormatter(
+        processors=[structlog.stdlib.ProcessorFormatter.remove_processors_meta, structlog.processors.JSONRenderer()],
+    )
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Plain Starlette routes do not record themselves; unmatched paths are not logged verbatim
+    return scope["path"] if "endpoint" in scope else "<unmatched>"
+
+
+class AccessLogMiddleware:
+    """ASGI middleware logging method, route template, status, duration, DB time and bytes.
+
+    Bodies are never read: request size comes from Content-Length and
+    response size is counted as it is sent.
+    """
+
+    def __init__(self, app, log: Optional[AccessLog] = None):
+        self.app = app
+        self.log = log or access_log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = _stats.set(stats)
+        status = 500
+        bytes_out = 0
+
+        async def counting_send(message) -> None:
+            nonlocal status, bytes_out
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            _stats.reset(token)
+            duration_ms = (time.perf_counter() - start) * 1000
+            if self.log.keep(status, duration_ms):
+                self._write(scope, status, duration_ms, stats, bytes_out)
+
+    def _write(self, scope, status: int, duration_ms: float, stats: RequestStats, bytes_out: int) -> None:
+        bytes_in = 0
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                bytes_in = int(value) if value.isdigit() else 0
+                break
+        client = scope.get("client")
+        self.log.write(
+            method=scope["method"],
+            route=route_template(scope),
+            query=self.log.redact_query(scope.get("query_string", b"")),
+            status=status,
+            duration_ms=round(duration_ms, 3),
+            db_ms=round(stats.db_time * 1000, 3),
+            db_queries=stats.db_queries,
+            bytes_in=bytes_in,
+            bytes_out=bytes_out,
+            client=client[0] if client else None,
+        )
+
+
+access_log = AccessLog.from_env()
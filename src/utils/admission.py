@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from src.utils.access_log import route_template
+
+# Route classes, each with its own concurrency limit. "health" is never limited,
+# and auth has a limit of its own so that a flood of reads cannot lock users out.
+# "bulk" routes run for as long as their payload needs, so their latency says
+# nothing about load; they are admin-only and not limited either.
+ROUTE_CLASSES = ("health", "bulk", "auth", "chat", "feeds", "writes", "reads")
+
+UNLIMITED_CLASSES = ("health", "bulk")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+BULK_PATHS = ("/posts/batch",)
+
+FEED_PATHS = ("/posts/feed", "/posts/following-feed", "/posts/trending")
+
+
+def route_class(method: str, path: str) -> str:
+    if path == "/" or path.startswith(("/health", "/ping", "/metrics")):
+        return "health"
+    if path in BULK_PATHS:
+        return "bulk"
+    if path.startswith("/auth"):
+        return "auth"
+    if method not in SAFE_METHODS:
+        return "writes"
+    if "/message" in path or "/group-chat" in path:
+        return "chat"
+    if path.startswith(FEED_PATHS):
+        return "feeds"
+    return "reads"
+
+
+class AdaptiveLimit:
+    """Concurrency limit adjusted by additive increase, multiplicative decrease (AIMD).
+
+    The limit grows by about one per ``limit`` completions while it is in
+    use, and shrinks by ``backoff`` when a request is slower than
+    ``tolerance`` times its route's no-load latency (plus ``slack``
+    seconds) or is dropped. Only requests admitted after the previous
+    decrease can trigger the next one, so the limit shrinks at most once per
+    round of requests. The no-load latency is kept per route, since one
+    class mixes cached and uncached endpoints: the lowest seen, drifting up
+    slowly so that a lasting change in the workload is learnt.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: float = 20,
+        min_limit: float = 2,
+        max_limit: float = 200,
+        tolerance: float = 2.0,
+        slack: float = 0.02,
+        backoff: float = 0.9,
+        max_routes: int = 256,
+    ):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.slack = slack
+        self.backoff = backoff
+        self.max_routes = max_routes
+        self.in_flight = 0
+        # No-load latency by route template
+        self.baselines: Dict[str, float] = {}
+        self._last_decrease = 0.0
+        self.admitted = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> Optional[float]:
+        """Admission time to pass to release(), or None when the limit is reached"""
+        if self.in_flight >= int(self.limit):
+            self.rejected += 1
+            return None
+        self.in_flight += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started: float, dropped: bool = False, route: str = "") -> None:
+        self.in_flight -= 1
+        now = time.monotonic()
+        latency = now - started
+        if route not in self.baselines and len(self.baselines) >= self.max_routes:
+            # Routes beyond max_routes share one baseline
+            route = "<other>"
+        baseline = self.baselines.get(route)
+        if not dropped:
+            if baseline is None or latency < baseline:
+                baseline = latency
+            else:
+                baseline += (latency - baseline) * 0.001
+            self.baselines[route] = baseline
+        if dropped or latency > baseline * self.tolerance + self.slack:
+            if started >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "baseline_ms": {route: round(baseline * 1000, 3) for route, baseline in sorted(self.baselines.items())},
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware shedding HTTP requests beyond their route class's adaptive limit.
+
+    Rejected requests get 503 with Retry-After at once, before any other
+    middleware or handler runs. A 503 answered by the app (e.g. an exhausted
+    deadline) counts as a drop and shrinks the limit.
+    """
+
+    def __init__(self, app, limits: Optional[Dict[str, AdaptiveLimit]] = None, retry_after: Optional[int] = None):
+        self.app = app
+        self.limits = limits if limits is not None else limits_from_env()
+        self.retry_after = retry_after if retry_after is not None else int(os.environ.get("ADMISSION_RETRY_AFTER", "1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.limits.get(route_class(scope["method"], scope["path"]))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        started = limit.try_acquire()
+        if started is None:
+            await self._reject(send, limit)
+            return
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limit.release(started, dropped=status in (503, 504), route=route_template(scope))
+
+    async def _reject(self, send, limit: AdaptiveLimit) -> None:
+        body = json.dumps({"detail": "Server is busy, retry later", "class": limit.name}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def limits_from_env() -> Dict[str, AdaptiveLimit]:
+    """An AdaptiveLimit per limited route class from ADMISSION_* variables; none when disabled"""
+    if os.environ.get("ADMISSION_CONTROL", "true").lower() not in ("1", "true", "yes"):
+        return {}
+    return {
+        name: AdaptiveLimit(
+            name,
+            initial=float(os.environ.get("ADMISSION_INITIAL_LIMIT", "20")),
+            min_limit=float(os.environ.get("ADMISSION_MIN_LIMIT", "2")),
+            max_limit=float(os.environ.get("ADMISSION_MAX_LIMIT", "200")),
+            tolerance=float(os.environ.get("ADMISSION_LATENCY_TOLERANCE", "2")),
+            slack=float(os.environ.get("ADMISSION_LATENCY_SLACK", "0.02")),
+        )
+        for name in ROUTE_CLASSES
+        if name not in UNLIMITED_CLASSES
+    }
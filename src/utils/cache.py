@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import string
+import sys
+import time
+import typing
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, Optional, Set
+
+import redis.asyncio as redis
+from dotenv import load_dotenv
+from pydantic import TypeAdapter, ValidationError
+
+from src.utils.deadline import DeadlineExceeded, dependency
+from src.utils import metrics
+from src.utils.single_flight import SingleFlight, groups
+from src.utils.tracing import instrument_redis
+
+# The module-level cache is configured at import, which can precede the app's load_dotenv()
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Values go to Redis as JSON and are validated on the way back, never unpickled:
+# write access to the cache's Redis must not mean running code in the app
+JSON = TypeAdapter(Any)
+
+
+@dataclass
+class _Entry:
+    expires: float
+    value: Any
+    tags: FrozenSet[str]
+    size: int
+
+
+class Cache:
+    """Two-tier read cache: an in-process LRU (L1) over an optional Redis (L2).
+
+    Entries carry tags naming the entities they were built from, such as
+    ``user:{id}``, ``post:{id}`` or ``visionboard:{id}``; invalidating a tag
+    drops every entry carrying it. In Redis each tag has a version and an
+    entry is only served while the versions it was stored with are current,
+    and invalidations are published so other processes drop their L1
+    entries too. Concurrent misses for a key share one load. Without
+    ``redis_url`` the cache is in-process only. Cached values are shared
+    between callers and must not be mutated. None is never cached, and
+    neither is a load that raised.
+
+    Values are stored in Redis as JSON by a pydantic ``codec`` (a
+    TypeAdapter of the value's type; plain JSON data by default) and
+    validated by it when read back. Values the codec cannot serialize stay
+    in L1 only.
+    """
+
+    def __init__(
+        self,
+        name: str = "cache",
+        max_entries: int = 4096,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 60.0,
+        redis_url: Optional[str] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self._redis = None
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        # Bumped by every invalidation; a load that overlaps one is not kept in L1
+        self._epoch = 0
+        self._loads = SingleFlight(f"{name}.load", ttl=0)
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "Cache":
+        return cls(
+            max_entries=int(os.environ.get("CACHE_SIZE", "4096")),
+            max_bytes=int(os.environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl=float(os.environ.get("CACHE_TTL", "60")),
+            redis_url=os.environ.get("CACHE_REDIS_URL") or None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+        }
+
+    def _get_redis(self):
+        if self._redis is None:
+            self._redis = instrument_redis(redis.from_url(self.redis_url))
+        return self._redis
+
+    def _redis_key(self, key: Hashable) -> str:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return f"cache:{self.name}:{digest}"
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"cache:tag:{tag}"
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        *,
+        tags: Iterable[str] = (),
+        ttl: Optional[float] = None,
+        codec: TypeAdapter = JSON,
+        result_tags: Optional[Callable[[Any], Iterable[str]]] = None,
+        flight: Optional[SingleFlight] = None,
+    ) -> Any:
+        """Cached value for ``key``, loading and storing it on a miss.
+
+        ``result_tags`` adds tags only known once the value is loaded, such
+        as the ``user:{id}`` of a post's author. Misses share loads through
+        ``flight`` (default: the cache's own group), which also counts hits.
+        """
+        flight = flight if flight is not None else self._loads
+        if not self.enabled:
+            return await flight.do(key, loader)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                flight.record_hit()
+                return entry.value
+            self._discard(key)
+        return await flight.do(
+            key, lambda: self._load(key, loader, frozenset(tags), ttl or self.ttl, codec, result_tags)
+        )
+
+    async def _load(self, key: Hashable, loader, tags: FrozenSet[str], ttl: float, codec: TypeAdapter, result_tags) -> Any:
+        epoch = self._epoch
+        versions = None
+        if self.redis_url:
+            found, value, versions = await self._l2_get(key, tags, codec)
+            if found:
+                self.l2_hits += 1
+                # The stored versions name every tag, including those from result_tags
+                self._store(key, value, tags | frozenset(versions), ttl, epoch, codec)
+                return value
+        self.misses += 1
+        value = await loader()
+        if value is None:
+            return value
+        if result_tags is not None:
+            extra = frozenset(result_tags(value)) - tags
+            tags |= extra
+            if versions is not None and extra:
+                more = await self._l2_versions(extra)
+                versions = {**versions, **more} if more is not None else None
+        data = self._store(key, value, tags, ttl, epoch, codec)
+        if versions is not None and data is not None:
+            await self._l2_set(key, data, versions, ttl)
+        return value
+
+    def _store(self, key: Hashable, value: Any, tags: FrozenSet[str], ttl: float, epoch: int, codec: TypeAdapter) -> Optional[bytes]:
+        """Keep a loaded value in L1; returns its JSON form for L2 when it has one"""
+        try:
+            data = codec.dump_json(value)
+            size = len(data)
+        except Exception:
+            data, size = None, sys.getsizeof(value)
+        if epoch != self._epoch or size > self.max_bytes:
+            # Invalidated while loading, or too big to keep
+            return data
+        self._discard(key)
+        self._entries[key] = _Entry(time.monotonic() + ttl, value, tags, size)
+        self._bytes += size
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+        return data
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def _tag_versions(self, client, tags: FrozenSet[str]) -> Dict[str, Optional[str]]:
+        tags = sorted(tags)
+        if not tags:
+            return {}
+        versions = await client.mget([self._tag_key(tag) for tag in tags])
+        return {tag: version.decode() if version is not None else None for tag, version in zip(tags, versions)}
+
+    async def _l2_get(self, key: Hashable, tags: FrozenSet[str], codec: TypeAdapter):
+        """(found, value, tag versions); versions are None when Redis is unavailable.
+
+        On a hit the versions are those the entry was stored with; on a miss
+        they are the current ones of ``tags``, to store a fresh load with.
+        """
+        try:
+            async with dependency("redis"):
+                client = self._get_redis()
+                data = await client.get(self._redis_key(key))
+                if data is not None:
+                    # The tag versions the entry was stored with, a newline, then the value
+                    header, _, value = data.partition(b"\n")
+                    stored = json.loads(header)
+                    if stored.keys() >= tags and await self._tag_versions(client, frozenset(stored)) == stored:
+                        try:
+                            return True, codec.validate_json(value), stored
+                        except ValidationError as e:
+                            logger.warning(f"Cache {self.name} L2 entry is not a valid {codec}: {e}")
+                return False, None, await self._current_versions(client, tags)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache {self.name} L2 read failed: {e}")
+            return False, None, None
+
+    async def _l2_versions(self, tags: FrozenSet[str]) -> Optional[Dict[str, str]]:
+        try:
+            async with dependency("redis"):
+                return await self._current_versions(self._get_redis(), tags)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Cache {self.name} L2 read failed: {e}")
+            return None
+
+    async def _current_versions(self, client, tags: FrozenSet[str]) -> Dict[str, str]:
+        """Versions of ``tags``, giving tags without one a fresh version"""
+        versions = await self._tag_versions(client, tags)
+        missing = [tag for tag, version in versions.items() if version is None]
+        if missing:
+            # Versions are read before loading, so an invalidation during the load outdates the entry
+            async with client.pipeline(transaction=False) as pipe:
+                for tag in missing:
+                    pipe.set(self._tag_key(tag), uuid.uuid4().hex, nx=True, ex=self._tag_ttl())
+                await pipe.execute()
+            versions = await self._tag_versions(client, tags)
+        return versions
+
+    async def _l2_set(self, key: Hashable, data: bytes, versions: Dict[str, Optional[str]], ttl: float) -> None:
+        try:
+            payload = json.dumps(versions).encode() + b"\n" + data
+            async with dependency("redis"):
+                await self._get_redis().set(self._redis_key(key), payload, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            logger.warning(f"Cache {self.name} L2 write failed: {e}")
+
+    def _tag_ttl(self) -> int:
+        # An expired tag version only turns entries carrying it into misses
+        return max(60, int(self.ttl * 2))
+
+    def invalidate_local(self, tags: Iterable[str]) -> None:
+        """Drop this process's entries carrying any of ``tags``"""
+        self._epoch += 1
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._discard(key)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of ``tags``, in every process sharing the Redis"""
+        tags = [tag for tag in tags if tag]
+        if not tags:
+            return
+        self.invalidate_local(tags)
+        if not self.redis_url:
+            return
+        try:
+            async with dependency("redis"), self._get_redis().pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.set(self._tag_key(tag), uuid.uuid4().hex, ex=self._tag_ttl())
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps({"origin": self._origin, "tags": tags}))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Cache {self.name} invalidation of {tags} not shared: {e}")
+
+    async def listen(self) -> None:
+        """Apply invalidations published by other processes until cancelled"""
+        while True:
+            try:
+                async with self._get_redis().pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    # Anything published while unsubscribed was missed
+                    self.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        event = json.loads(message["data"])
+                        if event.get("origin") != self._origin:
+                            self.invalidate_local(event.get("tags", ()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache {self.name} invalidation listener failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if self.redis_url and self.enabled and self._listener is None:
+            self._listener = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+        self._tags.clear()
+        self._bytes = 0
+
+
+def _bind(signature: inspect.Signature, args, kwargs) -> Dict[str, Any]:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def _names_result(template: str) -> bool:
+    return any(
+        field and field.replace("[", ".").split(".")[0] == "result"
+        for _, field, _, _ in string.Formatter().parse(template)
+    )
+
+
+def cached(tags: Iterable[str] = (), ttl: Optional[float] = None, store: Optional[Cache] = None):
+    """Decorator caching an async handler method's result.
+
+    Results are keyed on the method and its arguments (not the instance) and
+    tagged with ``tags``, templates formatted with the arguments, e.g.
+    ``"user:{user_id}"``; templates naming ``result`` are formatted with the
+    loaded result too, e.g. ``"user:{result.user_id}"``. ``store`` defaults
+    to the module's ``cache``. Concurrent misses share one load; hits and
+    loads are counted under the method's name in single_flight.groups, as
+    for coalesce(). The method's return annotation is the type results are
+    validated as when read back from Redis, so annotate it (unannotated,
+    results come back as plain JSON data). The wrapped method keeps its
+    signature.
+    """
+    tags = list(tags)
+    # Templates that need the result are formatted after the load
+    later = [tag for tag in tags if _names_result(tag)]
+    now = [tag for tag in tags if not _names_result(tag)]
+
+    def decorator(method):
+        signature = inspect.signature(method)
+        flight = groups[method.__qualname__] = SingleFlight(method.__qualname__, ttl=0)
+        codec = None
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            nonlocal codec
+            if codec is None:
+                # Resolved on first use: annotations may name types imported after the class
+                returns = typing.get_type_hints(method).get("return")
+                codec = TypeAdapter(returns) if returns is not None else JSON
+            arguments = _bind(signature, args, kwargs)
+            key = (method.__qualname__, *list(arguments.items())[1:])
+            return await (store if store is not None else cache).get_or_load(
+                key,
+                lambda: method(*args, **kwargs),
+                tags=[tag.format(**arguments) for tag in now],
+                ttl=ttl,
+                codec=codec,
+                result_tags=(lambda result: [tag.format(**arguments, result=result) for tag in later]) if later else None,
+                flight=flight,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*tags: str, store: Optional[Cache] = None):
+    """Decorator invalidating ``tags`` (templates formatted with the arguments) after the method succeeds"""
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            result = await method(*args, **kwargs)
+            arguments = _bind(signature, args, kwargs)
+            await (store if store is not None else cache).invalidate(*(tag.format(**arguments) for tag in tags))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+cache = Cache.from_env()
+
+
+def _cache_lookups():
+    yield (cache.name, "l1_hit"), cache.hits
+    yield (cache.name, "l2_hit"), cache.l2_hits
+    yield (cache.name, "miss"), cache.misses
+
+
+def _cache_hit_ratio():
+    lookups = cache.hits + cache.l2_hits + cache.misses
+    yield (cache.name,), (cache.hits + cache.l2_hits) / lookups if lookups else 0.0
+
+
+metrics.collected("cache_lookups_total", "counter", "Cache lookups by outcome", ("cache", "result"), _cache_lookups)
+metrics.collected("cache_hit_ratio", "gauge", "Share of cache lookups served from L1 or L2", ("cache",), _cache_hit_ratio)
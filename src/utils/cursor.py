@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Response header carrying the next cursor for endpoints whose body is a bare list
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_SIGNATURE_BYTES = 16
+_fallback_secret = secrets.token_bytes(32)
+
+
+def _secret() -> bytes:
+    # Read at call time: .env is loaded after this module is imported
+    secret = os.environ.get("CURSOR_SECRET") or os.environ.get("JWT_SECRET")
+    # Without either, cursors only survive as long as this process
+    return secret.encode() if secret else _fallback_secret
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode((data + "=" * (-len(data) % 4)).encode())
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {"ts": value.isoformat()}
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError(f"Unsupported cursor key type: {type(value).__name__}")
+    return value
+
+
+def _load_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return datetime.datetime.fromisoformat(value["ts"])
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        return value
+    raise ValueError("Unsupported cursor key value")
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """Position after a row in a listing ordered by (*key, id) in one direction"""
+    key: Tuple[Any, ...]
+    id: uuid.UUID
+    direction: str = "desc"
+
+    @property
+    def values(self) -> List[Any]:
+        return [*self.key, self.id]
+
+
+def encode_cursor(key: Any, row_id: uuid.UUID, direction: str = "desc") -> str:
+    """Signed, opaque token for the position after a row.
+
+    ``key`` is the row's sort key (a value or a tuple of values: datetimes,
+    numbers or strings) and ``row_id`` its unique tie-breaker.
+    """
+    if direction not in ("asc", "desc"):
+        raise ValueError(f"Invalid cursor direction: {direction!r}")
+    key = key if isinstance(key, tuple) else (key,)
+    payload = json.dumps(
+        {"k": [_dump_value(v) for v in key], "id": str(row_id), "d": direction},
+        separators=(",", ":"),
+    ).encode()
+    signature = hmac.new(_secret(), payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+    return f"{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def decode_cursor(token: str, direction: str = "desc", key_size: int = 1) -> Cursor:
+    """Verify and decode a cursor from encode_cursor.
+
+    Raises ValueError if the token is malformed or tampered with, or was
+    issued for a listing with another direction or sort key shape.
+    """
+    try:
+        payload_part, signature_part = token.split(".")
+        payload, signature = _b64decode(payload_part), _b64decode(signature_part)
+        expected = hmac.new(_secret(), payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+        if not hmac.compare_digest(signature, expected):
+            raise ValueError("bad signature")
+        data = json.loads(payload)
+        cursor = Cursor(tuple(_load_value(v) for v in data["k"]), uuid.UUID(data["id"]), data["d"])
+    except (binascii.Error, UnicodeError, TypeError, KeyError, AttributeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+    if cursor.direction != direction or len(cursor.key) != key_size:
+        raise ValueError(f"Cursor does not belong to this listing: {token!r}")
+    return cursor
+
+
+def keyset_condition(columns: Sequence[str], cursor: Cursor, first_param: int) -> Tuple[str, List[Any]]:
+    """SQL condition selecting rows strictly after ``cursor``, plus its parameters.
+
+    ``columns`` are the sort key expressions followed by the id column, in
+    the listing's ORDER BY order; placeholders start at ``$first_param``.
+    """
+    values = cursor.values
+    if len(columns) != len(values):
+        raise ValueError("Cursor does not match the listing's sort key")
+    placeholders = ", ".join(f"${first_param + i}" for i in range(len(values)))
+    operator = "<" if cursor.direction == "desc" else ">"
+    return f"({', '.join(columns)}) {operator} ({placeholders})", values
+
+
+def next_cursor(rows: Sequence[Any], limit: int, key: Callable[[Any], Any], direction: str = "desc") -> Optional[str]:
+    """Cursor for the page after ``rows[:limit]``, or None on the last page.
+
+    ``rows`` are records fetched with LIMIT limit + 1; ``key`` maps one to its sort key.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(key(last), last["id"], direction)
+
+
+def page_cursor(items: Sequence[Any], limit: int, direction: str = "desc") -> Optional[str]:
+    """Cursor after a full page of items ordered by (created_at, id).
+
+    Items are models or dicts; Supabase rows carry created_at as an ISO string.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if isinstance(last, Mapping):
+        created_at, row_id = last["created_at"], last["id"]
+    else:
+        created_at, row_id = last.created_at, last.id
+    if isinstance(created_at, str):
+        created_at = datetime.datetime.fromisoformat(created_at)
+    return encode_cursor(created_at, uuid.UUID(str(row_id)), direction)
+
+
+def next_cursor_header(items: Sequence[Any], limit: int, direction: str = "desc") -> Dict[str, str]:
+    """NEXT_CURSOR_HEADER for endpoints whose body is a bare list"""
+    cursor = page_cursor(items, limit, direction)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
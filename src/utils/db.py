@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from src.utils.access_log import note_query
+from src.utils.deadline import dependency
+from src.utils.metrics import observe_query
+from src.utils.query_log import query_log
+from src.utils.replicas import router as replica_router
+from src.utils.tracing import record_query, record_span
+
+logger = logging.getLogger(__name__)
+
+# default=str covers UUIDs, datetimes and Decimals nested in payload dicts
+_json_dumps = functools.partial(json.dumps, default=str)
+
+
+async def init_connection(conn: asyncpg.Connection) -> None:
+    """Per-connection setup, passed as ``init=`` to ``asyncpg.create_pool``.
+
+    json and jsonb columns are decoded to Python objects on read and encoded
+    from them on write, so handlers pass and receive dicts, never JSON strings.
+    """
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename,
+            schema="pg_catalog",
+            encoder=_json_dumps,
+            decoder=json.loads,
+            format="text",
+        )
+
+
+# The connection bound by the innermost unit of work, with the task that owns it
+_unit: contextvars.ContextVar[Optional[Tuple[asyncio.Task, asyncpg.Connection]]] = contextvars.ContextVar(
+    "db_unit_of_work", default=None
+)
+
+
+@contextlib.asynccontextmanager
+async def acquire(pool: asyncpg.Pool) -> AsyncIterator[asyncpg.Connection]:
+    """Drop-in for ``pool.acquire()`` that reuses the current task's unit-of-work connection.
+
+    Nested handler calls made while a connection is held therefore share it
+    instead of taking a second one from the pool. Tasks spawned meanwhile
+    inherit the context but get their own connection, since one connection
+    cannot run two queries at once. Inside a read_only method the connection
+    may come from a replica (see src/utils/replicas.py).
+    """
+    unit = _unit.get()
+    task = asyncio.current_task()
+    if unit is not None and unit[0] is task:
+        yield unit[1]
+        return
+    async with replica_router.pool_for(pool).acquire() as conn:
+        token = _unit.set((task, conn))
+        try:
+            yield conn
+        finally:
+            _unit.reset(token)
+
+
+def held_connection() -> Optional[asyncpg.Connection]:
+    """The connection acquire() would hand the current task without touching the pool, if any"""
+    unit = _unit.get()
+    if unit is not None and unit[0] is asyncio.current_task():
+        return unit[1]
+    return None
+
+
+@contextlib.asynccontextmanager
+async def unit_of_work(pool: asyncpg.Pool, transaction: bool = False) -> AsyncIterator[asyncpg.Connection]:
+    """Bind one connection, optionally inside a transaction, to every acquire() in the block.
+
+    Nested units reuse the connection; a nested transaction becomes a savepoint.
+    """
+    async with acquire(pool) as conn:
+        if not transaction:
+            yield conn
+            return
+        async with conn.transaction():
+            yield conn
+
+
+def _optional_float(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """asyncpg pool configuration, read from DB_POOL_* variables by from_env()"""
+    min_size: int = 1
+    max_size: int = 10
+    command_timeout: float = 60.0
+    # Seconds to wait for a free connection before failing; None waits indefinitely
+    acquire_timeout: Optional[float] = None
+    max_inactive_connection_lifetime: float = 300.0
+    max_queries: int = 50000
+    # One of STATEMENT_MODES; prepared statements are cached only when direct or session is set
+    statement_mode: str = "transaction"
+    statement_cache_size: int = 1024
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            min_size=int(os.environ.get("DB_POOL_MIN_SIZE", "1")),
+            max_size=int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+            command_timeout=float(os.environ.get("DB_COMMAND_TIMEOUT", "60")),
+            acquire_timeout=_optional_float("DB_POOL_ACQUIRE_TIMEOUT"),
+            max_inactive_connection_lifetime=float(os.environ.get("DB_POOL_MAX_INACTIVE_LIFETIME", "300")),
+            max_queries=int(os.environ.get("DB_POOL_MAX_QUERIES", "50000")),
+            statement_mode=os.environ.get("DB_STATEMENT_MODE", "transaction").lower(),
+            statement_cache_size=int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "1024")),
+        )
+
+
+# How statements may be prepared, by what sits between the app and Postgres:
+#   direct       Postgres itself: named prepared statements are cached per connection
+#   session      pgbouncer in session mode (or transaction mode with max_prepared_statements,
+#                pgbouncer >= 1.21): a client keeps its server, so the same caching is safe
+#   transaction  pgbouncer in transaction mode: consecutive transactions may run on different
+#                servers, so only unnamed statements are used (parsed and planned every time);
+#                fetch_batch() saves the round trips. The default, since it is safe everywhere
+STATEMENT_MODES = ("direct", "session", "transaction")
+
+# Ports of transaction-pooling proxies: pgbouncer's default and Supabase's pooler
+TRANSACTION_POOLER_PORTS = (6432, 6543)
+
+
+def statement_cache_size(mode: str, cache_size: int) -> int:
+    """asyncpg statement_cache_size for a statement mode"""
+    if mode not in STATEMENT_MODES:
+        raise ValueError(f"Unknown statement mode {mode!r}; expected one of {STATEMENT_MODES}")
+    return 0 if mode == "transaction" else cache_size
+
+
+_PARAMETER = re.compile(r"\$(\d+)")
+
+
+@functools.lru_cache(maxsize=256)
+def _batch_sql(queries: Tuple[str, ...], arg_counts: Tuple[int, ...]) -> str:
+    columns, arrays = [], []
+    offset = 0
+    for i, (query, count) in enumerate(zip(queries, arg_counts)):
+        query = _PARAMETER.sub(lambda m, offset=offset: f"${int(m.group(1)) + offset}", query.strip().rstrip(";"))
+        offset += count
+        arrays.append(f"ARRAY(SELECT t FROM ({query}) t) AS r{i}")
+        # Array elements are anonymous records; the first one's keys name the columns
+        columns.append(
+            f"b.r{i}, (SELECT array_agg(k ORDER BY n) FROM json_object_keys(row_to_json(b.r{i}[1])) "
+            f"WITH ORDINALITY AS c(k, n)) AS c{i}"
+        )
+    return f"SELECT {', '.join(columns)} FROM (SELECT {', '.join(arrays)}) b"
+
+
+async def fetch_batch(conn: asyncpg.Connection, *queries: Sequence[Any]) -> List[List[Dict[str, Any]]]:
+    """Run several read queries, each given as ``(sql, *args)``, in one statement.
+
+    Each query becomes an array subquery of one SELECT, with its $n
+    parameters renumbered, so the batch costs the round trips of a single
+    query: one with a cached prepared statement, two (Parse and Describe,
+    then Bind and Execute) with the unnamed statements of transaction mode,
+    where every separate query pays both. Returns each query's rows, in
+    order, as dicts. The SQL must not contain $n inside string literals.
+    """
+    sql = _batch_sql(tuple(query[0] for query in queries), tuple(len(query) - 1 for query in queries))
+    row = await conn.fetchrow(sql, *(arg for query in queries for arg in query[1:]))
+    return [
+        [dict(zip(row[2 * i + 1], values)) for values in row[2 * i]] if row[2 * i] else []
+        for i in range(len(queries))
+    ]
+
+
+# Upper bounds in seconds of the acquire wait histogram; a final bucket takes the rest
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PoolTelemetry:
+    """Counters describing how a pool is used: acquire waits, timeouts and queries per connection"""
+
+    def __init__(self):
+        self.wait_buckets: List[int] = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.acquires = 0
+        self.timeouts = 0
+        self.in_use = 0
+        # Queries run by each open connection, by server process id
+        self.queries: Dict[int, int] = {}
+        # The asyncpg pool, once created; slow queries are EXPLAINed on it
+        self.pool: Optional[asyncpg.Pool] = None
+
+    def observe_wait(self, seconds: float) -> None:
+        self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+        self.wait_sum += seconds
+        self.acquires += 1
+
+    def attach(self, conn: asyncpg.Connection) -> None:
+        """Count the queries of a new connection until it closes"""
+        pid = conn.get_server_pid()
+        self.queries[pid] = 0
+
+        def count(query) -> None:
+            self.queries[pid] = self.queries.get(pid, 0) + 1
+            note_query(query.elapsed)
+            observe_query(query.elapsed)
+            record_query(query)
+            query_log.observe(query, self.pool)
+
+        conn.add_query_logger(count)
+        conn.add_termination_listener(lambda _conn: self.queries.pop(pid, None))
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*WAIT_BUCKETS, float("inf")), self.wait_buckets):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else f"{bound:g}"] = cumulative
+        return {
+            "acquires": self.acquires,
+            "timeouts": self.timeouts,
+            "in_use": self.in_use,
+            "wait_seconds": {"sum": round(self.wait_sum, 6), "count": self.acquires, "buckets": buckets},
+            "queries_per_connection": dict(self.queries),
+        }
+
+
+class _TimedAcquire:
+    def __init__(self, pool: "InstrumentedPool", timeout: Optional[float]):
+        self._pool = pool
+        self._timeout = timeout
+        self._conn: Optional[asyncpg.Connection] = None
+        # Holding the connection counts against the request's deadline (src/utils/deadline.py);
+        # a query still running when it expires is cancelled on the server
+        self._deadline = dependency("db")
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        telemetry = self._pool.telemetry
+        await self._deadline.__aenter__()
+        start = time.perf_counter()
+        try:
+            self._conn = await self._pool.pool.acquire(timeout=self._timeout)
+        except BaseException as e:
+            if isinstance(e, asyncio.TimeoutError):
+                telemetry.timeouts += 1
+            await self._deadline.__aexit__(type(e), e, e.__traceback__)
+            raise
+        waited = time.perf_counter() - start
+        telemetry.observe_wait(waited)
+        record_span("db.pool.acquire", waited)
+        telemetry.in_use += 1
+        return self._conn
+
+    async def __aexit__(self, *exc) -> None:
+        self._pool.telemetry.in_use -= 1
+        try:
+            await self._pool.pool.release(self._conn)
+        finally:
+            await self._deadline.__aexit__(*exc)
+
+
+class InstrumentedPool:
+    """asyncpg pool wrapper recording PoolTelemetry; otherwise used exactly like the pool"""
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        telemetry: PoolTelemetry,
+        acquire_timeout: Optional[float] = None,
+        statement_mode: Optional[str] = None,
+    ):
+        self.pool = pool
+        self.telemetry = telemetry
+        self.acquire_timeout = acquire_timeout
+        self.statement_mode = statement_mode
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _TimedAcquire:
+        return _TimedAcquire(self, timeout if timeout is not None else self.acquire_timeout)
+
+    # Shortcut queries go through acquire() so that their waits are recorded too
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None) -> str:
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args, *, timeout: Optional[float] = None) -> None:
+        async with self.acquire() as conn:
+            return await conn.executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None) -> list:
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.pool.get_size(),
+            "idle": self.pool.get_idle_size(),
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "statement_mode": self.statement_mode,
+            **self.telemetry.snapshot(),
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.pool, name)
+
+
+async def create_pool(dsn: str, settings: Optional[PoolSettings] = None, **kwargs) -> InstrumentedPool:
+    """Create the application pool from ``settings`` (default: PoolSettings.from_env()) and warm it.
+
+    asyncpg opens connections lazily up to max_size and closes those idle for
+    max_inactive_connection_lifetime, so the pool grows and shrinks with load
+    within [min_size, max_size]. Extra keyword arguments go to asyncpg.create_pool.
+    """
+    settings = settings or PoolSettings.from_env()
+    if settings.statement_mode != "transaction" and urlsplit(dsn).port in TRANSACTION_POOLER_PORTS:
+        logger.warning(
+            f"DB_STATEMENT_MODE={settings.statement_mode} caches prepared statements, but the database port "
+            f"is a transaction pooler's; use transaction unless the pooler runs in session mode"
+        )
+    kwargs.setdefault("statement_cache_size", statement_cache_size(settings.statement_mode, settings.statement_cache_size))
+    telemetry = PoolTelemetry()
+
+    async def init(conn: asyncpg.Connection) -> None:
+        telemetry.attach(conn)
+        await init_connection(conn)
+
+    pool = await asyncpg.create_pool(
+        dsn,
+        min_size=settings.min_size,
+        max_size=settings.max_size,
+        command_timeout=settings.command_timeout,
+        max_inactive_connection_lifetime=settings.max_inactive_connection_lifetime,
+        max_queries=settings.max_queries,
+        init=init,
+        **kwargs,
+    )
+    telemetry.pool = pool
+    instrumented = InstrumentedPool(pool, telemetry, settings.acquire_timeout, settings.statement_mode)
+    await warm_pool(instrumented, settings.min_size)
+    return instrumented
+
+
+async def warm_pool(pool: InstrumentedPool, connections: int) -> None:
+    """Round-trip on ``connections`` connections at once, so the first requests find them ready"""
+    async def ping() -> None:
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT 1")
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+# Blamed when a budget runs out while no dependency call is in flight
+APP = "app"
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out; ``dependency`` is what it was waiting on"""
+
+    def __init__(self, dependency: str):
+        super().__init__(f"Deadline exceeded waiting on {dependency}")
+        self.dependency = dependency
+
+
+class Deadline:
+    """Time budget of one request, and where it went"""
+
+    def __init__(self, budget: float, route: str = ""):
+        self.budget = budget
+        self.route = route
+        self.expires = time.monotonic() + budget
+        # Wall time spent in calls to each dependency; concurrent calls overlap
+        self.spent: Dict[str, float] = {}
+        self.inflight: List[str] = []
+        self.exhausted_by: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def exceeded(self) -> bool:
+        return self.exhausted_by is not None
+
+    def exhaust(self, dependency: Optional[str] = None) -> DeadlineExceeded:
+        """Record the budget as used up (by the innermost call in flight, unless named)"""
+        if self.exhausted_by is None:
+            self.exhausted_by = dependency or (self.inflight[-1] if self.inflight else APP)
+        return DeadlineExceeded(self.exhausted_by)
+
+    def check(self, dependency: str) -> None:
+        if self.remaining() <= 0:
+            raise self.exhaust(dependency)
+
+    def start(self, dependency: str) -> float:
+        self.check(dependency)
+        self.inflight.append(dependency)
+        return time.perf_counter()
+
+    def finish(self, dependency: str, started: float) -> None:
+        if dependency in self.inflight:
+            self.inflight.remove(dependency)
+        self.spent[dependency] = self.spent.get(dependency, 0.0) + time.perf_counter() - started
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left for the current request, capped at ``default``; ``default`` outside a request"""
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    left = deadline.remaining()
+    return left if default is None else min(left, default)
+
+
+@contextlib.asynccontextmanager
+async def dependency(name: str) -> AsyncIterator[None]:
+    """Bound a call to ``name`` (db, redis, supabase, smtp...) by the request's remaining budget.
+
+    Fails at once with DeadlineExceeded when nothing is left, and turns a
+    timeout of the block into DeadlineExceeded(name). The time spent is
+    charged to ``name``. Outside a request this does nothing.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        yield
+        return
+    started = deadline.start(name)
+    timeout = asyncio.timeout(deadline.remaining())
+    try:
+        async with timeout:
+            yield
+    except TimeoutError:
+        if timeout.expired():
+            raise deadline.exhaust(name) from None
+        raise
+    except BaseException:
+        if deadline.remaining() <= 0:
+            deadline.exhaust(name)
+        raise
+    finally:
+        deadline.finish(name, started)
+
+
+class DeadlineTransport(httpx.AsyncBaseTransport):
+    """An httpx transport giving each request the remaining budget as its timeout, charged to ``name``.
+
+    The call is finished in a ``finally``, so a request that raises (a
+    timeout, a refused connection) is not left in flight to be blamed for
+    the next exhaustion.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, name: str):
+        self.transport = transport
+        self.name = name
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = _current.get()
+        if deadline is None:
+            return await self.transport.handle_async_request(request)
+        started = deadline.start(self.name)
+        try:
+            left = deadline.remaining()
+            request.extensions["timeout"] = {"connect": left, "read": left, "write": left, "pool": left}
+            return await self.transport.handle_async_request(request)
+        finally:
+            deadline.finish(self.name, started)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def install_httpx_hooks(client: httpx.AsyncClient, name: str) -> None:
+    """Bound each request of an httpx.AsyncClient by the request's budget (see DeadlineTransport)"""
+    client._transport = DeadlineTransport(client._transport, name)
+    client._mounts = {
+        pattern: DeadlineTransport(transport, name) if transport is not None else None
+        for pattern, transport in client._mounts.items()
+    }
+
+
+class DeadlineStats:
+    """Budget usage across requests: time spent per dependency, and who exhausted budgets"""
+
+    def __init__(self):
+        self.requests = 0
+        self.spent: Dict[str, float] = {}
+        self.exceeded: Dict[str, int] = {}
+
+    def record(self, deadline: Deadline) -> None:
+        self.requests += 1
+        for name, seconds in deadline.spent.items():
+            self.spent[name] = self.spent.get(name, 0.0) + seconds
+        if deadline.exhausted_by is not None:
+            self.exceeded[deadline.exhausted_by] = self.exceeded.get(deadline.exhausted_by, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "requests": self.requests,
+            "exceeded": dict(self.exceeded),
+            "spent_seconds": {name: round(seconds, 6) for name, seconds in self.spent.items()},
+        }
+
+
+stats = DeadlineStats()
+
+
+# Built-in budgets for routes the default does not fit; ROUTE_DEADLINES entries override them.
+# The admin post import writes up to its whole batch in one request
+DEFAULT_ROUTE_DEADLINES: Dict[str, float] = {"/posts/batch": 120.0}
+
+
+class DeadlinePolicy:
+    """Budget per route: the longest matching path prefix in ``routes``, else ``default``; 0 means none"""
+
+    def __init__(self, default: float = 15.0, routes: Optional[Dict[str, float]] = None):
+        self.default = default
+        self.routes: List[Tuple[str, float]] = sorted((routes or {}).items(), key=lambda item: -len(item[0]))
+
+    @classmethod
+    def from_env(cls) -> "DeadlinePolicy":
+        routes = dict(DEFAULT_ROUTE_DEADLINES)
+        for entry in os.environ.get("ROUTE_DEADLINES", "").split(","):
+            prefix, _, seconds = entry.strip().partition("=")
+            if prefix and seconds:
+                routes[prefix] = float(seconds)
+        return cls(float(os.environ.get("REQUEST_DEADLINE", "15")), routes)
+
+    def budget_for(self, path: str) -> Tuple[str, float]:
+        """(matched prefix, budget in seconds)"""
+        for prefix, seconds in self.routes:
+            if path.startswith(prefix):
+                return prefix, seconds
+        return "", self.default
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each HTTP request its route's budget.
+
+    A request that runs out answers 503 naming the dependency that used the
+    budget up (in the body, or the X-Deadline-Exceeded header when a route
+    already turned the failure into a 5xx of its own).
+    """
+
+    def __init__(self, app, policy: Optional[DeadlinePolicy] = None):
+        self.app = app
+        self.policy = policy or DeadlinePolicy.from_env()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route, budget = self.policy.budget_for(scope["path"])
+        if budget <= 0:
+            await self.app(scope, receive, send)
+            return
+        deadline = Deadline(budget, route)
+        started = False
+
+        async def send_with_status(message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                if deadline.exceeded and message["status"] >= 500:
+                    headers = [*message.get("headers", ()), (b"x-deadline-exceeded", deadline.exhausted_by.encode())]
+                    message = {**message, "status": 503, "headers": headers}
+            await send(message)
+
+        token = _current.set(deadline)
+        try:
+            async with asyncio.timeout(budget):
+                await self.app(scope, receive, send_with_status)
+        except (TimeoutError, DeadlineExceeded) as e:
+            error = e if isinstance(e, DeadlineExceeded) else deadline.exhaust()
+            if started:
+                raise
+            body = json.dumps({"detail": str(error), "dependency": error.dependency}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-deadline-exceeded", error.dependency.encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+        finally:
+            _current.reset(token)
+            stats.record(deadline)
@@ -5,6 +5,9 @@ from email.message import EmailMessage
 
 from aiosmtplib import send
 
+from src.utils.deadline import dependency, remaining
+from src.utils.tracing import CLIENT, span
+
 with open("static/otp-content.html", "r") as file:
     OTP_CONTENT = file.read()
 
@@ -13,6 +16,7 @@ EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
 EMAIL_FROM = os.getenv("EMAIL_FROM", "Creatist <no-reply@creatist.site>")
+SMTP_TIMEOUT = 60.0
 
 
 async def send_otp_mail(email_address: str, otp: str) -> None:
@@ -22,12 +26,15 @@ async def send_otp_mail(email_address: str, otp: str) -> None:
     message["Subject"] = "Your Creatist OTP - Secure Access"
     message.set_content(OTP_CONTENT.format(otp=otp), subtype="html")
 
-    await send(
-        message,
-        hostname=EMAIL_HOST,
-        port=EMAIL_PORT,
-        start_tls=True,
-        username=EMAIL_ADDRESS,
-        password=EMAIL_PASSWORD,
-    )
+    with span("smtp send", CLIENT, **{"server.address": EMAIL_HOST, "server.port": EMAIL_PORT}):
+        async with dependency("smtp"):
+            await send(
+                message,
+                hostname=EMAIL_HOST,
+                port=EMAIL_PORT,
+                start_tls=True,
+                username=EMAIL_ADDRESS,
+                password=EMAIL_PASSWORD,
+                timeout=remaining(SMTP_TIMEOUT),
+            )
     print("EMAIL SENT")
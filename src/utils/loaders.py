@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Mapping, Optional, TypeVar
+
+from src.models.post import Post
+from src.models.user import UserCard
+from src.models.visionboard import VisionBoard
+from src.utils.db import acquire, held_connection
+from src.utils.mapping import from_rows
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Loaders of the current request (or websocket connection), by name and executor
+_scope: contextvars.ContextVar[Optional[Dict[Hashable, "DataLoader"]]] = contextvars.ContextVar("loaders", default=None)
+
+
+class DataLoader(Generic[K, V]):
+    """Batches and caches lookups by key.
+
+    Every ``load(key)`` issued in the same event-loop tick is resolved by one
+    call of ``batch(keys)``, which returns a mapping of the keys it found;
+    missing keys resolve to None. Results are kept for the loader's lifetime,
+    so a loader should live no longer than one request (see loader_scope).
+    """
+
+    def __init__(self, batch: Callable[[List[K]], Awaitable[Mapping[K, V]]], max_batch_size: int = 1000):
+        self._batch = batch
+        self.max_batch_size = max_batch_size
+        self._results: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+        self.batches = 0
+
+    def load(self, key: K) -> Awaitable[Optional[V]]:
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(self._dispatch)
+        # Shielded so one cancelled caller does not cancel the lookup for the others
+        return asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: Optional[V]) -> None:
+        if key not in self._results:
+            future = self._results[key] = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+
+    def forget(self, key: K) -> None:
+        future = self._results.get(key)
+        if future is not None and future.done():
+            del self._results[key]
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            asyncio.ensure_future(self._run(keys[start:start + self.max_batch_size]))
+
+    async def _run(self, keys: List[K]) -> None:
+        self.batches += 1
+        try:
+            values = await self._batch(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._results.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+                    # Retrieved here so a lookup nobody awaits any more does not log a warning
+                    future.exception()
+            return
+        for key in keys:
+            future = self._results[key]
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+@contextlib.contextmanager
+def loader_scope() -> Iterator[None]:
+    """Share loaders (and their results) until exit; inside an open scope this does nothing"""
+    if _scope.get() is not None:
+        yield
+        return
+    token = _scope.set({})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def get_loader(name: Hashable, batch: Callable[[List[Any]], Awaitable[Mapping[Any, Any]]]) -> DataLoader:
+    """The scope's loader called ``name``, created with ``batch`` on first use; outside a scope, a new loader"""
+    loaders = _scope.get()
+    if loaders is None:
+        return DataLoader(batch)
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = DataLoader(batch)
+    return loader
+
+
+class LoaderScopeMiddleware:
+    """ASGI middleware opening a loader scope per HTTP request.
+
+    Websocket handlers open one per received message instead: a scope
+    spanning a whole connection would serve results as stale as the
+    connection is old.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with loader_scope():
+            await self.app(scope, receive, send)
+
+
+USER_CARD_COLUMNS = (
+    "id, name, username, description, profile_image_url, genres, "
+    "payment_mode, work_mode, location, rating, city, country"
+)
+
+
+async def fetch_user_cards(executor, user_ids: List[uuid.UUID]) -> Dict[uuid.UUID, UserCard]:
+    rows = await executor.fetch(f"SELECT {USER_CARD_COLUMNS} FROM users WHERE id = ANY($1::uuid[])", user_ids)
+    return {card.id: card for card in from_rows(UserCard, rows)}
+
+
+async def fetch_posts(executor, post_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Post]:
+    rows = await executor.fetch("SELECT * FROM posts WHERE id = ANY($1::uuid[]) AND deleted_at IS NULL", post_ids)
+    return {post.id: post for post in from_rows(Post, rows)}
+
+
+async def fetch_visionboards(executor, visionboard_ids: List[uuid.UUID]) -> Dict[uuid.UUID, VisionBoard]:
+    rows = await executor.fetch(
+        """
+        SELECT id, name, description, start_date, end_date, status, created_at, updated_at, created_by
+        FROM visionboards WHERE id = ANY($1::uuid[])
+        """,
+        visionboard_ids,
+    )
+    return {board.id: board for board in from_rows(VisionBoard, rows)}
+
+
+# ``executor`` is a pool, or a connection the caller holds for as long as it uses the loader.
+# A pool gives way to the connection the calling task already holds (see db.acquire), since
+# the batch runs in a task of its own where acquire() could not find it; otherwise each
+# batch acquires its connection through db.acquire, so that read_only routing applies.
+
+def _loader(name: str, fetch: Callable[[Any, List[Any]], Awaitable[Mapping[Any, Any]]], executor) -> DataLoader:
+    executor = held_connection() or executor
+    if not hasattr(executor, "acquire"):
+        return get_loader((name, executor), lambda keys: fetch(executor, keys))
+
+    async def batch(keys):
+        async with acquire(executor) as conn:
+            return await fetch(conn, keys)
+
+    return get_loader((name, executor), batch)
+
+
+def user_loader(executor) -> DataLoader[uuid.UUID, UserCard]:
+    return _loader("users", fetch_user_cards, executor)
+
+
+def post_loader(executor) -> DataLoader[uuid.UUID, Post]:
+    return _loader("posts", fetch_posts, executor)
+
+
+def visionboard_loader(executor) -> DataLoader[uuid.UUID, VisionBoard]:
+    return _loader("visionboards", fetch_visionboards, executor)
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import atexit
+import itertools
 import logging
 import logging.handlers
 import os
-from collections import deque, namedtuple
-from datetime import datetime
-from typing import Iterable
-
-from pytz import timezone
+import queue
+import sys
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
 
 # Get environment
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "development")
@@ -27,8 +30,8 @@ filehandler = logging.handlers.RotatingFileHandler(
     maxBytes=1024 * 1024 * 5,  # 5MB
     backupCount=5,  # Keep 5 backup files
     mode="a",
+    delay=True,
 )
-filehandler.setLevel(log_level)
 
 # Production-friendly formatter
 if ENVIRONMENT == "production":
@@ -55,66 +58,246 @@ class Record(namedtuple("Record", ["time", "name", "levelname", "msg"])):
         return self.__str__()
 
 
+class RingBuffer:
+    """
+    Fixed-size buffer keeping the most recent items, without a lock.
+
+    Each append claims a slot from an itertools.count (a single atomic step
+    under the GIL) and overwrites it, so writers never wait on each other or
+    on readers. snapshot() returns the surviving items, oldest first.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._slots: List[Optional[tuple]] = [None] * capacity
+        self._sequence = itertools.count()
+
+    def append(self, item) -> None:
+        seq = next(self._sequence)
+        self._slots[seq % self.capacity] = (seq, item)
+
+    def snapshot(self) -> list:
+        return [item for _, item in sorted(slot for slot in list(self._slots) if slot is not None)]
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the raw LogRecords in a RingBuffer; nothing is formatted until they are read"""
+
+    def __init__(self, ring: RingBuffer):
+        super().__init__()
+        self.ring = ring
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Handler.handle takes the handler lock around emit(); the ring needs none
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return bool(rv)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.ring.append(record)
+
+
+_MUTABLE_ARGS = (list, dict, set, bytearray)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that enqueues the record mostly as it is.
+
+    The stock prepare() formats the message on the calling thread so that the
+    record can be pickled; the listener here lives in the same process, so
+    formatting is left to the writer thread. Two things cannot wait for it:
+    containers among the args, which the caller may change before the record
+    is written, are formatted into the message now, and a traceback is
+    formatted into exc_text while its frames are still those of the error.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        values = args.values() if isinstance(args, dict) else args or ()
+        if isinstance(args, dict) or any(isinstance(value, _MUTABLE_ARGS) for value in values):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec: Optional[str]) -> Dict[str, int]:
+    """Per-module levels from "name=LEVEL,..." (e.g. LOG_LEVELS="src.routes.ws_chat=DEBUG,httpx=WARNING")"""
+    levels: Dict[str, int] = {}
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        name, sep, level = entry.partition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if not sep or not isinstance(value, int):
+            raise ValueError(f"Invalid LOG_LEVELS entry: {entry.strip()!r}")
+        levels[name.strip()] = value
+    return levels
+
+
+class ChannelHandler(logging.Handler):
+    """
+    The writer thread's handler: records of a logger with a channel of its own
+    (see add_channel) go to that channel's handler only, the rest to the
+    default handlers. Handler levels are respected.
+    """
+
+    def __init__(self, defaults: Iterable[logging.Handler]):
+        super().__init__()
+        self.defaults = list(defaults)
+        self.channels: Dict[str, logging.Handler] = {}
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        flushed = getattr(record, "flushed", None)
+        if flushed is not None:
+            flushed.set()
+            return False
+        channel = self.channels.get(record.name)
+        for handler in [channel] if channel is not None else self.defaults:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def close(self) -> None:
+        for handler in [*self.defaults, *self.channels.values()]:
+            handler.close()
+        super().close()
+
+
+recent = RingBuffer(int(os.environ.get("LOG_RING_SIZE", "1024")))
+module_levels: Dict[str, int] = {}
+_listener: Optional[logging.handlers.QueueListener] = None
+_channels: Optional[ChannelHandler] = None
+
+
+def configure_logging(levels: Optional[str] = None) -> None:
+    """
+    Route every log record through a queue to a background writer thread.
+
+    The root logger gets a single DeferredQueueHandler; a QueueListener
+    thread formats records and writes them to stderr, logs/log.log and the
+    in-memory ring, or to a logger's own channel (see add_channel). The root
+    level comes from LOG_LEVEL and per-module levels from LOG_LEVELS.
+    Calling it again only reapplies the levels.
+    """
+    global _listener, _channels
+    root_level = os.environ.get("LOG_LEVEL", LOG_LEVEL).upper()
+    logging.getLogger().setLevel(getattr(logging, root_level, logging.INFO))
+    module_levels.update(parse_levels(levels if levels is not None else os.environ.get("LOG_LEVELS")))
+    for name, level in module_levels.items():
+        logging.getLogger(name).setLevel(level)
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(formatter)
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _channels = ChannelHandler([console, filehandler, RingBufferHandler(recent)])
+    _listener = logging.handlers.QueueListener(records, _channels)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(records))
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def add_channel(name: str, handler: logging.Handler) -> None:
+    """Write the records of logger ``name`` with ``handler`` only, on the writer thread"""
+    if _channels is None:
+        configure_logging()
+    _channels.channels[name] = handler
+
+
+def remove_channel(name: str) -> None:
+    """Stop writing ``name`` to its channel, once the records queued so far are written"""
+    flush_logging()
+    handler = _channels.channels.pop(name, None) if _channels is not None else None
+    if handler is not None:
+        handler.close()
+
+
+def flush_logging(timeout: float = 5.0) -> bool:
+    """Wait until the writer thread has written every record queued so far"""
+    if _listener is None:
+        return True
+    flushed = threading.Event()
+    _listener.queue.put(logging.makeLogRecord({"flushed": flushed}))
+    return flushed.wait(timeout)
+
+
+def shutdown_logging() -> None:
+    """Stop the writer thread after it has written every queued record"""
+    global _listener, _channels
+    if _listener is None:
+        return
+    listener, _listener, _channels = _listener, None, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
 class CustomLogger:
     def __init__(self, name: str):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(log_level)
-        self.logger.addHandler(filehandler)
-
-        self._recent_logs = deque(maxlen=1024)
+        if name not in module_levels:
+            self.logger.setLevel(log_level)
 
+    # stacklevel=2 so that funcName names the caller rather than this wrapper
     def debug(self, *args, **kwargs):
+        kwargs.setdefault("stacklevel", 2)
         self.logger.debug(*args, **kwargs)
-        self._recent_logs.append((datetime.now(timezone("UTC")), "debug", args, kwargs))
 
     def info(self, *args, **kwargs):
+        kwargs.setdefault("stacklevel", 2)
         self.logger.info(*args, **kwargs)
-        self._recent_logs.append((datetime.now(timezone("UTC")), "info", args, kwargs))
 
     def warning(self, *args, **kwargs):
+        kwargs.setdefault("stacklevel", 2)
         self.logger.warning(*args, **kwargs)
-        self._recent_logs.append(
-            (datetime.now(timezone("UTC")), "warning", args, kwargs)
-        )
 
     def error(self, *args, **kwargs):
+        kwargs.setdefault("stacklevel", 2)
         self.logger.error(*args, **kwargs)
-        self._recent_logs.append((datetime.now(timezone("UTC")), "error", args, kwargs))
 
     def critical(self, *args, **kwargs):
+        kwargs.setdefault("stacklevel", 2)
         self.logger.critical(*args, **kwargs)
-        self._recent_logs.append(
-            (datetime.now(timezone("UTC")), "critical", args, kwargs)
-        )
 
     @property
     def recent_logs(self) -> Iterable[Record]:
         """
         Returns the most recent logs.
         """
-        for time, level, args, kwargs in self._recent_logs:
-            formatted_message = self.logger.makeRecord(
-                self.logger.name,
-                getattr(logging, level.upper()),
-                fn="",
-                lno=0,
-                msg=args[0] if args else "",
-                args=args[1:],
-                exc_info=kwargs.get("exc_info", None),
-            )
+        for record in recent.snapshot():
+            if record.name != self.logger.name:
+                continue
             yield Record(
-                time=time,
-                name=formatted_message.name,
-                levelname=formatted_message.levelname,
-                msg=formatted_message.getMessage(),
+                time=datetime.fromtimestamp(record.created, timezone.utc),
+                name=record.name,
+                levelname=record.levelname,
+                msg=record.getMessage(),
             )
 
 
+_loggers: Dict[str, CustomLogger] = {}
+
+
 def get_logger(name: str) -> CustomLogger:
     """
-    Returns a CustomLogger instance for the given name.
+    Returns the CustomLogger for the given name, creating it on first use.
     """
-    return CustomLogger(name)
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, CustomLogger(name))
+    return logger
 
 
+configure_logging()
 log = get_logger("app")
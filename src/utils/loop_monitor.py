@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from src.utils import metrics
+
+# The module-level monitor is configured at import, which can precede the app's load_dotenv()
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Frames under this directory are the application's; the blocking site is the innermost of them
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+loop_lag = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer callback",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+).labels()
+loop_blocks = metrics.counter("event_loop_blocks_total", "Times the event loop was blocked past the threshold").labels()
+
+
+def blocking_site(stack: traceback.StackSummary) -> str:
+    """``path:line in function`` of the innermost application frame (the innermost frame otherwise)"""
+    frame = next((f for f in reversed(stack) if f.filename.startswith(_ROOT) and "site-packages" not in f.filename), None)
+    frame = frame or stack[-1]
+    return f"{os.path.relpath(frame.filename, _ROOT)}:{frame.lineno} in {frame.name}"
+
+
+class LoopMonitor:
+    """Measures event loop lag and captures the stack of whatever blocks the loop.
+
+    A task sleeps ``interval`` seconds at a time and observes how late it
+    wakes up into ``event_loop_lag_seconds``. A watchdog thread checks the
+    task's heartbeat: once the loop is ``threshold`` seconds overdue it
+    captures the loop thread's stack while the blocking code is still
+    running, so each stall is attributed to the code that caused it. Stalls
+    are counted by site (the innermost application frame) with their
+    longest duration and latest stack.
+
+    With ``debug`` the loop also runs in asyncio debug mode, logging every
+    callback slower than ``threshold`` from the ``asyncio`` logger. Debug
+    mode slows every task switch down; it is meant for staging.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        debug: bool = False,
+        max_captures: int = 50,
+        max_sites: int = 200,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self.max_sites = max_sites
+        self.captures: Deque[Dict[str, Any]] = deque(maxlen=max_captures)
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocks = 0
+        # Captures and sites are written by the watchdog thread and read on the loop
+        self._lock = threading.Lock()
+        self._beat = 0.0
+        self._captured_beat: Optional[float] = None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._saved_debug: Optional[tuple] = None
+
+    @classmethod
+    def from_env(cls) -> "LoopMonitor":
+        return cls(
+            interval=float(os.environ.get("LOOP_LAG_INTERVAL_MS", "100")) / 1000,
+            threshold=float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", "100")) / 1000,
+            debug=os.environ.get("LOOP_DEBUG", "false").lower() in ("1", "true", "yes"),
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start measuring the running loop; a no-op when already running"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if self.debug:
+            self._saved_debug = (self._loop.get_debug(), self._loop.slow_callback_duration)
+            self._loop.set_debug(True)
+            self._loop.slow_callback_duration = self.threshold
+        self._beat = time.monotonic()
+        self._task = self._loop.create_task(self._probe(), name="loop-monitor")
+        if self.threshold > 0:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+        if self._saved_debug is not None:
+            self._loop.set_debug(self._saved_debug[0])
+            self._loop.slow_callback_duration = self._saved_debug[1]
+            self._saved_debug = None
+
+    async def _probe(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._beat - self.interval)
+            loop_lag.observe(lag)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if self.threshold > 0 and lag >= self.threshold:
+                self.blocks += 1
+                loop_blocks.inc()
+                self._finish_capture(lag)
+
+    def _finish_capture(self, lag: float) -> None:
+        """Record the full length of the stall the watchdog caught while it was still going"""
+        blocked_ms = round(lag * 1000, 1)
+        with self._lock:
+            capture, self._pending = self._pending, None
+            if capture is None:
+                return
+            site = self.sites.get(capture["site"])
+            if site is not None:
+                site["total_ms"] = round(site["total_ms"] + blocked_ms - capture["blocked_ms"], 1)
+                site["max_ms"] = max(site["max_ms"], blocked_ms)
+            capture["blocked_ms"] = blocked_ms
+
+    def _watch(self) -> None:
+        poll = max(self.threshold / 4, 0.005)
+        while not self._stopped.wait(poll):
+            beat = self._beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue >= self.threshold and beat != self._captured_beat:
+                self._captured_beat = beat
+                self._capture(overdue)
+
+    def _capture(self, overdue: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        del frame
+        site = blocking_site(stack)
+        capture = {
+            "at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "site": site,
+            "blocked_ms": round(overdue * 1000, 1),
+            "stack": [line.rstrip() for line in stack.format()[-20:]],
+        }
+        with self._lock:
+            self.captures.append(capture)
+            stats = self.sites.get(site)
+            if stats is None and len(self.sites) < self.max_sites:
+                stats = self.sites[site] = {"site": site, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "stack": None}
+            if stats is not None:
+                stats["count"] += 1
+                stats["total_ms"] = round(stats["total_ms"] + capture["blocked_ms"], 1)
+                stats["max_ms"] = max(stats["max_ms"], capture["blocked_ms"])
+                stats["stack"] = capture["stack"]
+            self._pending = capture
+        logger.warning(
+            "Event loop blocked for over %.0f ms at %s\n%s", overdue * 1000, site, "\n".join(capture["stack"])
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Lag so far, stall sites by total blocked time and the latest captures, newest first"""
+        with self._lock:
+            sites: List[Dict[str, Any]] = sorted((dict(s) for s in self.sites.values()), key=lambda s: -s["total_ms"])
+            captures = [dict(c) for c in reversed(self.captures)]
+        return {
+            "running": self.running,
+            "debug": self.debug,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "blocks": self.blocks,
+            "sites": sites,
+            "captures": captures,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.captures.clear()
+            self.sites.clear()
+            self._pending = None
+        self.max_lag = 0.0
+        self.blocks = 0
+
+
+loop_monitor = LoopMonitor.from_env()
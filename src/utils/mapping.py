@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import copy
+import enum
+import logging
+import os
+import types
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Type, TypeVar, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+# Re-validate every row and compare with the fast path (slow; for debugging mappings)
+VALIDATE_ALL_ROWS = os.environ.get("ROW_MAPPING_VALIDATE", "").lower() in ("1", "true", "yes")
+
+_set_attr = object.__setattr__
+
+
+def _converter(annotation: Any) -> Callable[[Any], Any]:
+    """Convert a raw column value into the field's type"""
+    origin = get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return lambda value, enum_type=annotation: value if isinstance(value, enum_type) else enum_type(value)
+    return TypeAdapter(annotation).validate_python
+
+
+def _holds_models(annotation: Any) -> bool:
+    """Whether a type mentions enums or models anywhere, e.g. List[UserGenre]"""
+    if isinstance(annotation, type) and issubclass(annotation, (enum.Enum, BaseModel)):
+        return True
+    return any(_holds_models(arg) for arg in get_args(annotation))
+
+
+def _passthrough(annotation: Any, raw: Any, validated: Any) -> bool:
+    if raw is None or type(raw) is not type(validated):
+        return False
+    return not isinstance(raw, (list, tuple, set, dict)) or not _holds_models(annotation)
+
+
+class _RowPlan:
+    """How to build one model from rows with one set of columns, learned from a validated row"""
+
+    def __init__(self, model: Type[BaseModel], keys: Tuple[str, ...], extra_keys: Tuple[str, ...], raw: Mapping[str, Any], validated: BaseModel):
+        fields = model.model_fields
+        self.model = model
+        # Columns whose Postgres value already has the field's Python type are copied as-is
+        self.conversions = [
+            (key, _converter(fields[key].annotation))
+            for key in keys
+            if key in fields and key not in extra_keys
+            and not _passthrough(fields[key].annotation, raw[key], getattr(validated, key))
+        ]
+        self.dropped = [key for key in keys if key not in fields]
+        self.defaults = [
+            (name, field)
+            for name, field in fields.items()
+            if name not in keys and name not in extra_keys
+        ]
+        self.fields_set = frozenset(key for key in keys + extra_keys if key in fields)
+
+    def build(self, row: Mapping[str, Any], extra: Dict[str, Any]):
+        values = dict(row)
+        for key, convert in self.conversions:
+            value = values[key]
+            if value is not None:
+                values[key] = convert(value)
+        for key in self.dropped:
+            del values[key]
+        for name, field in self.defaults:
+            values[name] = field.default_factory() if field.default_factory is not None else copy.copy(field.default)
+        if extra:
+            values.update(extra)
+
+        # Equivalent to model_construct without its per-field bookkeeping
+        instance = self.model.__new__(self.model)
+        _set_attr(instance, "__dict__", values)
+        _set_attr(instance, "__pydantic_fields_set__", set(self.fields_set))
+        _set_attr(instance, "__pydantic_extra__", None)
+        _set_attr(instance, "__pydantic_private__", None)
+        return instance
+
+
+_plans: Dict[Tuple[type, Tuple[str, ...], Tuple[str, ...]], _RowPlan] = {}
+
+
+def from_row(model: Type[M], row: Mapping[str, Any], **extra: Any) -> M:
+    """Build ``model`` from a database row.
+
+    The first row of each (model, columns) shape is fully validated, and the
+    plan learned from it skips pydantic validation for later rows: columns
+    Postgres already returns as the field's Python type are copied as-is and
+    only the rest (enums, nested models, numeric casts) are converted.
+    ``extra`` values are trusted. Set ROW_MAPPING_VALIDATE=1 to validate every row.
+    """
+    return _from_row(model, tuple(row.keys()), row, extra)
+
+
+def from_rows(model: Type[M], rows: Iterable[Mapping[str, Any]]) -> List[M]:
+    """Build a list of ``model`` from rows that all share the same columns"""
+    rows = list(rows)
+    if not rows:
+        return []
+    keys = tuple(rows[0].keys())
+    plan = _plans.get((model, keys, ()))
+    if plan is None or VALIDATE_ALL_ROWS:
+        return [_from_row(model, keys, row, {}) for row in rows]
+    try:
+        return [plan.build(row, {}) for row in rows]
+    except (ValueError, TypeError):
+        return [_from_row(model, keys, row, {}) for row in rows]
+
+
+def _from_row(model: Type[M], keys: Tuple[str, ...], row: Mapping[str, Any], extra: Dict[str, Any]) -> M:
+    shape = (model, keys, tuple(extra))
+    plan = _plans.get(shape)
+    if plan is None:
+        # Validate the first row of a shape so a mismatched query fails loudly
+        instance = model(**dict(row), **extra)
+        _plans[shape] = _RowPlan(model, keys, tuple(extra), row, instance)
+        return instance
+
+    try:
+        instance = plan.build(row, extra)
+    except (ValueError, TypeError):
+        # Let pydantic raise its usual error for the offending row
+        return model(**dict(row), **extra)
+
+    if VALIDATE_ALL_ROWS:
+        validated = model(**dict(row), **extra)
+        if validated.model_dump() != instance.model_dump():
+            logger.warning(f"Fast row mapping for {model.__name__} differs from validation on columns {keys}")
+        return validated
+    return instance
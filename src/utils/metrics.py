@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import functools
+import inspect
+import time
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.utils.access_log import route_template
+
+# Latency buckets in seconds, from well under a millisecond to the longest request deadline
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The handler operation (e.g. "post.get_feed") running in this task; queries and
+# Supabase calls are attributed to it
+_operation: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("metrics_operation", default=None)
+
+
+def current_operation(default: str = "other") -> str:
+    return _operation.get() or default
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """A named metric with one child per combination of label values.
+
+    Children are created on first use and kept, so callers on a hot path
+    can hold on to ``metric.labels(...)``. Updates are plain attribute
+    arithmetic without locks: every observation happens on the event loop
+    thread.
+    """
+
+    kind = "untyped"
+    child = _CounterChild
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        return self.child()
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            yield self.name, _labels(self.labelnames, values), child.value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+    child = _GaugeChild
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip((*child.bounds, float("inf")), child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labelnames, values, f'le="{_number(bound)}"'), cumulative
+            yield f"{self.name}_sum", _labels(self.labelnames, values), child.sum
+            yield f"{self.name}_count", _labels(self.labelnames, values), cumulative
+
+
+class Collected(Metric):
+    """A metric read from elsewhere when scraped: ``collect()`` returns (label values, value) pairs"""
+
+    def __init__(self, name: str, kind: str, help: str, labelnames: Sequence[str], collect: Callable[[], Iterable[Tuple[Sequence[Any], float]]]):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for values, value in self.collect():
+            yield self.name, _labels(self.labelnames, values), value
+
+
+class Registry:
+    """Metrics by name, rendered in the Prometheus text exposition format.
+
+    Registering a name again replaces the earlier metric, so collectors set
+    up at application startup can be registered on every start.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, help, labelnames, buckets))
+
+
+def collected(name: str, kind: str, help: str, labelnames: Sequence[str], collect) -> Collected:
+    return registry.register(Collected(name, kind, help, labelnames, collect))
+
+
+request_latency = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+handler_latency = histogram("handler_duration_seconds", "Handler method latency", ("operation",))
+handler_errors = counter("handler_errors_total", "Handler method calls that raised", ("operation",))
+query_latency = histogram("db_query_duration_seconds", "asyncpg query time by the handler operation that ran it", ("operation",))
+supabase_latency = histogram("supabase_request_duration_seconds", "Supabase (PostgREST) request latency", ("operation", "status"))
+
+
+def instrumented(component: str):
+    """Class decorator timing every public async method as operation "<component>.<method>".
+
+    While a method runs, the queries (db.PoolTelemetry) and Supabase calls
+    it makes are attributed to its operation; nested handler calls keep the
+    outermost operation.
+    """
+    def decorator(cls):
+        for attr, method in list(vars(cls).items()):
+            if not attr.startswith("_") and inspect.iscoroutinefunction(method):
+                setattr(cls, attr, _timed(method, f"{component}.{attr}"))
+        return cls
+
+    return decorator
+
+
+def _timed(method, operation: str):
+    latency = handler_latency.labels(operation)
+    errors = handler_errors.labels(operation)
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = _operation.set(operation) if _operation.get() is None else None
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
+            if token is not None:
+                _operation.reset(token)
+
+    return wrapper
+
+
+def observe_query(elapsed: float) -> None:
+    query_latency.labels(current_operation()).observe(elapsed)
+
+
+def install_httpx_metrics(client) -> None:
+    """Time each request of an httpx.AsyncClient into supabase_request_duration_seconds"""
+    async def on_request(request) -> None:
+        request.extensions["metrics_started"] = time.perf_counter()
+        request.extensions["metrics_operation"] = current_operation()
+
+    async def on_response(response) -> None:
+        started = response.request.extensions.get("metrics_started")
+        if started is not None:
+            operation = response.request.extensions["metrics_operation"]
+            supabase_latency.labels(operation, response.status_code).observe(time.perf_counter() - started)
+
+    client.event_hooks["request"].append(on_request)
+    client.event_hooks["response"].append(on_response)
+
+
+def register_pools(pools: Callable[[], Dict[str, Any]]) -> None:
+    """Expose the stats() of the InstrumentedPools returned by ``pools()``, keyed by role"""
+    def reader(pick: Callable[[Dict[str, Any]], float]):
+        def collect():
+            for role, pool in pools().items():
+                if pool is not None and hasattr(pool, "stats"):
+                    yield (role,), pick(pool.stats())
+        return collect
+
+    collected("db_pool_size", "gauge", "Open connections", ("pool",), reader(itemgetter("size")))
+    collected("db_pool_idle", "gauge", "Idle connections", ("pool",), reader(itemgetter("idle")))
+    collected("db_pool_in_use", "gauge", "Connections held by requests", ("pool",), reader(itemgetter("in_use")))
+    collected("db_pool_max_size", "gauge", "Connection limit", ("pool",), reader(itemgetter("max_size")))
+    collected("db_pool_acquires_total", "counter", "Connections acquired", ("pool",), reader(itemgetter("acquires")))
+    collected("db_pool_acquire_timeouts_total", "counter", "Acquires that timed out", ("pool",), reader(itemgetter("timeouts")))
+    collected(
+        "db_pool_acquire_wait_seconds_total", "counter", "Time spent waiting for a connection", ("pool",),
+        reader(lambda stats: stats["wait_seconds"]["sum"]),
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing each HTTP request's latency by method, route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_latency.labels(scope["method"], route_template(scope), status).observe(time.perf_counter() - start)
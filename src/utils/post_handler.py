@@ -1,15 +1,30 @@
 import uuid
 import datetime
 import logging
-from typing import List, Optional
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
 import asyncpg
 from fastapi import HTTPException
 from src.models.post import (
-    Post, PostCreate, PostUpdate, PostWithDetails, PostMedia, PostMediaCreate, PostTag, PostCollaborator, PostCollaboratorCreate, PostComment, PostCommentCreate, PostCommentUpdate
+    CollaboratorRole, Post, PostCreate, PostImport, PostUpdate, PostWithDetails, PostMedia, PostMediaCreate, PostTag, PostCollaborator, PostCollaboratorCreate, PostComment, PostCommentCreate, PostCommentNode, PostCommentUpdate
 )
+from src.utils.cache import cached, invalidates
+from src.utils.cursor import decode_cursor, encode_cursor, keyset_condition, next_cursor
+from src.utils.db import acquire, fetch_batch
+from src.utils.loaders import loader_scope, user_loader
+from src.utils.mapping import from_row, from_rows
+from src.utils.metrics import instrumented
+from src.utils.replicas import read_only
+from src.utils.single_flight import coalesce
+from src.utils.view_buffer import view_buffer
+from src.utils.visionboard_handler import VisionBoardHandler
 
 logger = logging.getLogger(__name__)
 
+# Assignment work types that carry over as a post collaborator role
+_WORK_TYPE_ROLES = {"editor", "videographer", "actor", "director"}
+
+@instrumented("post")
 class PostHandler:
     def __init__(self, pool: asyncpg.Pool):
         self.pool = pool
@@ -20,75 +35,22 @@ class PostHandler:
             raise HTTPException(status_code=503, detail="Database connection not available")
 
     async def create_post(self, post: PostCreate, user_id: uuid.UUID) -> uuid.UUID:
-        """Create a new post with comprehensive debug logging"""
+        """Create a new post with its media, tags and collaborators"""
         self._check_pool()
-        logger.info("🔧 PostHandler.create_post - Starting post creation")
-        logger.info(f"   User ID: {user_id}")
-        logger.info(f"   Post data: {post.model_dump()}")
-        
+        if not post.caption:
+            raise ValueError("Caption is required")
+
         try:
-            async with self.pool.acquire() as conn:
-                logger.debug("   ✅ Database connection acquired")
-                
-                # Auto-fetch collaborators from visionboard if visionboard_id is provided
-                collaborators = post.collaborators.copy() if post.collaborators else []
-                if post.visionboard_id:
-                    logger.debug(f"   Fetching collaborators from visionboard: {post.visionboard_id}")
-                    
-                    # Get genre assignments with work_type directly
-                    query = """
-                        SELECT ga.user_id, ga.work_type
-                        FROM genre_assignments ga
-                        JOIN genres g ON ga.genre_id = g.id
-                        WHERE g.visionboard_id = $1 AND ga.status = 'Accepted'
-                    """
-                    rows = await conn.fetch(query, post.visionboard_id)
-                    
-                    for row in rows:
-                        user_id_collab = row['user_id']
-                        work_type = row['work_type']
-                        
-                        # Skip if already in the provided collaborators list
-                        if not any(c.user_id == user_id_collab for c in collaborators):
-                            from src.models.post import PostCollaboratorCreate, CollaboratorRole
-                            
-                            # Map work_type to post collaborator role
-                            post_role = CollaboratorRole.collaborator  # Default role
-                            if work_type.lower() in ['editor', 'videographer', 'actor', 'director']:
-                                try:
-                                    post_role = CollaboratorRole(work_type.lower())
-                                except ValueError:
-                                    # If work_type doesn't match post roles, use collaborator
-                                    post_role = CollaboratorRole.collaborator
-                            
-                            collaborators.append(PostCollaboratorCreate(
-                                user_id=user_id_collab,
-                                role=post_role
-                            ))
-                            logger.debug(f"   Added collaborator: {user_id_collab} with role: {post_role} (from work_type: {work_type})")
-                
+            collaborators = list(post.collaborators)
+            if post.visionboard_id:
+                collaborators += await self._visionboard_collaborators(post.visionboard_id, collaborators)
+
+            async with acquire(self.pool) as conn:
                 async with conn.transaction():
-                    logger.debug("   ✅ Database transaction started")
-                    
-                    # Validate required fields
-                    logger.debug(f"   Validating caption: {post.caption}")
-                    if not post.caption:
-                        logger.error("   ❌ Caption is required")
-                        raise ValueError("Caption is required")
-                    
-                    logger.debug(f"   Validating status: {post.status}")
-                    logger.debug(f"   Validating visibility: {post.visibility}")
-                    
                     # If no collaborators, is_collaborative is False and no collaborators are inserted
                     is_collaborative = bool(collaborators)
-                    logger.debug(f"   Is collaborative: {is_collaborative}")
-                    logger.debug(f"   Total collaborators count: {len(collaborators)}")
-                    
                     post_id = uuid.uuid4()
-                    logger.debug(f"   Generated post ID: {post_id}")
                     
-                    # Insert main post
-                    logger.debug("   Inserting main post record...")
                     await conn.execute(
                         """
                         INSERT INTO posts (id, user_id, caption, is_collaborative, status, visibility, shared_from_post_id, visionboard_id, created_at, updated_at)
@@ -96,264 +58,228 @@ class PostHandler:
                         """,
                         post_id, user_id, post.caption, is_collaborative, post.status.value, post.visibility.value, post.shared_from_post_id, post.visionboard_id
                     )
-                    logger.debug("   ✅ Main post record inserted")
                     
-                    # Insert media
+                    # Child rows go out as one pipelined executemany per table
                     if post.media:
-                        logger.debug(f"   Inserting {len(post.media)} media items...")
-                        for i, m in enumerate(post.media):
-                            logger.debug(f"     Media {i+1}: URL={m.url}, Type={m.type}, Order={m.order}")
-                            await conn.execute(
-                                """
-                                INSERT INTO post_media (id, post_id, url, type, "order")
-                                VALUES ($1, $2, $3, $4, $5)
-                                """,
-                                uuid.uuid4(), post_id, m.url, m.type.value, m.order
-                            )
-                        logger.debug("   ✅ All media items inserted")
-                    else:
-                        logger.debug("   No media items to insert")
+                        await conn.executemany(
+                            """
+                            INSERT INTO post_media (id, post_id, url, type, "order")
+                            VALUES ($1, $2, $3, $4, $5)
+                            """,
+                            [(uuid.uuid4(), post_id, m.url, m.type.value, m.order) for m in post.media]
+                        )
                     
-                    # Insert tags
                     if post.tags:
-                        logger.debug(f"   Inserting {len(post.tags)} tags...")
-                        for i, tag in enumerate(post.tags):
-                            logger.debug(f"     Tag {i+1}: {tag}")
-                            await conn.execute(
-                                """
-                                INSERT INTO post_tags (post_id, tag) VALUES ($1, $2)
-                                ON CONFLICT DO NOTHING
-                                """,
-                                post_id, tag
-                            )
-                        logger.debug("   ✅ All tags inserted")
-                    else:
-                        logger.debug("   No tags to insert")
+                        await conn.executemany(
+                            """
+                            INSERT INTO post_tags (post_id, tag) VALUES ($1, $2)
+                            ON CONFLICT DO NOTHING
+                            """,
+                            [(post_id, tag) for tag in post.tags]
+                        )
                     
-                    # Insert collaborators
                     if collaborators:
-                        logger.debug(f"   Inserting {len(collaborators)} collaborators...")
-                        for i, c in enumerate(collaborators):
-                            logger.debug(f"     Collaborator {i+1}: User ID={c.user_id}, Role={c.role}")
-                            await conn.execute(
-                                """
-                                INSERT INTO post_collaborators (post_id, user_id, role)
-                                VALUES ($1, $2, $3)
-                                ON CONFLICT DO NOTHING
-                                """,
-                                post_id, c.user_id, c.role.value
-                            )
-                        logger.debug("   ✅ All collaborators inserted")
-                    else:
-                        logger.debug("   No collaborators to insert")
+                        await conn.executemany(
+                            """
+                            INSERT INTO post_collaborators (post_id, user_id, role)
+                            VALUES ($1, $2, $3)
+                            ON CONFLICT DO NOTHING
+                            """,
+                            [(post_id, c.user_id, c.role.value) for c in collaborators]
+                        )
                     
-                    logger.info(f"   ✅ Post created successfully with ID: {post_id}")
+                    logger.info(
+                        f"Post {post_id} created by {user_id}: {len(post.media)} media, "
+                        f"{len(post.tags)} tags, {len(collaborators)} collaborators"
+                    )
                     return post_id
                     
         except Exception as e:
-            logger.error(f"   ❌ Error in create_post: {str(e)}")
-            logger.error(f"   Error type: {type(e).__name__}")
-            logger.error(f"   Post data: {post.model_dump()}")
+            logger.error(f"Error in create_post for user {user_id}: {type(e).__name__}: {e}")
             raise
 
+    async def _visionboard_collaborators(self, visionboard_id: uuid.UUID, exclude: List[PostCollaboratorCreate]) -> List[PostCollaboratorCreate]:
+        """Accepted visionboard collaborators not already listed on the post"""
+        index = await VisionBoardHandler(self.pool).get_collaborator_index(visionboard_id)
+        listed = {c.user_id for c in exclude}
+        collaborators = []
+        for user_id, collaborator in index.items():
+            if user_id in listed:
+                continue
+            # Map work_type to post collaborator role
+            work_type = collaborator.work_type.value.lower()
+            role = CollaboratorRole.collaborator
+            if work_type in _WORK_TYPE_ROLES:
+                try:
+                    role = CollaboratorRole(work_type)
+                except ValueError:
+                    pass
+            collaborators.append(PostCollaboratorCreate(user_id=user_id, role=role))
+        return collaborators
+
+    async def import_posts(self, posts: List[PostImport], user_id: uuid.UUID) -> List[uuid.UUID]:
+        """Bulk-create posts authored by ``user_id`` with COPY, for seeding and migrations.
+
+        Runs in one transaction. Unlike create_post, collaborators are not
+        filled in from the visionboard; imports carry their own. Raises
+        ValueError for a missing caption or a ``created_at`` in the future and
+        PermissionError when ``user_id`` is not a member (creator or accepted
+        collaborator) of a post's visionboard.
+        """
+        self._check_pool()
+        if any(not post.caption for post in posts):
+            raise ValueError("Caption is required")
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for post in posts:
+            created_at = post.created_at
+            if created_at is not None and created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+            if created_at is not None and created_at > now:
+                raise ValueError(f"created_at {post.created_at.isoformat()} is in the future")
+        post_records, media_records, tag_records, collaborator_records = [], [], [], []
+        post_ids = []
+        for post in posts:
+            post_id = post.id or uuid.uuid4()
+            post_ids.append(post_id)
+            created_at = post.created_at or now
+            post_records.append((
+                post_id, user_id, post.caption, bool(post.collaborators), post.status.value,
+                post.visibility.value, post.shared_from_post_id, post.visionboard_id, created_at, created_at
+            ))
+            media_records.extend((uuid.uuid4(), post_id, m.url, m.type.value, m.order) for m in post.media)
+            # COPY cannot skip duplicates the way ON CONFLICT DO NOTHING does
+            tag_records.extend((post_id, tag) for tag in dict.fromkeys(post.tags))
+            roles = {c.user_id: c.role.value for c in reversed(post.collaborators)}
+            collaborator_records.extend((post_id, collaborator_id, role) for collaborator_id, role in roles.items())
+
+        visionboard_ids = list({post.visionboard_id for post in posts if post.visionboard_id})
+        async with acquire(self.pool) as conn:
+            if visionboard_ids:
+                member_of = await conn.fetch(
+                    """
+                    SELECT id FROM visionboards WHERE id = ANY($1::uuid[]) AND created_by = $2
+                    UNION
+                    SELECT g.visionboard_id FROM genre_assignments ga
+                    JOIN genres g ON ga.genre_id = g.id
+                    WHERE g.visionboard_id = ANY($1::uuid[]) AND ga.user_id = $2 AND ga.status = 'Accepted'
+                    """,
+                    visionboard_ids, user_id
+                )
+                denied = set(visionboard_ids) - {row["id"] for row in member_of}
+                if denied:
+                    raise PermissionError(f"Not a member of vision board(s) {', '.join(sorted(map(str, denied)))}")
+            async with conn.transaction():
+                await conn.copy_records_to_table(
+                    "posts",
+                    records=post_records,
+                    columns=["id", "user_id", "caption", "is_collaborative", "status", "visibility",
+                             "shared_from_post_id", "visionboard_id", "created_at", "updated_at"]
+                )
+                if media_records:
+                    await conn.copy_records_to_table(
+                        "post_media", records=media_records, columns=["id", "post_id", "url", "type", "order"]
+                    )
+                if tag_records:
+                    await conn.copy_records_to_table("post_tags", records=tag_records, columns=["post_id", "tag"])
+                if collaborator_records:
+                    await conn.copy_records_to_table(
+                        "post_collaborators", records=collaborator_records, columns=["post_id", "user_id", "role"]
+                    )
+
+        logger.info(f"Imported {len(post_ids)} posts for {user_id}")
+        return post_ids
+
+    @read_only
     async def get_feed(self, limit: int = 10, cursor: Optional[str] = None) -> dict:
+        """Newest posts first; raises ValueError for a malformed cursor"""
         self._check_pool()
-        import datetime
-        async with self.pool.acquire() as conn:
-            params = []
-            query = "SELECT * FROM posts WHERE deleted_at IS NULL"
-            parsed_cursor = None
-            if cursor:
-                try:
-                    if isinstance(cursor, str):
-                        parsed_cursor = datetime.datetime.fromisoformat(cursor)
-                    else:
-                        parsed_cursor = cursor
-                except Exception as e:
-                    import logging
-                    logging.warning(f"Invalid cursor format: {cursor}. Error: {e}. Fetching from latest.")
-                    parsed_cursor = None
-            if parsed_cursor:
-                query += " AND created_at < $1"
-                params.append(parsed_cursor)
-            query += " ORDER BY created_at DESC LIMIT $%d" % (len(params) + 1)
-            params.append(limit + 1)
+        params = []
+        query = "SELECT * FROM posts WHERE deleted_at IS NULL"
+        if cursor:
+            condition, values = keyset_condition(["created_at", "id"], decode_cursor(cursor), len(params) + 1)
+            query += f" AND {condition}"
+            params.extend(values)
+        query += " ORDER BY created_at DESC, id DESC LIMIT $%d" % (len(params) + 1)
+        params.append(limit + 1)
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch(query, *params)
-            posts = [await self._post_with_details(conn, row) for row in rows[:limit]]
-            next_cursor = None
-            if len(rows) > limit:
-                next_cursor = str(rows[limit - 1]['created_at'].isoformat())
-            return {"posts": posts, "nextCursor": next_cursor}
+            posts = await self._posts_with_details(conn, rows[:limit])
+        return {"posts": posts, "nextCursor": next_cursor(rows, limit, itemgetter("created_at"))}
 
     async def get_following_feed(self, user_id: uuid.UUID, limit: int = 10, cursor: Optional[str] = None) -> dict:
         """
         Get posts only from users that the logged-in user is following
         """
-        self._check_pool()
-        import datetime
-        import logging
-        async with self.pool.acquire() as conn:
-            params = [user_id]
-            
-            # Base query to get posts from users the current user is following
-            query = """
-                SELECT p.* FROM posts p
-                INNER JOIN followers f ON p.user_id = f.following_id
-                WHERE f.user_id = $1 AND p.deleted_at IS NULL
-            """
-            
-            # Parse cursor
-            if cursor:
-                try:
-                    # Handle JSON cursor format from frontend
-                    if cursor.startswith('{') and cursor.endswith('}'):
-                        import json
-                        cursor_data = json.loads(cursor)
-                        if 'cursor' in cursor_data:
-                            cursor = cursor_data['cursor']
-                            logging.info(f"Extracted cursor from JSON: {cursor}")
-                    
-                    if '_' in cursor:
-                        # Composite cursor: timestamp_postid
-                        timestamp_str, post_id_str = cursor.split('_', 1)
-                        
-                        # Fix URL encoding issue: replace space with + for timezone
-                        timestamp_str = timestamp_str.replace(' ', '+')
-                        
-                        cursor_timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                        cursor_post_id = post_id_str
-                        
-                        # Use composite cursor for more precise pagination
-                        query += " AND (p.created_at < $2 OR (p.created_at = $2 AND p.id < $3))"
-                        params.extend([cursor_timestamp, cursor_post_id])
-                        
-                        logging.info(f"Using composite cursor: timestamp={cursor_timestamp}, post_id={cursor_post_id}")
-                    else:
-                        # Simple timestamp cursor
-                        cursor_timestamp = datetime.datetime.fromisoformat(cursor)
-                        query += " AND p.created_at < $2"
-                        params.append(cursor_timestamp)
-                        
-                        logging.info(f"Using timestamp cursor: {cursor_timestamp}")
-                except Exception as e:
-                    logging.warning(f"Invalid cursor format: {cursor}. Error: {e}. Fetching from latest.")
-            
-            query += " ORDER BY p.created_at DESC, p.id DESC LIMIT $%d" % (len(params) + 1)
-            params.append(limit + 1)
-            
-            logging.info(f"Final query: {query}")
-            logging.info(f"Params: {params}")
-            
-            rows = await conn.fetch(query, *params)
-            logging.info(f"Fetched {len(rows)} rows")
-            
-            posts = [await self._post_with_details(conn, row) for row in rows[:limit]]
-            
-            next_cursor = None
-            if len(rows) > limit:
-                next_cursor = f"{rows[limit]['created_at'].isoformat()}_{rows[limit]['id']}"
-                logging.info(f"Next cursor: {next_cursor}")
-            
-            return {"posts": posts, "nextCursor": next_cursor}
+        return await self._following_feed(user_id, limit, cursor)
 
     async def get_following_feed_by_user_id(self, target_user_id: uuid.UUID, limit: int = 10, cursor: Optional[str] = None) -> dict:
         """
         Get posts from users that a specific user is following (for profile views)
         """
+        return await self._following_feed(target_user_id, limit, cursor)
+
+    @read_only
+    async def _following_feed(self, user_id: uuid.UUID, limit: int, cursor: Optional[str]) -> dict:
         self._check_pool()
-        import datetime
-        import logging
-        async with self.pool.acquire() as conn:
-            params = [target_user_id]
-            
-            # Base query to get posts from users the target user is following
-            query = """
-                SELECT p.* FROM posts p
-                INNER JOIN followers f ON p.user_id = f.following_id
-                WHERE f.user_id = $1 AND p.deleted_at IS NULL
-            """
-            
-            # Parse cursor
-            if cursor:
-                try:
-                    # Handle JSON cursor format from frontend
-                    if cursor.startswith('{') and cursor.endswith('}'):
-                        import json
-                        cursor_data = json.loads(cursor)
-                        if 'cursor' in cursor_data:
-                            cursor = cursor_data['cursor']
-                            logging.info(f"Extracted cursor from JSON: {cursor}")
-                    
-                    if '_' in cursor:
-                        # Composite cursor: timestamp_postid
-                        timestamp_str, post_id_str = cursor.split('_', 1)
-                        
-                        # Fix URL encoding issue: replace space with + for timezone
-                        timestamp_str = timestamp_str.replace(' ', '+')
-                        
-                        cursor_timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                        cursor_post_id = post_id_str
-                        
-                        # Use composite cursor for more precise pagination
-                        query += " AND (p.created_at < $2 OR (p.created_at = $2 AND p.id < $3))"
-                        params.extend([cursor_timestamp, cursor_post_id])
-                        
-                        logging.info(f"Using composite cursor: timestamp={cursor_timestamp}, post_id={cursor_post_id}")
-                    else:
-                        # Simple timestamp cursor
-                        cursor_timestamp = datetime.datetime.fromisoformat(cursor)
-                        query += " AND p.created_at < $2"
-                        params.append(cursor_timestamp)
-                        
-                        logging.info(f"Using timestamp cursor: {cursor_timestamp}")
-                except Exception as e:
-                    logging.warning(f"Invalid cursor format: {cursor}. Error: {e}. Fetching from latest.")
-            
-            query += " ORDER BY p.created_at DESC, p.id DESC LIMIT $%d" % (len(params) + 1)
-            params.append(limit + 1)
-            
-            logging.info(f"Final query: {query}")
-            logging.info(f"Params: {params}")
-            
+        params = [user_id]
+        query = """
+            SELECT p.* FROM posts p
+            INNER JOIN followers f ON p.user_id = f.following_id
+            WHERE f.user_id = $1 AND p.deleted_at IS NULL
+        """
+        if cursor:
+            condition, values = keyset_condition(["p.created_at", "p.id"], decode_cursor(cursor), len(params) + 1)
+            query += f" AND {condition}"
+            params.extend(values)
+        query += " ORDER BY p.created_at DESC, p.id DESC LIMIT $%d" % (len(params) + 1)
+        params.append(limit + 1)
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch(query, *params)
-            logging.info(f"Fetched {len(rows)} rows")
-            
-            posts = [await self._post_with_details(conn, row) for row in rows[:limit]]
-            
-            next_cursor = None
-            if len(rows) > limit:
-                next_cursor = f"{rows[limit]['created_at'].isoformat()}_{rows[limit]['id']}"
-                logging.info(f"Next cursor: {next_cursor}")
-            
-            return {"posts": posts, "nextCursor": next_cursor}
+            posts = await self._posts_with_details(conn, rows[:limit])
+        return {"posts": posts, "nextCursor": next_cursor(rows, limit, itemgetter("created_at"))}
 
     async def get_post_by_id(self, post_id: uuid.UUID) -> Optional[PostWithDetails]:
+        """The post with its details; view counters are always read fresh, the rest may be cached"""
+        post = await self._cached_post(post_id)
+        if post is None:
+            return None
+        async with acquire(self.pool) as conn:
+            view_count, unique_viewers = (await self._view_counts(conn, [post_id]))[post_id]
+        return post.model_copy(update={"view_count": view_count, "unique_viewers": unique_viewers})
+
+    @cached(tags=["post:{post_id}", "user:{result.user_id}"])
+    async def _cached_post(self, post_id: uuid.UUID) -> Optional[PostWithDetails]:
+        # Cached without view counters: views flush on their own schedule and invalidate nothing
         self._check_pool()
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             row = await conn.fetchrow("SELECT * FROM posts WHERE id = $1 AND deleted_at IS NULL", post_id)
             if not row:
                 return None
-            return await self._post_with_details(conn, row)
+            return (await self._posts_with_details(conn, [row], views=False))[0]
 
+    @invalidates("post:{post_id}")
     async def like_post(self, post_id: uuid.UUID, user_id: uuid.UUID):
         self._check_pool()
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             await conn.execute(
                 "INSERT INTO post_likes (user_id, post_id, created_at) VALUES ($1, $2, now()) ON CONFLICT DO NOTHING",
                 user_id, post_id
             )
 
+    @invalidates("post:{post_id}")
     async def unlike_post(self, post_id: uuid.UUID, user_id: uuid.UUID):
         self._check_pool()
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             await conn.execute(
                 "DELETE FROM post_likes WHERE user_id = $1 AND post_id = $2",
                 user_id, post_id
             )
 
+    @invalidates("post:{post_id}")
     async def add_comment(self, post_id: uuid.UUID, user_id: uuid.UUID, comment: PostCommentCreate) -> PostComment:
         self._check_pool()
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             comment_id = uuid.uuid4()
             await conn.execute(
                 """
@@ -372,9 +298,11 @@ class PostHandler:
                 deleted_at=None
             )
 
+    @read_only
     async def get_comments(self, post_id: uuid.UUID, parent_id: Optional[uuid.UUID] = None, limit: int = 10, cursor: Optional[str] = None) -> List[PostComment]:
+        """Oldest first; raises ValueError for a malformed cursor"""
         self._check_pool()
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             params = [post_id]
             query = "SELECT * FROM post_comments WHERE post_id = $1 AND deleted_at IS NULL"
             if parent_id:
@@ -383,165 +311,268 @@ class PostHandler:
             else:
                 query += " AND parent_comment_id IS NULL"
             if cursor:
-                query += " AND created_at > $%d" % (len(params) + 1)
-                params.append(cursor)
-            query += " ORDER BY created_at ASC LIMIT $%d" % (len(params) + 1)
+                condition, values = keyset_condition(["created_at", "id"], decode_cursor(cursor, "asc"), len(params) + 1)
+                query += f" AND {condition}"
+                params.extend(values)
+            query += " ORDER BY created_at ASC, id ASC LIMIT $%d" % (len(params) + 1)
             params.append(limit)
             rows = await conn.fetch(query, *params)
-            return [PostComment(**dict(row)) for row in rows]
+            return from_rows(PostComment, rows)
+
+    @read_only
+    async def get_comment_thread(
+        self,
+        post_id: uuid.UUID,
+        parent_id: Optional[uuid.UUID] = None,
+        limit: int = 10,
+        depth: int = 3,
+        replies: int = 5,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """A bounded comment tree in one recursive query.
 
-    async def get_user_posts(self, user_id: uuid.UUID, limit: int = 10, cursor: Optional[str] = None) -> List[PostWithDetails]:
+        Returns up to ``limit`` comments directly under ``parent_id`` (top-level
+        comments when None), each with up to ``replies`` replies, ``depth`` levels
+        deep. Every node carries its full reply_count and, when replies were cut
+        off, a next_cursor for fetching the rest with ``parent_id`` set to it.
+        Raises ValueError for a malformed cursor.
+        """
         self._check_pool()
-        async with self.pool.acquire() as conn:
-            params = [user_id]
-            query = "SELECT * FROM posts WHERE user_id = $1 AND deleted_at IS NULL"
-            if cursor:
-                query += " AND created_at < $2"
-                params.append(cursor)
-            query += " ORDER BY created_at DESC LIMIT $%d" % (len(params) + 1)
-            params.append(limit)
+        params = [post_id, limit, depth, replies]
+        if parent_id:
+            params.append(parent_id)
+            root_filter = "c.parent_comment_id = $%d" % len(params)
+        else:
+            root_filter = "c.parent_comment_id IS NULL"
+        if cursor:
+            condition, values = keyset_condition(["c.created_at", "c.id"], decode_cursor(cursor, "asc"), len(params) + 1)
+            root_filter += f" AND {condition}"
+            params.extend(values)
+
+        # Roots are fetched one past the limit to tell whether more exist; the
+        # extra root is not expanded
+        query = f"""
+            WITH RECURSIVE thread AS (
+                (
+                    SELECT c.id, c.post_id, c.user_id, c.content, c.parent_comment_id, c.created_at,
+                           1 AS depth, row_number() OVER (ORDER BY c.created_at, c.id) AS position
+                    FROM post_comments c
+                    WHERE c.post_id = $1 AND {root_filter} AND c.deleted_at IS NULL
+                    ORDER BY c.created_at, c.id
+                    LIMIT $2 + 1
+                )
+                UNION ALL
+                SELECT r.id, r.post_id, r.user_id, r.content, r.parent_comment_id, r.created_at,
+                       t.depth + 1, r.position
+                FROM thread t
+                CROSS JOIN LATERAL (
+                    SELECT c.id, c.post_id, c.user_id, c.content, c.parent_comment_id, c.created_at,
+                           row_number() OVER (ORDER BY c.created_at, c.id) AS position
+                    FROM post_comments c
+                    WHERE c.parent_comment_id = t.id AND c.deleted_at IS NULL
+                    ORDER BY c.created_at, c.id
+                    LIMIT $4
+                ) r
+                WHERE t.depth < $3 AND (t.depth > 1 OR t.position <= $2)
+            )
+            SELECT t.id, t.post_id, t.user_id, t.content, t.parent_comment_id, t.created_at, t.depth, (SELECT count(*) FROM post_comments c
+                             WHERE c.parent_comment_id = t.id AND c.deleted_at IS NULL) AS reply_count
+            FROM thread t
+            ORDER BY t.depth, t.created_at, t.id
+        """
+        async with acquire(self.pool) as conn:
+            rows = await conn.fetch(query, *params)
+
+        nodes = {}
+        roots = []
+        for node in from_rows(PostCommentNode, rows):
+            nodes[node.id] = node
+            parent = nodes.get(node.parent_comment_id) if node.depth > 1 else None
+            if parent is not None:
+                parent.replies.append(node)
+            else:
+                roots.append(node)
+
+        next_page = None
+        if len(roots) > limit:
+            roots = roots[:limit]
+            next_page = encode_cursor(roots[-1].created_at, roots[-1].id, "asc")
+        for node in nodes.values():
+            if node.replies and node.reply_count > len(node.replies):
+                node.next_cursor = encode_cursor(node.replies[-1].created_at, node.replies[-1].id, "asc")
+        return {"comments": roots, "nextCursor": next_page}
+
+    @read_only
+    async def get_user_posts(self, user_id: uuid.UUID, limit: int = 10, cursor: Optional[str] = None) -> dict:
+        """Newest first; raises ValueError for a malformed cursor"""
+        self._check_pool()
+        params = [user_id]
+        query = "SELECT * FROM posts WHERE user_id = $1 AND deleted_at IS NULL"
+        if cursor:
+            condition, values = keyset_condition(["created_at", "id"], decode_cursor(cursor), len(params) + 1)
+            query += f" AND {condition}"
+            params.extend(values)
+        query += " ORDER BY created_at DESC, id DESC LIMIT $%d" % (len(params) + 1)
+        params.append(limit + 1)
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch(query, *params)
-            return [await self._post_with_details(conn, row) for row in rows]
+            posts = await self._posts_with_details(conn, rows[:limit])
+        return {"posts": posts, "nextCursor": next_cursor(rows, limit, itemgetter("created_at"))}
 
-    async def search_posts(self, q: str, tag: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None) -> List[PostWithDetails]:
+    @read_only
+    async def search_posts(self, q: str, tag: Optional[str] = None, limit: int = 10, cursor: Optional[str] = None) -> dict:
+        """Newest first; raises ValueError for a malformed cursor"""
         self._check_pool()
-        async with self.pool.acquire() as conn:
-            params = [f"%{q}%"]
-            query = "SELECT * FROM posts WHERE deleted_at IS NULL AND caption ILIKE $1"
-            if tag:
-                query += " AND id IN (SELECT post_id FROM post_tags WHERE tag = $2)"
-                params.append(tag)
-            if cursor:
-                query += " AND created_at < $%d" % (len(params) + 1)
-                params.append(cursor)
-            query += " ORDER BY created_at DESC LIMIT $%d" % (len(params) + 1)
-            params.append(limit)
+        params = [f"%{q}%"]
+        query = "SELECT * FROM posts WHERE deleted_at IS NULL AND caption ILIKE $1"
+        if tag:
+            query += " AND id IN (SELECT post_id FROM post_tags WHERE tag = $2)"
+            params.append(tag)
+        if cursor:
+            condition, values = keyset_condition(["created_at", "id"], decode_cursor(cursor), len(params) + 1)
+            query += f" AND {condition}"
+            params.extend(values)
+        query += " ORDER BY created_at DESC, id DESC LIMIT $%d" % (len(params) + 1)
+        params.append(limit + 1)
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch(query, *params)
-            return [await self._post_with_details(conn, row) for row in rows]
+            posts = await self._posts_with_details(conn, rows[:limit])
+        return {"posts": posts, "nextCursor": next_cursor(rows, limit, itemgetter("created_at"))}
 
+    @coalesce()
+    @read_only
     async def get_trending_posts(self, limit: int = 10, cursor: Optional[str] = None) -> dict:
-        import datetime
-        import logging
+        """Most liked, then most viewed, then newest; raises ValueError for a malformed cursor.
+
+        Pages are keyed on the counters as they were when the page was read, so
+        a post whose counters change between pages can move across the boundary.
+        """
         self._check_pool()
-        async with self.pool.acquire() as conn:
-            query = """
-                SELECT p.* FROM posts p
-                LEFT JOIN (
-                    SELECT post_id, COUNT(*) as like_count FROM post_likes GROUP BY post_id
-                ) l ON p.id = l.post_id
-                LEFT JOIN (
-                    SELECT post_id, COUNT(*) as view_count FROM post_views GROUP BY post_id
-                ) v ON p.id = v.post_id
-                WHERE p.deleted_at IS NULL
-            """
-            params = []
-            
-            # Parse cursor
-            if cursor:
-                try:
-                    # Handle JSON cursor format from frontend
-                    if cursor.startswith('{') and cursor.endswith('}'):
-                        import json
-                        cursor_data = json.loads(cursor)
-                        if 'cursor' in cursor_data:
-                            cursor = cursor_data['cursor']
-                            logging.info(f"Extracted cursor from JSON: {cursor}")
-                    
-                    # Handle composite cursor format
-                    if '_' in cursor:
-                        # Composite cursor: timestamp_postid
-                        timestamp_str, post_id_str = cursor.split('_', 1)
-                        
-                        # Fix URL encoding issue: replace space with + for timezone
-                        timestamp_str = timestamp_str.replace(' ', '+')
-                        
-                        cursor_timestamp = datetime.datetime.fromisoformat(timestamp_str)
-                        cursor_post_id = post_id_str
-                        
-                        # Use composite cursor for more precise pagination
-                        query += " AND (p.created_at < $1 OR (p.created_at = $1 AND p.id < $2))"
-                        params.extend([cursor_timestamp, cursor_post_id])
-                        
-                        logging.info(f"Using composite cursor: timestamp={cursor_timestamp}, post_id={cursor_post_id}")
-                    else:
-                        # Simple timestamp cursor
-                        # Fix URL encoding issue: replace space with + for timezone
-                        cursor = cursor.replace(' ', '+')
-                        cursor_timestamp = datetime.datetime.fromisoformat(cursor)
-                        query += " AND p.created_at < $1"
-                        params.append(cursor_timestamp)
-                        
-                        logging.info(f"Using timestamp cursor: {cursor_timestamp}")
-                except Exception as e:
-                    logging.warning(f"Invalid cursor format: {cursor}. Error: {e}. Fetching from latest.")
-            
-            query += " ORDER BY COALESCE(l.like_count,0) DESC, COALESCE(v.view_count,0) DESC, p.created_at DESC, p.id DESC LIMIT $%d" % (len(params) + 1)
-            params.append(limit + 1)
-            
-            logging.info(f"Final query: {query}")
-            logging.info(f"Params: {params}")
-            
+        query = """
+            SELECT p.*, COALESCE(l.like_count, 0) AS trending_likes, COALESCE(v.view_count, 0) AS trending_views
+            FROM posts p
+            LEFT JOIN (
+                SELECT post_id, COUNT(*) as like_count FROM post_likes GROUP BY post_id
+            ) l ON p.id = l.post_id
+            LEFT JOIN post_view_stats v ON p.id = v.post_id
+            WHERE p.deleted_at IS NULL
+        """
+        params = []
+        if cursor:
+            condition, values = keyset_condition(
+                ["COALESCE(l.like_count, 0)", "COALESCE(v.view_count, 0)", "p.created_at", "p.id"],
+                decode_cursor(cursor, key_size=3),
+                len(params) + 1,
+            )
+            query += f" AND {condition}"
+            params.extend(values)
+        query += " ORDER BY COALESCE(l.like_count, 0) DESC, COALESCE(v.view_count, 0) DESC, p.created_at DESC, p.id DESC LIMIT $%d" % (len(params) + 1)
+        params.append(limit + 1)
+
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch(query, *params)
-            logging.info(f"Fetched {len(rows)} rows")
-            
-            posts = [await self._post_with_details(conn, row) for row in rows[:limit]]
-            
-            next_cursor = None
-            if len(rows) > limit:
-                # Use composite cursor: timestamp_postid for uniqueness
-                next_cursor = f"{rows[limit]['created_at'].isoformat()}_{rows[limit]['id']}"
-                logging.info(f"Next cursor: {next_cursor}")
-            
-            posts = [p for p in posts if p is not None]
-            logger.debug(f"Trending posts returned: {len(posts)}")
-            return {"posts": posts, "nextCursor": next_cursor}
+            posts = await self._posts_with_details(conn, rows[:limit])
+
+        posts = [p for p in posts if p is not None]
+        logger.debug(f"Trending posts returned: {len(posts)}")
+        return {
+            "posts": posts,
+            "nextCursor": next_cursor(rows, limit, lambda row: (row["trending_likes"], row["trending_views"], row["created_at"])),
+        }
 
+    def record_views(self, post_ids: List[uuid.UUID], viewer_id: uuid.UUID) -> int:
+        """Buffer impressions; they reach post_view_stats on the next flush"""
+        return view_buffer.record(dict.fromkeys(post_ids), viewer_id)
+
+    @invalidates("post:{post_id}")
     async def soft_delete_post(self, post_id: uuid.UUID, user_id: uuid.UUID):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             await conn.execute(
                 "UPDATE posts SET deleted_at = now() WHERE id = $1 AND user_id = $2",
                 post_id, user_id
             )
 
-    async def _post_with_details(self, conn, row) -> PostWithDetails:
-        try:
-            # Do NOT parse post_id as UUID here; keep as string for trending/feed endpoints
+    async def _posts_with_details(self, conn, rows, views: bool = True) -> List[PostWithDetails]:
+        """Hydrate a page of post rows with a fixed number of round trips, whatever its size"""
+        if not rows:
+            return []
+        post_ids = [row['id'] for row in rows]
+        # Media, tags, collaborators, counts and the first 3 root comments of every post in one statement
+        queries = [
+            ("SELECT * FROM post_media WHERE post_id = ANY($1::uuid[]) ORDER BY post_id, \"order\" ASC", post_ids),
+            ("SELECT post_id, tag FROM post_tags WHERE post_id = ANY($1::uuid[])", post_ids),
+            ("SELECT post_id, user_id, role FROM post_collaborators WHERE post_id = ANY($1::uuid[])", post_ids),
+            ("SELECT post_id, COUNT(*) AS count FROM post_likes WHERE post_id = ANY($1::uuid[]) GROUP BY post_id", post_ids),
+            (
+                "SELECT post_id, COUNT(*) AS count FROM post_comments"
+                " WHERE post_id = ANY($1::uuid[]) AND deleted_at IS NULL GROUP BY post_id",
+                post_ids,
+            ),
+            (
+                "SELECT * FROM ("
+                " SELECT c.*, row_number() OVER (PARTITION BY c.post_id ORDER BY c.created_at ASC) AS position"
+                " FROM post_comments c"
+                " WHERE c.post_id = ANY($1::uuid[]) AND c.parent_comment_id IS NULL AND c.deleted_at IS NULL"
+                ") ranked WHERE position <= 3 ORDER BY post_id, created_at ASC",
+                post_ids,
+            ),
+        ]
+        if views:
+            queries.append((_VIEW_STATS_QUERY, post_ids))
+        media_rows, tag_rows, collab_rows, like_rows, comment_rows, top_comment_rows, *view_rows = await fetch_batch(conn, *queries)
+        # Authors of the whole page in one more query
+        author_ids = list({row['user_id'] for row in rows})
+        with loader_scope():
+            authors = dict(zip(author_ids, await user_loader(conn).load_many(author_ids)))
+
+        media = _group(from_rows(PostMedia, media_rows), lambda m: m.post_id)
+        tags = _group(tag_rows, itemgetter('post_id'))
+        collaborators = _group(from_rows(PostCollaborator, collab_rows), lambda c: c.post_id)
+        like_counts = {r['post_id']: r['count'] for r in like_rows}
+        comment_counts = {r['post_id']: r['count'] for r in comment_rows}
+        top_comments = _group(from_rows(PostComment, top_comment_rows), lambda c: c.post_id)
+        counts = _with_pending_views(post_ids, view_rows[0]) if views else {}
+        # Do NOT parse post ids as UUID here; keep as returned for trending/feed endpoints
+        posts = []
+        for row in rows:
             post_id = row['id']
-            # Media
-            media_rows = await conn.fetch("SELECT * FROM post_media WHERE post_id = $1 ORDER BY \"order\" ASC", post_id)
-            media = [PostMedia(**dict(m)) for m in media_rows]
-            # Tags
-            tag_rows = await conn.fetch("SELECT tag FROM post_tags WHERE post_id = $1", post_id)
-            tags = [r['tag'] for r in tag_rows]
-            # Collaborators
-            collab_rows = await conn.fetch("SELECT post_id, user_id, role FROM post_collaborators WHERE post_id = $1", post_id)
-            collaborators = [PostCollaborator(**dict(c)) for c in collab_rows]
-            # Like count
-            like_count = await conn.fetchval("SELECT COUNT(*) FROM post_likes WHERE post_id = $1", post_id) or 0
-            # Comment count
-            comment_count = await conn.fetchval("SELECT COUNT(*) FROM post_comments WHERE post_id = $1 AND deleted_at IS NULL", post_id) or 0
-            # View count
-            view_count = await conn.fetchval("SELECT COUNT(*) FROM post_views WHERE post_id = $1", post_id) or 0
-            # Author name (optional, join users)
-            author_name = await conn.fetchval("SELECT name FROM users WHERE id = $1", row['user_id'])
-            # Top comments (first 3 root comments)
-            top_comment_rows = await conn.fetch(
-                "SELECT * FROM post_comments WHERE post_id = $1 AND parent_comment_id IS NULL AND deleted_at IS NULL ORDER BY created_at ASC LIMIT 3",
-                post_id
-            )
-            top_comments = [PostComment(**dict(tc)) for tc in top_comment_rows]
-            return PostWithDetails(
-                **dict(row),
-                media=media,
-                tags=tags,
-                collaborators=collaborators,
-                like_count=like_count,
-                comment_count=comment_count,
+            view_count, unique_viewers = counts.get(post_id, (0, 0))
+            author = authors.get(row['user_id'])
+            posts.append(from_row(
+                PostWithDetails,
+                row,
+                media=media.get(post_id, []),
+                tags=[r['tag'] for r in tags.get(post_id, [])],
+                collaborators=collaborators.get(post_id, []),
+                like_count=like_counts.get(post_id, 0),
+                comment_count=comment_counts.get(post_id, 0),
                 view_count=view_count,
-                author_name=author_name,
-                top_comments=top_comments
-            )
-        except Exception as e:
-            import logging
-            logging.error(f"Error in _post_with_details for post_id={row.get('id')}: {e}")
-            return None 
\ No newline at end of file
+                unique_viewers=unique_viewers,
+                author_name=author.name if author else None,
+                top_comments=top_comments.get(post_id, []),
+            ))
+        return posts
+
+    async def _view_counts(self, conn, post_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Tuple[int, int]]:
+        """(view_count, unique_viewers) per post: flushed totals plus views still buffered in this process"""
+        return _with_pending_views(post_ids, await conn.fetch(_VIEW_STATS_QUERY, post_ids))
+
+
+_VIEW_STATS_QUERY = "SELECT post_id, view_count, unique_viewers FROM post_view_stats WHERE post_id = ANY($1::uuid[])"
+
+
+def _with_pending_views(post_ids, rows) -> Dict[uuid.UUID, Tuple[int, int]]:
+    flushed = {row['post_id']: (row['view_count'], row['unique_viewers']) for row in rows}
+    counts = {}
+    for post_id in post_ids:
+        view_count, unique_viewers = flushed.get(post_id, (0, 0))
+        counts[post_id] = (view_count + view_buffer.pending_views(post_id), unique_viewers)
+    return counts
+
+
+def _group(items, key) -> Dict[uuid.UUID, list]:
+    """Items by post id, keeping their order"""
+    grouped: Dict[uuid.UUID, list] = {}
+    for item in items:
+        grouped.setdefault(key(item), []).append(item)
+    return grouped
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import datetime
+import logging
+import logging.handlers
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from src.utils.metrics import current_operation
+from src.utils.tracing import normalize_sql
+
+# The module-level query log is configured at import, which can precede the app's load_dotenv()
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Statements beyond this many distinct ones are counted together
+OTHER = "<other>"
+
+
+class StatementStats:
+    """Totals for one normalized statement"""
+
+    __slots__ = ("calls", "total", "max", "errors", "slow", "operations")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.slow = 0
+        # Calls by handler operation (e.g. "post.get_feed")
+        self.operations: Dict[str, int] = {}
+
+    def to_dict(self, statement: str) -> Dict[str, Any]:
+        return {
+            "statement": statement,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "slow": self.slow,
+            "errors": self.errors,
+            "operations": dict(sorted(self.operations.items(), key=lambda item: -item[1])),
+        }
+
+
+def redact_args(args) -> List[str]:
+    """Parameter types (and sizes) only: values can be emails, passwords or message text"""
+    redacted = []
+    for value in args or ():
+        if isinstance(value, (str, bytes, list, tuple, dict)):
+            redacted.append(f"{type(value).__name__}[{len(value)}]")
+        else:
+            redacted.append(type(value).__name__)
+    return redacted
+
+
+class QueryLog:
+    """Per-statement query totals, a log of slow queries and sampled EXPLAIN plans.
+
+    Every query an instrumented pool runs (see db.PoolTelemetry) is counted
+    under its normalized SQL and the handler operation that ran it. Queries
+    slower than ``threshold`` seconds are logged with their redacted
+    parameters; a ``explain_rate`` share of them, at most once per statement
+    every ``explain_interval`` seconds, have their plan captured in a
+    separate task: EXPLAIN (ANALYZE, BUFFERS) for reads, plain EXPLAIN for
+    writes, always inside a read-only transaction that is rolled back. Plans
+    go to a rotating file.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.2,
+        explain_rate: float = 0.0,
+        explain_interval: float = 300.0,
+        explain_timeout: float = 10.0,
+        explain_file: Optional[str] = "logs/explain.log",
+        max_statements: int = 2000,
+        max_slow: int = 200,
+    ):
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self.explain_interval = explain_interval
+        self.explain_timeout = explain_timeout
+        self.explain_file = explain_file
+        self.max_statements = max_statements
+        self.statements: Dict[str, StatementStats] = {}
+        self.slow: Deque[Dict[str, Any]] = deque(maxlen=max_slow)
+        self.plans: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._explained: Dict[str, float] = {}
+        self._explaining: set = set()
+        self._plan_file: Optional[logging.Handler] = None
+
+    @classmethod
+    def from_env(cls) -> "QueryLog":
+        return cls(
+            threshold=float(os.environ.get("SLOW_QUERY_MS", "200")) / 1000,
+            explain_rate=float(os.environ.get("SLOW_QUERY_EXPLAIN_RATE", "0")),
+            explain_interval=float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", "300")),
+            explain_file=os.environ.get("SLOW_QUERY_EXPLAIN_FILE", "logs/explain.log") or None,
+        )
+
+    def observe(self, query, pool=None) -> None:
+        """Count an asyncpg LoggedQuery; ``pool`` (an asyncpg pool) is used to capture plans"""
+        statement = normalize_sql(query.query)
+        if statement.startswith("EXPLAIN"):
+            return
+        stats = self.statements.get(statement)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                statement = OTHER
+            stats = self.statements.setdefault(statement, StatementStats())
+        operation = current_operation()
+        stats.calls += 1
+        stats.total += query.elapsed
+        stats.max = max(stats.max, query.elapsed)
+        stats.operations[operation] = stats.operations.get(operation, 0) + 1
+        if query.exception is not None:
+            stats.errors += 1
+        if query.elapsed < self.threshold:
+            return
+
+        stats.slow += 1
+        entry = {
+            "at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "statement": statement,
+            "params": redact_args(query.args),
+            "operation": operation,
+            "duration_ms": round(query.elapsed * 1000, 3),
+            "error": repr(query.exception) if query.exception is not None else None,
+        }
+        self.slow.append(entry)
+        logger.warning("Slow query (%.1f ms) in %s: %s params=%s", entry["duration_ms"], operation, statement, entry["params"])
+        if pool is not None and statement != OTHER and self._should_explain(statement):
+            # A fresh context: the plan is not part of the request's deadline or trace
+            asyncio.get_running_loop().create_task(
+                self._explain(pool, statement, query.query, query.args, entry), context=contextvars.Context()
+            )
+
+    def _should_explain(self, statement: str) -> bool:
+        if self.explain_rate <= 0 or statement in self._explaining or random.random() >= self.explain_rate:
+            return False
+        now = time.monotonic()
+        if now - self._explained.get(statement, -self.explain_interval) < self.explain_interval:
+            return False
+        self._explained[statement] = now
+        return True
+
+    async def _explain(self, pool, statement: str, sql: str, args, entry: Dict[str, Any]) -> None:
+        reads = statement.split(" ", 1)[0].upper() in ("SELECT", "WITH")
+        explain = "EXPLAIN (ANALYZE, BUFFERS)" if reads else "EXPLAIN"
+        self._explaining.add(statement)
+        try:
+            async with pool.acquire() as conn:
+                tr = conn.transaction(readonly=True)
+                await tr.start()
+                try:
+                    rows = await conn.fetch(f"{explain} {sql}", *(args or ()), timeout=self.explain_timeout)
+                finally:
+                    await tr.rollback()
+        except Exception as e:
+            logger.info("EXPLAIN of slow query failed: %r", e)
+            return
+        finally:
+            self._explaining.discard(statement)
+        plan = {**entry, "plan": "\n".join(row[0] for row in rows)}
+        if self.explain_file:
+            await asyncio.to_thread(self._write_plan, plan)
+        self.plans.append(plan)
+
+    def _write_plan(self, plan: Dict[str, Any]) -> None:
+        if self._plan_file is None:
+            os.makedirs(os.path.dirname(self.explain_file) or ".", exist_ok=True)
+            self._plan_file = logging.handlers.RotatingFileHandler(
+                self.explain_file, maxBytes=5 * 1024 * 1024, backupCount=3, delay=True
+            )
+        header = f"-- {plan['at']} {plan['operation']} {plan['duration_ms']} ms params={plan['params']}"
+        self._plan_file.emit(logging.makeLogRecord({"msg": f"{header}\n{plan['statement']}\n{plan['plan']}\n"}))
+
+    def top(self, limit: int = 20, order: str = "total") -> List[Dict[str, Any]]:
+        """The ``limit`` statements with the highest total, mean or max time, or most calls"""
+        keys = {
+            "total": lambda item: item[1].total,
+            "mean": lambda item: item[1].total / item[1].calls,
+            "max": lambda item: item[1].max,
+            "calls": lambda item: item[1].calls,
+        }
+        if order not in keys:
+            raise ValueError(f"order must be one of {sorted(keys)}")
+        ranked = sorted(self.statements.items(), key=keys[order], reverse=True)[:limit]
+        return [stats.to_dict(statement) for statement, stats in ranked]
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.slow.clear()
+        self.plans.clear()
+        self._explained.clear()
+
+
+query_log = QueryLog.from_env()
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from typing import Any, Dict, Hashable, List, Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+# The module-level router is configured at import, which can precede the app's load_dotenv()
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Connection-level failures, meaning a replica is unreachable rather than that a query is wrong.
+# Timeouts, OSErrors though they are, do not count (see is_replica_failure): a replica whose pool
+# times out is busy, not down, and asyncpg's InterfaceError is misuse of a connection.
+REPLICA_ERRORS = (
+    OSError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def is_replica_failure(error: BaseException) -> bool:
+    return isinstance(error, REPLICA_ERRORS) and not isinstance(error, asyncio.TimeoutError)
+
+
+class _ReadRoute:
+    """Where the connections of one read_only call came from"""
+    replica: Any = None
+
+
+# Set while a read_only method runs
+_route: contextvars.ContextVar[Optional[_ReadRoute]] = contextvars.ContextVar("db_read_route", default=None)
+# The user the current request acts for, set by ReplicaStickinessMiddleware
+_actor: contextvars.ContextVar[Optional[Hashable]] = contextvars.ContextVar("db_actor", default=None)
+
+
+class ReplicaRouter:
+    """Routes the reads of read_only handler methods to replica pools.
+
+    Replicas are used round-robin. A user who wrote within ``sticky_seconds``
+    reads from the primary, so they see their own writes despite replication
+    lag; so does anything running inside a unit of work on the primary. A
+    replica that fails is skipped for ``retry_after`` seconds and the read is
+    retried on the primary. Without replicas every read goes to the primary.
+    """
+
+    def __init__(self, sticky_seconds: float = 5.0, retry_after: float = 30.0, max_actors: int = 10000):
+        self.sticky_seconds = sticky_seconds
+        self.retry_after = retry_after
+        self.max_actors = max_actors
+        self.primary = None
+        self.replicas: List[Any] = []
+        self._next = 0
+        # id(replica) -> monotonic time after which it is tried again
+        self._down: Dict[int, float] = {}
+        # actor -> monotonic time until which their reads stay on the primary
+        self._writes: Dict[Hashable, float] = {}
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_env(cls) -> "ReplicaRouter":
+        return cls(
+            sticky_seconds=float(os.environ.get("DB_REPLICA_STICKY_SECONDS", "5")),
+            retry_after=float(os.environ.get("DB_REPLICA_RETRY_SECONDS", "30")),
+        )
+
+    def configure(self, primary, replicas: List[Any]) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._next = 0
+        self._down.clear()
+        self._writes.clear()
+
+    async def connect(self, primary, dsns: List[str], settings=None, **kwargs) -> None:
+        """Create a pool per replica DSN and route to them; unreachable replicas are left out"""
+        from src.utils.db import create_pool
+
+        replicas = []
+        for dsn in dsns:
+            try:
+                replicas.append(await create_pool(dsn, settings, **kwargs))
+            except Exception as e:
+                logger.error(f"Failed to connect to read replica {len(replicas) + 1}: {e}")
+        self.configure(primary, replicas)
+
+    async def close(self) -> None:
+        replicas, self.replicas = self.replicas, []
+        for replica in replicas:
+            await replica.close()
+
+    def note_write(self, actor: Optional[Hashable] = None) -> None:
+        """Keep ``actor`` (default: the current request's user) on the primary for sticky_seconds"""
+        actor = actor if actor is not None else _actor.get()
+        if actor is None or not self.replicas:
+            return
+        now = time.monotonic()
+        if len(self._writes) >= self.max_actors:
+            self._writes = {key: until for key, until in self._writes.items() if until > now}
+        self._writes[actor] = now + self.sticky_seconds
+
+    def is_sticky(self, actor: Optional[Hashable] = None) -> bool:
+        actor = actor if actor is not None else _actor.get()
+        return actor is not None and self._writes.get(actor, 0.0) > time.monotonic()
+
+    def _choose(self):
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if self._down.get(id(replica), 0.0) <= now:
+                return replica
+        return None
+
+    def pool_for(self, pool):
+        """The pool a connection requested from ``pool`` should come from"""
+        route = _route.get()
+        if route is None or pool is not self.primary or not self.replicas:
+            return pool
+        replica = None if self.is_sticky() else self._choose()
+        if replica is None:
+            self.primary_reads += 1
+            return pool
+        route.replica = replica
+        self.replica_reads += 1
+        return replica
+
+    def mark_down(self, replica, error: Optional[BaseException] = None) -> None:
+        self._down[id(replica)] = time.monotonic() + self.retry_after
+        self.fallbacks += 1
+        logger.warning(f"Read replica failed, using the primary for {self.retry_after:g}s: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "replicas": len(self.replicas),
+            "healthy": sum(1 for replica in self.replicas if self._down.get(id(replica), 0.0) <= now),
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "fallbacks": self.fallbacks,
+            "sticky_users": sum(1 for until in self._writes.values() if until > now),
+        }
+
+
+def read_only(method):
+    """Decorator sending the connections an async handler method acquires to a replica.
+
+    The method must only read, and must tolerate data a moment old. When the
+    replica fails mid-call the whole method is run again on the primary.
+    The wrapped method keeps its signature.
+    """
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        if not router.replicas or _route.get() is not None:
+            return await method(*args, **kwargs)
+        route = _ReadRoute()
+        token = _route.set(route)
+        try:
+            return await method(*args, **kwargs)
+        except REPLICA_ERRORS as e:
+            if route.replica is None or not is_replica_failure(e):
+                raise
+            router.mark_down(route.replica, e)
+        finally:
+            _route.reset(token)
+        return await method(*args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """ASGI middleware recording who each request acts for, and their writes.
+
+    The user comes from the bearer token; a request with any method but
+    GET, HEAD or OPTIONS counts as a write, both when it starts and when it
+    finishes. Does nothing while there are no replicas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not router.replicas:
+            await self.app(scope, receive, send)
+            return
+        actor = _bearer_subject(scope)
+        if actor is None:
+            await self.app(scope, receive, send)
+            return
+        token = _actor.set(actor)
+        writes = scope["type"] == "http" and scope["method"] not in SAFE_METHODS
+        try:
+            if writes:
+                router.note_write(actor)
+            await self.app(scope, receive, send)
+        finally:
+            if writes:
+                router.note_write(actor)
+            _actor.reset(token)
+
+
+def _bearer_subject(scope) -> Optional[Hashable]:
+    from src.utils.token_handler import TokenHandler
+
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not credentials:
+                return None
+            token = TokenHandler(os.environ.get("JWT_SECRET", "")).decode_token(credentials)
+            return token.sub if token is not None else None
+    return None
+
+
+router = ReplicaRouter.from_env()
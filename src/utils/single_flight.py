@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Every group created by coalesce() or cache.cached(), by name, for reporting
+groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result with concurrent callers.
+
+    A caller arriving while the call for its key is in flight awaits that
+    call instead of starting its own. With ``ttl`` the result is also kept
+    for that many seconds (micro-caching), so reads right after it are served
+    from memory; failures are never kept. When ``ttl`` is None it is read
+    from SINGLE_FLIGHT_TTL on every call (default 0: in-flight sharing only).
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = None, max_entries: int = 1024):
+        self.name = name
+        self._ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._results: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self.cached = 0
+
+    @property
+    def ttl(self) -> float:
+        if self._ttl is not None:
+            return self._ttl
+        # Read at call time: .env is loaded after handler modules are imported
+        return float(os.environ.get("SINGLE_FLIGHT_TTL", "0"))
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Share of calls answered without running the underlying call"""
+        return 1 - self.executions / self.calls if self.calls else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": self.shared,
+            "cached": self.cached,
+            "coalescing_ratio": round(self.coalescing_ratio, 4),
+        }
+
+    def record_hit(self) -> None:
+        """Count a call answered from a cache in front of this group"""
+        self.calls += 1
+        self.cached += 1
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``call()``, shared with every concurrent caller using ``key``"""
+        self.calls += 1
+        entry = self._results.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._results.move_to_end(key)
+                self.cached += 1
+                return entry[1]
+            del self._results[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            self.executions += 1
+            # A task of its own, so a cancelled caller does not cancel the others
+            future = self._inflight[key] = asyncio.ensure_future(call())
+            future.add_done_callback(functools.partial(self._finished, key))
+        return await asyncio.shield(future)
+
+    def _finished(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        ttl = self.ttl
+        if ttl <= 0 or future.cancelled() or future.exception() is not None:
+            return
+        self._results[key] = (time.monotonic() + ttl, future.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        self._results.clear()
+
+
+def coalesce(ttl: Optional[float] = None, max_entries: int = 1024):
+    """Decorator sharing concurrent identical calls of an async handler method.
+
+    Calls are keyed on the method and its arguments (after defaults are
+    applied), not on the instance, so handlers built per request share
+    flights; they must be interchangeable, e.g. use the same pool. Calls
+    with unhashable arguments run uncoalesced. The wrapped method keeps its
+    signature, and ``method.flight`` is its SingleFlight.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+        flight = groups[method.__qualname__] = SingleFlight(method.__qualname__, ttl, max_entries)
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.items())[1:]
+            try:
+                hash(key)
+            except TypeError:
+                return await method(self, *args, **kwargs)
+            return await flight.do(key, lambda: method(self, *args, **kwargs))
+
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
+
+
+def coalescing_stats() -> Dict[str, Dict[str, Any]]:
+    """stats() of every coalesced method"""
+    return {name: flight.stats() for name, flight in groups.items()}
@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from src.utils.access_log import route_template
+
+# The module-level tracer is configured at import, which can precede the app's load_dotenv()
+load_dotenv()
+
+# OpenTelemetry span kinds and status codes, as numbered in OTLP
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+SERVICE_NAME = "creatist-backend"
+SCOPE_NAME = "src.utils.tracing"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation of a trace, with OpenTelemetry ids, kind, attributes and status"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, kind: int = INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = STATUS_UNSET
+        self.message = ""
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns is not None else None
+
+    def set_error(self, message: str) -> None:
+        self.status = STATUS_ERROR
+        self.message = message
+
+    @property
+    def traceparent(self) -> str:
+        """W3C Trace Context header naming this span as the parent"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.message} if self.message else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_document(spans: List[Span]) -> Dict[str, Any]:
+    """An OTLP/JSON ExportTraceServiceRequest holding ``spans``"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": [span.to_otlp() for span in spans]}],
+        }]
+    }
+
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans"""
+
+    def __init__(self, max_spans: int = 4096):
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def spans(self) -> List[Span]:
+        return list(self._spans)
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class FileExporter:
+    """Appends finished spans to a file as OTLP/JSON lines, written by a background thread.
+
+    Each line is one ExportTraceServiceRequest, the format the OpenTelemetry
+    Collector's otlpjsonfile receiver reads. Spans ended before start() or
+    after stop() are dropped.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self, span: Span) -> None:
+        if self._thread is not None:
+            self._queue.put(span)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._thread = threading.Thread(target=self._write, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after writing every queued span"""
+        if self._thread is None:
+            return
+        thread, self._thread = self._thread, None
+        self._queue.put(None)
+        thread.join()
+
+    def _write(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as out:
+            while True:
+                batch, done = [self._queue.get()], False
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get())
+                if None in batch:
+                    batch, done = [span for span in batch if span is not None], True
+                if batch:
+                    out.write(json.dumps(otlp_document(batch), separators=(",", ":")) + "\n")
+                    out.flush()
+                if done:
+                    return
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None when invalid"""
+    match = _TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+class Tracer:
+    """Starts root spans for sampled requests and exports every span as it ends.
+
+    A trace is sampled when the caller's traceparent says so or, without
+    one, with probability ``sample_rate``. Inside an unsampled request no
+    spans are created, so instrumentation costs a context variable lookup.
+    """
+
+    def __init__(self, exporter=None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        kind = os.environ.get("TRACING_EXPORTER", "memory").lower()
+        if kind == "file":
+            exporter = FileExporter(os.environ.get("TRACING_FILE", "logs/traces.jsonl"))
+        elif kind == "memory":
+            exporter = InMemoryExporter(int(os.environ.get("TRACING_MEMORY_SPANS", "4096")))
+        elif kind == "none":
+            exporter = None
+        else:
+            raise ValueError(f"Unknown TRACING_EXPORTER: {kind}")
+        return cls(exporter, float(os.environ.get("TRACING_SAMPLE_RATE", "0.1")))
+
+    def start(self) -> None:
+        if self.exporter is not None:
+            self.exporter.start()
+
+    def stop(self) -> None:
+        if self.exporter is not None:
+            self.exporter.stop()
+
+    def root(self, name: str, traceparent: Optional[str] = None, kind: int = SERVER, **attributes) -> Optional[Span]:
+        """A root span for an incoming request, or None when the trace is not sampled"""
+        if self.exporter is None:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = f"{random.getrandbits(128):032x}", None, random.random() < self.sample_rate
+        return Span(name, trace_id, parent_id, kind, attributes) if sampled else None
+
+    def end(self, span: Span, end_ns: Optional[int] = None) -> None:
+        span.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+
+@contextlib.contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """A child of the current span around the block; yields None (and does nothing) outside a sampled trace"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(repr(e))
+        raise
+    finally:
+        _current.reset(token)
+        tracer.end(child)
+
+
+def record_span(name: str, duration: float, kind: int = INTERNAL, error: Optional[str] = None, **attributes) -> None:
+    """Record a child of the current span that ended just now after ``duration`` seconds"""
+    parent = _current.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    child = Span(name, parent.trace_id, parent.span_id, kind, attributes, start_ns=end_ns - int(duration * 1e9))
+    if error:
+        child.set_error(error)
+    tracer.end(child, end_ns)
+
+
+# String and numeric literals; digits inside identifiers and $n parameters are left alone
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+_SQL_SPACE = re.compile(r"\s+")
+_SQL_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(query: str) -> str:
+    """The statement with literals replaced by ? and whitespace collapsed, for use as db.statement"""
+    return _SQL_LISTS.sub("(?)", _SQL_LITERALS.sub("?", _SQL_SPACE.sub(" ", query).strip()))
+
+
+def record_query(query) -> None:
+    """Span for an asyncpg query, from a LoggedQuery passed to a connection's query logger"""
+    if _current.get() is None:
+        return
+    statement = normalize_sql(query.query)
+    error = repr(query.exception) if query.exception is not None else None
+    record_span(
+        statement.split(" ", 1)[0].upper() or "query", query.elapsed, CLIENT, error,
+        **{"db.system": "postgresql", "db.statement": statement},
+    )
+
+
+def instrument_redis(client):
+    """Trace the commands and pipelines of a redis.asyncio client; returns the client"""
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    async def traced_execute_command(*args, **options):
+        if _current.get() is None:
+            return await execute_command(*args, **options)
+        operation = str(args[0]).upper()
+        with span(f"redis {operation}", CLIENT, **{"db.system": "redis", "db.operation": operation}):
+            return await execute_command(*args, **options)
+
+    def traced_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def traced_execute(*exec_args, **exec_kwargs):
+            if _current.get() is None:
+                return await execute(*exec_args, **exec_kwargs)
+            operations = " ".join(str(command[0][0]).upper() for command in pipe.command_stack)
+            with span("redis PIPELINE", CLIENT, **{"db.system": "redis", "db.operation": operations}):
+                return await execute(*exec_args, **exec_kwargs)
+
+        pipe.execute = traced_execute
+        return pipe
+
+    client.execute_command = traced_execute_command
+    client.pipeline = traced_pipeline
+    return client
+
+
+def install_httpx_tracing(client, service: str) -> None:
+    """Span each request of an httpx.AsyncClient and pass the trace on in its traceparent header.
+
+    Only the URL path is recorded: PostgREST filters carry user data in the query string.
+    """
+    async def on_request(request) -> None:
+        parent = _current.get()
+        if parent is None:
+            return
+        child = Span(f"{service} {request.method}", parent.trace_id, parent.span_id, CLIENT, {
+            "http.request.method": request.method,
+            "server.address": request.url.host,
+            "url.path": request.url.path,
+        })
+        request.headers["traceparent"] = child.traceparent
+        request.extensions["trace_span"] = child
+
+    async def on_response(response) -> None:
+        child = response.request.extensions.get("trace_span")
+        if child is None:
+            return
+        child.attributes["http.response.status_code"] = response.status_code
+        if response.status_code >= 500:
+            child.set_error(f"HTTP {response.status_code}")
+        tracer.end(child)
+
+    client.event_hooks["request"].append(on_request)
+    client.event_hooks["response"].append(on_response)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class TracingMiddleware:
+    """ASGI middleware giving each sampled HTTP request and WebSocket connection a root span.
+
+    The span is named after the route template once routing is done (e.g.
+    "GET /posts/{post_id}"); a caller's traceparent header continues its trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        method = scope.get("method", "WS")
+        root = tracer.root(f"{method} {scope['path']}", _header(scope, b"traceparent"))
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+        status = None
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            root.set_error(repr(e))
+            raise
+        finally:
+            _current.reset(token)
+            route = route_template(scope)
+            root.name = f"{method} {route}"
+            root.attributes.update({"http.request.method": method, "http.route": route})
+            if status is not None:
+                root.attributes["http.response.status_code"] = status
+                if status >= 500:
+                    root.set_error(f"HTTP {status}")
+            tracer.end(root)
+
+
+tracer = Tracer.from_env()
+
+
+def recent_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    """The latest traces held by an in-memory exporter, newest first, each with its spans in start order"""
+    if not isinstance(tracer.exporter, InMemoryExporter):
+        return []
+    traces: Dict[str, List[Span]] = {}
+    for finished in reversed(tracer.exporter.spans()):
+        if finished.trace_id not in traces:
+            if len(traces) == limit:
+                continue
+            traces[finished.trace_id] = []
+        traces[finished.trace_id].append(finished)
+    return [
+        {
+            "trace_id": trace_id,
+            "spans": [
+                {
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "start_ns": s.start_ns,
+                    "duration_ms": round(s.duration_ms, 3),
+                    "attributes": s.attributes,
+                    **({"error": s.message} if s.status == STATUS_ERROR else {}),
+                }
+                for s in sorted(spans, key=lambda s: s.start_ns)
+            ],
+        }
+        for trace_id, spans in traces.items()
+    ]
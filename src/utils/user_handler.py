@@ -8,16 +8,23 @@ import enum
 
 from dotenv import load_dotenv
 from src.models.user import (
-    User, UserUpdate, Showcase, Comment, VisionBoard,
+    User, UserProfile, UserUpdate, Showcase, Comment, VisionBoard,
     ShowCaseLike, ShowCaseBookmark, CommentUpvote,
     VisionBoardTask, Follower, Location
 )
 from supabase import AsyncClient, create_async_client, AsyncClientOptions
 from fastapi import HTTPException
 
+from src.utils.cache import cached, invalidates
+from src.utils.cursor import decode_cursor
+from src.utils.deadline import install_httpx_hooks
+from src.utils.metrics import install_httpx_metrics, instrumented
+from src.utils.tracing import install_httpx_tracing
+
 load_dotenv()
 
 _options = AsyncClientOptions()
+@instrumented("user")
 class UserHandler:
     supabase: AsyncClient
 
@@ -26,6 +33,10 @@ class UserHandler:
             os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY"),
             options=_options
         )
+        # PostgREST requests get the request's remaining deadline as their timeout
+        install_httpx_hooks(self.supabase.postgrest.session, "supabase")
+        install_httpx_metrics(self.supabase.postgrest.session)
+        install_httpx_tracing(self.supabase.postgrest.session, "supabase")
 
     # User Management Methods
     async def fetch_user(
@@ -34,7 +45,7 @@ class UserHandler:
         user_id: Union[UUID, str, None] = None,
         email: Optional[str] = None,
         password: Optional[str] = None,
-    ) -> Optional[User]:
+    ) -> Union[User, UserProfile, None]:
         if user_id:
             return await self._fetch_user_by_id(user_id)
 
@@ -46,6 +57,7 @@ class UserHandler:
         response = await self.supabase.table("users").insert(payload).execute()
         return self._parse(response.data)
 
+    @invalidates("user:{user_id}")
     async def update_user(
         self, *, user_id: Union[UUID, str], update_payload: User
     ) -> Optional[User]:
@@ -57,6 +69,7 @@ class UserHandler:
         )
         return self._parse(response.data)
 
+    @invalidates("user:{user_id}")
     async def update_user_partial(self, user_id: str, user_update: UserUpdate) -> bool:
         def to_json_serializable(val):
             if isinstance(val, list):
@@ -404,16 +417,17 @@ class UserHandler:
             .eq("password", password)
             .execute()
         )
-        print(response)
         return self._parse(response.data)
 
-    async def _fetch_user_by_id(self, user_id):
+    @cached(tags=["user:{user_id}"])
+    async def _fetch_user_by_id(self, user_id) -> Optional[UserProfile]:
+        # Cached, in Redis too, so the result is a profile without the password
         if isinstance(user_id, str):
             user_id = UUID(user_id)
         response = await (
             self.supabase.table("users").select("*").eq("id", user_id).execute()
         )
-        return self._parse(response.data)
+        return self._parse(response.data, model=UserProfile)
 
     def _parse(self, response: list, count: int = 1, model: type = User):
         if len(response) == 0:
@@ -465,16 +479,30 @@ class UserHandler:
         }
         await self.supabase.table("direct_messages").insert(payload).execute()
 
-    async def get_direct_messages(self, user_id: str, other_user_id: str, limit: int = 50, before: str = None):
-        # Fetch messages where (sender_id=user_id AND receiver_id=other_user_id) OR (sender_id=other_user_id AND receiver_id=user_id)
+    async def get_direct_messages(self, user_id: str, other_user_id: str, limit: int = 50, before: str = None, cursor: str = None):
+        """Messages between two users, newest first.
+
+        ``cursor`` continues after a previous page; ``before`` is the older
+        timestamp-only filter. Raises ValueError for a malformed cursor.
+        """
+        # (sender_id=user_id AND receiver_id=other_user_id) OR (sender_id=other_user_id AND receiver_id=user_id),
+        # each branch narrowed to rows after the cursor when there is one
+        after = [""]
+        if cursor:
+            position = decode_cursor(cursor)
+            created_at = position.key[0].isoformat()
+            after = [f',created_at.lt."{created_at}"', f',created_at.eq."{created_at}",id.lt.{position.id}']
+        branches = [
+            f"and(sender_id.eq.{sender},receiver_id.eq.{receiver}{condition})"
+            for sender, receiver in ((user_id, other_user_id), (other_user_id, user_id))
+            for condition in after
+        ]
         query = (
             self.supabase.table("direct_messages")
             .select("*")
-            .or_(
-                f"and(sender_id.eq.{user_id},receiver_id.eq.{other_user_id}),"
-                f"and(sender_id.eq.{other_user_id},receiver_id.eq.{user_id})"
-            )
+            .or_(",".join(branches))
             .order("created_at", desc=True)
+            .order("id", desc=True)
             .limit(limit)
         )
         if before:
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import asyncpg
+
+from src.utils.hyperloglog import HyperLogLog, hash_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingViews:
+    """Impressions of one post received since the last flush"""
+    views: int = 0
+    viewer_hashes: Set[int] = field(default_factory=set)
+
+    def merge(self, other: "PendingViews") -> None:
+        """Add ``other``'s views by viewers not already counted here"""
+        self.views += len(other.viewer_hashes - self.viewer_hashes)
+        self.viewer_hashes |= other.viewer_hashes
+
+
+class ViewBuffer:
+    """In-process buffer of post impressions, flushed as per-post counters.
+
+    Impressions are counted in memory and written to post_view_stats every
+    ``flush_interval`` seconds (or sooner once ``max_posts`` posts are
+    pending): one row per post with the total view count and a HyperLogLog
+    sketch of its viewers, from which unique_viewers is estimated. Nothing
+    is written per impression. Views buffered when the process dies are lost.
+
+    A viewer counts at most once per post per flush window, so resending
+    the same impressions cannot inflate view_count. While flushes fail, at
+    most twice ``max_posts`` posts are kept pending; views of further posts
+    are dropped and counted in ``dropped_views``.
+    """
+
+    def __init__(self, flush_interval: float = 10.0, max_posts: int = 50000):
+        self.flush_interval = flush_interval
+        self.max_posts = max_posts
+        self.dropped_views = 0
+        self._pending: Dict[uuid.UUID, PendingViews] = {}
+        self._flush_soon = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "ViewBuffer":
+        return cls(
+            flush_interval=float(os.environ.get("VIEW_FLUSH_INTERVAL", "10")),
+            max_posts=int(os.environ.get("VIEW_BUFFER_MAX_POSTS", "50000")),
+        )
+
+    @property
+    def max_pending(self) -> int:
+        return 2 * self.max_posts
+
+    def record(self, post_ids: Iterable[uuid.UUID], viewer_id: uuid.UUID) -> int:
+        """Count one impression of each post by ``viewer_id``; returns how many were recorded"""
+        viewer_hash = hash_key(viewer_id.bytes)
+        recorded = 0
+        for post_id in post_ids:
+            pending = self._pending.get(post_id)
+            if pending is None:
+                if len(self._pending) >= self.max_pending:
+                    self.dropped_views += 1
+                    continue
+                pending = self._pending[post_id] = PendingViews()
+            elif viewer_hash in pending.viewer_hashes:
+                continue
+            pending.views += 1
+            pending.viewer_hashes.add(viewer_hash)
+            recorded += 1
+        if len(self._pending) >= self.max_posts:
+            self._flush_soon.set()
+        return recorded
+
+    def pending_views(self, post_id: uuid.UUID) -> int:
+        """Views of a post not yet flushed"""
+        pending = self._pending.get(post_id)
+        return pending.views if pending else 0
+
+    async def flush(self, pool: asyncpg.Pool) -> int:
+        """Write pending counters to post_view_stats; returns the number of posts flushed"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            await self._write(pool, pending)
+        except BaseException as e:
+            # Keep the views for the next attempt, including when cancelled mid-flush
+            dropped = self._requeue(pending)
+            if isinstance(e, Exception):
+                logger.error(f"Failed to flush views for {len(pending)} posts ({dropped} views dropped): {e}")
+            raise
+        return len(pending)
+
+    def _requeue(self, pending: Dict[uuid.UUID, PendingViews]) -> int:
+        """Merge views that failed to flush back in, up to max_pending posts; returns the views dropped"""
+        dropped = 0
+        for post_id, views in pending.items():
+            current = self._pending.get(post_id)
+            if current is None:
+                if len(self._pending) >= self.max_pending:
+                    dropped += views.views
+                    continue
+                current = self._pending[post_id] = PendingViews()
+            current.merge(views)
+        self.dropped_views += dropped
+        return dropped
+
+    async def _write(self, pool: asyncpg.Pool, pending: Dict[uuid.UUID, PendingViews]) -> None:
+        post_ids = sorted(pending)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Views of unknown or deleted posts are dropped here
+                await conn.execute(
+                    """
+                    INSERT INTO post_view_stats (post_id)
+                    SELECT id FROM posts WHERE id = ANY($1::uuid[]) ORDER BY id
+                    ON CONFLICT (post_id) DO NOTHING
+                    """,
+                    post_ids,
+                )
+                # Sketches are merged here rather than in SQL, so lock the rows first
+                rows = await conn.fetch(
+                    """
+                    SELECT post_id, viewers, unique_viewers_base FROM post_view_stats
+                    WHERE post_id = ANY($1::uuid[]) ORDER BY post_id FOR UPDATE
+                    """,
+                    post_ids,
+                )
+                if not rows:
+                    return
+                updates = [self._merged(row, pending[row["post_id"]]) for row in rows]
+                await conn.execute(
+                    """
+                    UPDATE post_view_stats s
+                    SET view_count = s.view_count + u.views,
+                        unique_viewers = u.unique_viewers,
+                        viewers = u.viewers,
+                        updated_at = now()
+                    FROM unnest($1::uuid[], $2::bigint[], $3::bigint[], $4::bytea[])
+                         AS u(post_id, views, unique_viewers, viewers)
+                    WHERE s.post_id = u.post_id
+                    """,
+                    *(list(column) for column in zip(*updates)),
+                )
+
+    @staticmethod
+    def _merged(row, pending: PendingViews) -> Tuple[uuid.UUID, int, int, bytes]:
+        sketch = HyperLogLog(registers=row["viewers"]) if row["viewers"] is not None else HyperLogLog()
+        sketch.update_hashes(pending.viewer_hashes)
+        # unique_viewers_base holds distinct viewers carried over from post_views
+        unique_viewers = row["unique_viewers_base"] + sketch.count()
+        return row["post_id"], pending.views, unique_viewers, sketch.to_bytes()
+
+    async def run(self, pool: asyncpg.Pool) -> None:
+        """Flush periodically until cancelled"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_soon.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_soon.clear()
+            try:
+                await self.flush(pool)
+            except Exception:
+                pass  # already logged; retried on the next tick
+
+    def start(self, pool: asyncpg.Pool) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(pool))
+
+    async def stop(self, pool: Optional[asyncpg.Pool]) -> None:
+        """Stop the flush loop and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if pool is not None:
+            try:
+                await self.flush(pool)
+            except Exception:
+                pass
+
+
+view_buffer = ViewBuffer.from_env()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+
+from src.utils.cache import Cache, cache
+from src.utils.tracing import instrument_redis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A cached read of one vision board at one version"""
+    value: Any
+    version: Optional[str]
+
+    @property
+    def etag(self) -> Optional[str]:
+        return format_etag(self.version)
+
+
+def format_etag(version: Optional[str]) -> Optional[str]:
+    return f'W/"{version}"' if version else None
+
+
+class VisionBoardCache:
+    """Versioned snapshot cache for vision board reads.
+
+    Every write to a board bumps its version, and snapshots are keyed by
+    (board, kind, version), so a bump makes older snapshots unreachable
+    and they age out of the LRU. Versions are kept in-process, in an LRU of
+    ``max_entries`` boards, or in Redis when ``redis_url`` is set so that
+    several instances agree on them. A board whose version was evicted gets
+    a fresh one, so its old snapshots and ETags simply miss.
+    Snapshots always stay in-process, in a Cache tagged ``visionboard:{id}``.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 300.0, redis_url: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self._redis = None
+        self._snapshots = Cache("visionboard", max_entries=max_entries, ttl=ttl)
+        self._versions: OrderedDict[uuid.UUID, str] = OrderedDict()
+        # The epoch keeps versions from a previous process from matching stale client ETags
+        self._epoch = f"{time.time_ns():x}"
+        self._counter = itertools.count(1)
+
+    @classmethod
+    def from_env(cls) -> "VisionBoardCache":
+        return cls(
+            max_entries=int(os.environ.get("VISIONBOARD_CACHE_SIZE", "2048")),
+            ttl=float(os.environ.get("VISIONBOARD_CACHE_TTL", "300")),
+            redis_url=os.environ.get("VISIONBOARD_CACHE_REDIS_URL") or None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    @property
+    def hits(self) -> int:
+        return self._snapshots.hits
+
+    @property
+    def misses(self) -> int:
+        return self._snapshots.misses
+
+    def _new_version(self) -> str:
+        return f"{self._epoch}.{next(self._counter)}"
+
+    def _redis_key(self, visionboard_id: uuid.UUID) -> str:
+        return f"visionboard:version:{visionboard_id}"
+
+    def _get_redis(self):
+        if self._redis is None:
+            self._redis = instrument_redis(redis.from_url(self.redis_url, decode_responses=True))
+        return self._redis
+
+    async def version(self, visionboard_id: uuid.UUID) -> Optional[str]:
+        """Current version of a board, or None when it cannot be determined"""
+        if not self.redis_url:
+            version = self._versions.get(visionboard_id)
+            if version is None:
+                return self._set_version(visionboard_id)
+            self._versions.move_to_end(visionboard_id)
+            return version
+        try:
+            client = self._get_redis()
+            key = self._redis_key(visionboard_id)
+            version = await client.get(key)
+            if version is None:
+                # A missing key (never written, or evicted) always gets a fresh version
+                await client.set(key, f"{time.time_ns():x}", nx=True)
+                version = await client.get(key)
+            return version
+        except Exception as e:
+            logger.warning(f"Vision board cache version lookup failed: {e}")
+            return None
+
+    def _set_version(self, visionboard_id: uuid.UUID) -> str:
+        version = self._versions[visionboard_id] = self._new_version()
+        self._versions.move_to_end(visionboard_id)
+        while len(self._versions) > max(self.max_entries, 1):
+            self._versions.popitem(last=False)
+        return version
+
+    async def bump(self, visionboard_id: Optional[uuid.UUID]) -> None:
+        """Mark a board as changed so cached snapshots and ETags are no longer served"""
+        if visionboard_id is None:
+            return
+        tag = f"visionboard:{visionboard_id}"
+        self._snapshots.invalidate_local([tag])
+        # Drops handler results cached with this board's tag, in every process
+        await cache.invalidate(tag)
+        if not self.redis_url:
+            self._set_version(visionboard_id)
+            return
+        try:
+            await self._get_redis().set(self._redis_key(visionboard_id), f"{time.time_ns():x}")
+        except Exception as e:
+            logger.warning(f"Vision board cache version bump failed for {visionboard_id}: {e}")
+
+    async def etag(self, visionboard_id: uuid.UUID) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return format_etag(await self.version(visionboard_id))
+
+    async def get_or_load(self, visionboard_id: uuid.UUID, kind: str, loader: Callable[[], Awaitable[Any]]) -> Snapshot:
+        """Return the snapshot of ``kind`` for the board's current version, loading it on a miss"""
+        if not self.enabled:
+            return Snapshot(await loader(), None)
+        version = await self.version(visionboard_id)
+        if version is None:
+            return Snapshot(await loader(), None)
+
+        async def load() -> Snapshot:
+            return Snapshot(await loader(), version)
+
+        return await self._snapshots.get_or_load(
+            (visionboard_id, kind, version), load, tags=[f"visionboard:{visionboard_id}"]
+        )
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+        self._versions.clear()
+
+
+visionboard_cache = VisionBoardCache.from_env()
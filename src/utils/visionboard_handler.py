@@ -1,6 +1,7 @@
 from __future__ import annotations
 import uuid
 import datetime
+import logging
 from decimal import Decimal
 from typing import List, Optional, Dict, Any
 import asyncpg
@@ -15,39 +16,162 @@ from src.models.visionboard import (
     TaskDependency, TaskDependencyCreate,
     TaskComment, TaskCommentCreate, TaskCommentUpdate,
     TaskAttachment, TaskAttachmentCreate,
-    VisionBoardSummary, VisionBoardStats,
+    VisionBoardSummary, VisionBoardStats, VisionBoardCollaborator,
     VisionBoardStatus, AssignmentStatus, TaskStatus, EquipmentStatus,
     Invitation, InvitationCreate, InvitationUpdate, InvitationStatus,
     GroupMessage, Draft, DraftComment
 )
-from src.models.user import User
-import json
+from src.models.user import UserCard
+from src.utils.cursor import decode_cursor, keyset_condition
+from src.utils.db import acquire, unit_of_work
+from src.utils.loaders import visionboard_loader
+from src.utils.mapping import from_row, from_rows
+from src.utils.metrics import instrumented
+from src.utils.replicas import read_only, router as replica_router
+from src.utils.visionboard_cache import VisionBoardCache, visionboard_cache
 
+logger = logging.getLogger(__name__)
 
+
+# Parts of the board graph that /full can return; each part implies its parents
+FULL_VISIONBOARD_FIELDS = ("genres", "assignments", "users", "tasks", "equipment")
+_FULL_VISIONBOARD_PARENTS = {
+    "assignments": "genres",
+    "users": "assignments",
+    "tasks": "assignments",
+    "equipment": "assignments",
+}
+
+
+def _full_visionboard_query(fields: set) -> str:
+    """Build the single json_agg query behind get_visionboard_full for the selected fields"""
+    assignment_extra = ""
+    if "users" in fields:
+        assignment_extra += """,
+                'user', json_build_object(
+                    'id', u.id, 'name', u.name, 'username', u.username,
+                    'profile_image_url', u.profile_image_url
+                )"""
+    if "tasks" in fields:
+        assignment_extra += """,
+                'tasks', COALESCE((
+                    SELECT json_agg(json_build_object(
+                        'id', t.id, 'genre_assignment_id', t.genre_assignment_id, 'title', t.title,
+                        'description', t.description, 'priority', t.priority, 'status', t.status,
+                        'due_date', t.due_date, 'estimated_hours', t.estimated_hours,
+                        'actual_hours', t.actual_hours, 'created_at', t.created_at,
+                        'updated_at', t.updated_at, 'created_by', t.created_by
+                    ) ORDER BY t.created_at)
+                    FROM tasks t WHERE t.genre_assignment_id = ga.id
+                ), '[]'::json)"""
+    if "equipment" in fields:
+        assignment_extra += """,
+                'equipment', COALESCE((
+                    SELECT json_agg(json_build_object(
+                        'id', re.id, 'equipment_id', re.equipment_id, 'name', e.name,
+                        'category', e.category, 'brand', e.brand, 'model', e.model,
+                        'quantity', re.quantity, 'is_provided_by_assignee', re.is_provided_by_assignee,
+                        'notes', re.notes, 'status', re.status
+                    ) ORDER BY e.category, e.name)
+                    FROM required_equipment re
+                    JOIN equipment e ON re.equipment_id = e.id
+                    WHERE re.genre_assignment_id = ga.id
+                ), '[]'::json)"""
+
+    genre_extra = ""
+    if "assignments" in fields:
+        users_join = "LEFT JOIN users u ON ga.user_id = u.id" if "users" in fields else ""
+        genre_extra = f""",
+            'assignments', COALESCE((
+                SELECT json_agg(json_build_object(
+                    'id', ga.id, 'genre_id', ga.genre_id, 'user_id', ga.user_id, 'status', ga.status,
+                    'work_type', ga.work_type, 'payment_type', ga.payment_type,
+                    'payment_amount', ga.payment_amount, 'currency', ga.currency,
+                    'invited_at', ga.invited_at, 'responded_at', ga.responded_at,
+                    'assigned_by', ga.assigned_by{assignment_extra}
+                ) ORDER BY ga.invited_at)
+                FROM genre_assignments ga
+                {users_join}
+                WHERE ga.genre_id = g.id
+            ), '[]'::json)"""
+
+    board_extra = ""
+    if "genres" in fields:
+        board_extra = f""",
+        'genres', COALESCE((
+            SELECT json_agg(json_build_object(
+                'id', g.id, 'visionboard_id', g.visionboard_id, 'name', g.name,
+                'description', g.description, 'min_required_people', g.min_required_people,
+                'max_allowed_people', g.max_allowed_people, 'created_at', g.created_at{genre_extra}
+            ) ORDER BY g.created_at)
+            FROM genres g WHERE g.visionboard_id = vb.id
+        ), '[]'::json)"""
+
+    return f"""
+        SELECT json_build_object(
+            'id', vb.id, 'name', vb.name, 'description', vb.description,
+            'start_date', vb.start_date, 'end_date', vb.end_date, 'status', vb.status,
+            'created_at', vb.created_at, 'updated_at', vb.updated_at,
+            'created_by', vb.created_by{board_extra}
+        ) AS visionboard
+        FROM visionboards vb WHERE vb.id = $1
+    """
+
+
+@instrumented("visionboard")
 class VisionBoardHandler:
-    def __init__(self, pool: asyncpg.Pool):
+    def __init__(self, pool: asyncpg.Pool, cache: Optional[VisionBoardCache] = None):
         self.pool = pool
+        self.cache = cache if cache is not None else visionboard_cache
     
     def _check_pool(self):
         """Check if database pool is available"""
         if not self.pool:
             raise HTTPException(status_code=503, detail="Database connection not available")
 
+    async def _cached(self, visionboard_id: uuid.UUID, kind: str, loader):
+        """Serve a board read from the snapshot cache, loading it on a miss"""
+        snapshot = await self.cache.get_or_load(visionboard_id, kind, loader)
+        return snapshot.value
+
+    async def _visionboard_id_for_genre(self, conn, genre_id: uuid.UUID) -> Optional[uuid.UUID]:
+        return await conn.fetchval("SELECT visionboard_id FROM genres WHERE id = $1", genre_id)
+
+    async def _visionboard_id_for_assignment(self, conn, assignment_id: uuid.UUID) -> Optional[uuid.UUID]:
+        query = """
+            SELECT g.visionboard_id FROM genre_assignments ga
+            JOIN genres g ON ga.genre_id = g.id
+            WHERE ga.id = $1
+        """
+        return await conn.fetchval(query, assignment_id)
+
     # Vision Board CRUD Operations
     async def create_notification(self, *, receiver_id, sender_id, object_type, object_id, event_type, data=None, message=None):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 INSERT INTO notifications (receiver_id, sender_id, object_type, object_id, event_type, status, data, message)
                 VALUES ($1, $2, $3, $4, $5, 'unread', $6, $7)
             """
-            # Serialize data if it's a dict
-            if isinstance(data, dict):
-                data = json.dumps(data)
             await conn.execute(query, receiver_id, sender_id, object_type, object_id, event_type, data, message)
 
+    async def create_notifications(self, receiver_ids, *, sender_id, object_type, object_id, event_type, data=None, message=None):
+        """Send the same notification to several receivers in one round trip"""
+        if not receiver_ids:
+            return
+        async with acquire(self.pool) as conn:
+            query = """
+                INSERT INTO notifications (receiver_id, sender_id, object_type, object_id, event_type, status, data, message)
+                VALUES ($1, $2, $3, $4, $5, 'unread', $6, $7)
+            """
+            await conn.executemany(
+                query,
+                [(receiver_id, sender_id, object_type, object_id, event_type, data, message) for receiver_id in receiver_ids]
+            )
+
     async def create_visionboard(self, visionboard: VisionBoardCreate, created_by: uuid.UUID) -> VisionBoard:
         """Create a new vision board and send notification to the creator"""
-        async with self.pool.acquire() as conn:
+        # The board and its notification are written together on one connection
+        async with unit_of_work(self.pool, transaction=True) as conn:
             query = """
                 INSERT INTO visionboards (name, description, start_date, end_date, status, created_by)
                 VALUES ($1, $2, $3, $4, $5, $6)
@@ -62,7 +186,7 @@ class VisionBoardHandler:
                 visionboard.status.value,
                 created_by
             )
-            vb = VisionBoard(**dict(row))
+            vb = from_row(VisionBoard, row)
 
             # Send notification to the creator (generic model)
             await self.create_notification(
@@ -77,19 +201,24 @@ class VisionBoardHandler:
 
             return vb
 
+    async def visionboard_exists(self, visionboard_id: uuid.UUID) -> bool:
+        """Whether the board exists, answered from the snapshot cache when it can be"""
+        return await self.get_visionboard(visionboard_id) is not None
+
     async def get_visionboard(self, visionboard_id: uuid.UUID) -> Optional[VisionBoard]:
         """Get a vision board by ID"""
-        async with self.pool.acquire() as conn:
-            query = """
-                SELECT id, name, description, start_date, end_date, status, created_at, updated_at, created_by
-                FROM visionboards WHERE id = $1
-            """
-            row = await conn.fetchrow(query, visionboard_id)
-            return VisionBoard(**dict(row)) if row else None
+        return await self._cached(visionboard_id, "visionboard", lambda: self._fetch_visionboard(visionboard_id))
+
+    async def _fetch_visionboard(self, visionboard_id: uuid.UUID) -> Optional[VisionBoard]:
+        # Boards requested concurrently within a request share one query
+        return await visionboard_loader(self.pool).load(visionboard_id)
 
     async def get_visionboard_with_genres(self, visionboard_id: uuid.UUID) -> Optional[VisionBoardWithGenres]:
         """Get a vision board with all its genres"""
-        async with self.pool.acquire() as conn:
+        return await self._cached(visionboard_id, "with_genres", lambda: self._fetch_visionboard_with_genres(visionboard_id))
+
+    async def _fetch_visionboard_with_genres(self, visionboard_id: uuid.UUID) -> Optional[VisionBoardWithGenres]:
+        async with acquire(self.pool) as conn:
             # Get vision board
             vb_query = """
                 SELECT id, name, description, start_date, end_date, status, created_at, updated_at, created_by
@@ -106,14 +235,36 @@ class VisionBoardHandler:
             """
             genres_rows = await conn.fetch(genres_query, visionboard_id)
             
-            visionboard = VisionBoard(**dict(vb_row))
-            genres = [Genre(**dict(row)) for row in genres_rows]
-            
-            return VisionBoardWithGenres(**visionboard.model_dump(), genres=genres)
+            return from_row(VisionBoardWithGenres, vb_row, genres=from_rows(Genre, genres_rows))
+
+    async def get_visionboard_full(self, visionboard_id: uuid.UUID, fields: Optional[set] = None) -> Optional[Dict[str, Any]]:
+        """Get a vision board with genres, assignments, user cards, tasks and equipment in a single query.
+
+        ``fields`` limits the nested parts returned (see FULL_VISIONBOARD_FIELDS);
+        selecting a part also selects the parts it is nested in.
+        """
+        selected = set(FULL_VISIONBOARD_FIELDS) if fields is None else set(fields)
+        unknown = selected - set(FULL_VISIONBOARD_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        for field in list(selected):
+            while field in _FULL_VISIONBOARD_PARENTS:
+                field = _FULL_VISIONBOARD_PARENTS[field]
+                selected.add(field)
+
+        kind = "full:" + ",".join(sorted(selected))
+        return await self._cached(visionboard_id, kind, lambda: self._fetch_visionboard_full(visionboard_id, selected))
+
+    async def _fetch_visionboard_full(self, visionboard_id: uuid.UUID, fields: set) -> Optional[Dict[str, Any]]:
+        async with acquire(self.pool) as conn:
+            row = await conn.fetchrow(_full_visionboard_query(fields), visionboard_id)
+            if not row:
+                return None
+            return row["visionboard"]
 
     async def update_visionboard(self, visionboard_id: uuid.UUID, updates: VisionBoardUpdate) -> Optional[VisionBoard]:
         """Update a vision board. If status is set to 'Active' or 'Started', notify all partners."""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             # Build dynamic update query
             set_clauses = []
             values = []
@@ -141,7 +292,8 @@ class VisionBoardHandler:
                 status_being_set = updates.status.value
                 param_count += 1
             if not set_clauses:
-                return await self.get_visionboard(visionboard_id)
+                # Read on this connection; a coalesced cache load would run in a task of its own and take another
+                return await self._fetch_visionboard(visionboard_id)
             set_clauses.append(f"updated_at = ${param_count}")
             values.append(datetime.datetime.utcnow())
             param_count += 1
@@ -153,41 +305,36 @@ class VisionBoardHandler:
                 RETURNING id, name, description, start_date, end_date, status, created_at, updated_at, created_by
             """
             row = await conn.fetchrow(query, *values)
-            vb = VisionBoard(**dict(row)) if row else None
+            vb = from_row(VisionBoard, row) if row else None
+            await self.cache.bump(visionboard_id)
 
-            # If status is set to 'Active' or 'Started', notify all partners
-            if status_being_set and status_being_set.lower() in ["active", "started"]:
-                # Get all assigned users (partners) with accepted assignments
-                partners_query = """
-                    SELECT ga.user_id FROM genre_assignments ga
-                    JOIN genres g ON ga.genre_id = g.id
-                    WHERE g.visionboard_id = $1 AND ga.status = 'Accepted'
-                """
-                partner_rows = await conn.fetch(partners_query, visionboard_id)
-                partner_ids = [row['user_id'] for row in partner_rows]
-                for partner_id in partner_ids:
-                    await self.create_notification(
-                        receiver_id=partner_id,
-                        sender_id=vb.created_by,
-                        object_type="visionboard",
-                        object_id=vb.id,
-                        event_type="started",
-                        data=None,
-                        message="The vision board has been started."
-                    )
+        # If status is set to 'Active' or 'Started', notify all partners
+        if vb and status_being_set and status_being_set.lower() in ["active", "started"]:
+            partners = await self.get_collaborator_index(visionboard_id)
+            await self.create_notifications(
+                list(partners),
+                sender_id=vb.created_by,
+                object_type="visionboard",
+                object_id=vb.id,
+                event_type="started",
+                data=None,
+                message="The vision board has been started."
+            )
 
-            return vb
+        return vb
 
     async def delete_visionboard(self, visionboard_id: uuid.UUID) -> bool:
         """Delete a vision board (cascade will handle related data)"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = "DELETE FROM visionboards WHERE id = $1"
             result = await conn.execute(query, visionboard_id)
+            await self.cache.bump(visionboard_id)
             return result == "DELETE 1"
 
+    @read_only
     async def get_user_visionboards(self, *, user_id: uuid.UUID, status: Optional[VisionBoardStatus] = None) -> List[VisionBoard]:
         """Get all vision boards created by a user"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = "SELECT * FROM visionboards WHERE created_by = $1"
             params = [user_id]
             
@@ -198,11 +345,12 @@ class VisionBoardHandler:
             query += " ORDER BY created_at DESC"
             
             rows = await conn.fetch(query, *params)
-            return [VisionBoard(**dict(row)) for row in rows]
+            return from_rows(VisionBoard, rows)
 
+    @read_only
     async def get_user_assigned_visionboards(self, *, user_id: uuid.UUID, status: Optional[VisionBoardStatus] = None) -> List[VisionBoard]:
         """Get all vision boards where a user is assigned/partner and assignment is accepted"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 SELECT DISTINCT vb.* 
                 FROM visionboards vb
@@ -216,12 +364,12 @@ class VisionBoardHandler:
                 params.append(status.value)
             query += " ORDER BY vb.created_at DESC"
             rows = await conn.fetch(query, *params)
-            return [VisionBoard(**dict(row)) for row in rows]
+            return from_rows(VisionBoard, rows)
 
     # Genre Operations
     async def create_genre(self, visionboard_id: uuid.UUID, genre: GenreCreate) -> Genre:
         """Create a new genre for a vision board"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 INSERT INTO genres (visionboard_id, name, description, min_required_people, max_allowed_people)
                 VALUES ($1, $2, $3, $4, $5)
@@ -235,11 +383,12 @@ class VisionBoardHandler:
                 genre.min_required_people,
                 genre.max_allowed_people
             )
-            return Genre(**dict(row))
+            await self.cache.bump(visionboard_id)
+            return from_row(Genre, row)
 
     async def get_genre_with_assignments(self, genre_id: uuid.UUID) -> Optional[GenreWithAssignments]:
         """Get a genre with all its assignments"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             # Get genre
             genre_query = """
                 SELECT id, visionboard_id, name, description, min_required_people, max_allowed_people, created_at
@@ -257,19 +406,12 @@ class VisionBoardHandler:
             """
             assignments_rows = await conn.fetch(assignments_query, genre_id)
             
-            genre = Genre(**dict(genre_row))
-            assignments = [GenreAssignment(**dict(row)) for row in assignments_rows]
-            
-            return GenreWithAssignments(**genre.model_dump(), assignments=assignments)
+            return from_row(GenreWithAssignments, genre_row, assignments=from_rows(GenreAssignment, assignments_rows))
 
     # Equipment Operations
     async def create_equipment(self, equipment: EquipmentCreate) -> Equipment:
         """Create new equipment"""
-        async with self.pool.acquire() as conn:
-            # Serialize specifications as JSON string if it's a dict
-            specs = equipment.specifications
-            if isinstance(specs, dict):
-                specs = json.dumps(specs)
+        async with acquire(self.pool) as conn:
             query = """
                 INSERT INTO equipment (name, description, category, brand, model, specifications)
                 VALUES ($1, $2, $3, $4, $5, $6)
@@ -282,41 +424,25 @@ class VisionBoardHandler:
                 equipment.category,
                 equipment.brand,
                 equipment.model,
-                specs
+                equipment.specifications
             )
-            # Parse specifications back to dict if it's a string
-            equipment_data = dict(row)
-            if isinstance(equipment_data.get('specifications'), str):
-                try:
-                    equipment_data['specifications'] = json.loads(equipment_data['specifications'])
-                except Exception:
-                    pass
-            return Equipment(**equipment_data)
+            return from_row(Equipment, row)
 
     async def get_equipment_by_category(self, category: str) -> List[Equipment]:
         """Get equipment by category"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 SELECT id, name, description, category, brand, model, specifications
                 FROM equipment WHERE category = $1
                 ORDER BY name
             """
             rows = await conn.fetch(query, category)
-            equipment_list = []
-            for row in rows:
-                equipment_data = dict(row)
-                if isinstance(equipment_data.get('specifications'), str):
-                    try:
-                        equipment_data['specifications'] = json.loads(equipment_data['specifications'])
-                    except Exception:
-                        pass
-                equipment_list.append(Equipment(**equipment_data))
-            return equipment_list
+            return from_rows(Equipment, rows)
 
     # Genre Assignment Operations
     async def create_genre_assignment(self, assignment: GenreAssignmentCreate, assigned_by: uuid.UUID) -> GenreAssignment:
         """Create a new genre assignment, then create an invitation and notification for the user"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 INSERT INTO genre_assignments (genre_id, user_id, status, work_type, payment_type, payment_amount, currency, assigned_by)
                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
@@ -334,7 +460,8 @@ class VisionBoardHandler:
                 assignment.currency,
                 assigned_by
             )
-            ga = GenreAssignment(**dict(row))
+            ga = from_row(GenreAssignment, row)
+            await self.cache.bump(await self._visionboard_id_for_genre(conn, ga.genre_id))
 
             # Create invitation for the user
             from src.models.visionboard import InvitationCreate
@@ -371,7 +498,7 @@ class VisionBoardHandler:
 
     async def update_assignment_status(self, assignment_id: uuid.UUID, status: AssignmentStatus, user_id: uuid.UUID) -> Optional[GenreAssignment]:
         """Update assignment status (for accepting/rejecting invitations)"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 UPDATE genre_assignments 
                 SET status = $1, responded_at = $2
@@ -386,11 +513,14 @@ class VisionBoardHandler:
                 assignment_id,
                 user_id
             )
-            return GenreAssignment(**dict(row)) if row else None
+            if row:
+                await self.cache.bump(await self._visionboard_id_for_genre(conn, row['genre_id']))
+            return from_row(GenreAssignment, row) if row else None
 
+    @read_only
     async def get_user_assignments(self, user_id: uuid.UUID, status: Optional[AssignmentStatus] = None) -> List[GenreAssignmentWithDetails]:
         """Get all assignments for a user with details"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             if status:
                 query = """
                     SELECT ga.id, ga.genre_id, ga.user_id, ga.status, ga.work_type, ga.payment_type, 
@@ -416,28 +546,13 @@ class VisionBoardHandler:
                 """
                 rows = await conn.fetch(query, user_id)
             
-            assignments = []
-            for row in rows:
-                assignment_data = dict(row)
-                genre_name = assignment_data.pop('genre_name')
-                user_name = assignment_data.pop('user_name')
-                
-                assignment = GenreAssignment(**assignment_data)
-                assignment_with_details = GenreAssignmentWithDetails(
-                    **assignment.model_dump(),
-                    genre_name=genre_name,
-                    user_name=user_name,
-                    equipment=[],  # Will be populated separately if needed
-                    tasks=[]       # Will be populated separately if needed
-                )
-                assignments.append(assignment_with_details)
-            
-            return assignments
+            # Equipment and tasks are populated separately if needed
+            return [from_row(GenreAssignmentWithDetails, row, equipment=[], tasks=[]) for row in rows]
 
     # Task Operations
     async def create_task(self, task: VisionBoardTaskCreate, created_by: uuid.UUID) -> VisionBoardTask:
         """Create a new task"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 INSERT INTO tasks (genre_assignment_id, title, description, priority, due_date, estimated_hours, created_by)
                 VALUES ($1, $2, $3, $4, $5, $6, $7)
@@ -454,11 +569,12 @@ class VisionBoardHandler:
                 task.estimated_hours,
                 created_by
             )
-            return VisionBoardTask(**dict(row))
+            await self.cache.bump(await self._visionboard_id_for_assignment(conn, task.genre_assignment_id))
+            return from_row(VisionBoardTask, row)
 
     async def update_task_status(self, task_id: uuid.UUID, status: TaskStatus, user_id: uuid.UUID) -> Optional[VisionBoardTask]:
         """Update task status"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 UPDATE tasks 
                 SET status = $1, updated_at = $2
@@ -473,11 +589,13 @@ class VisionBoardHandler:
                 task_id,
                 user_id
             )
-            return VisionBoardTask(**dict(row)) if row else None
+            if row:
+                await self.cache.bump(await self._visionboard_id_for_assignment(conn, row['genre_assignment_id']))
+            return from_row(VisionBoardTask, row) if row else None
 
     async def get_task_with_details(self, task_id: uuid.UUID) -> Optional[VisionBoardTaskWithDetails]:
         """Get a task with all its details (comments, attachments, dependencies)"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             # Get task
             task_query = """
                 SELECT t.id, t.genre_assignment_id, t.title, t.description, t.priority, t.status, 
@@ -516,74 +634,84 @@ class VisionBoardHandler:
             """
             dependencies_rows = await conn.fetch(dependencies_query, task_id)
 
-            task_data = dict(task_row)
-            user_name = task_data.pop('user_name')
-            genre_name = task_data.pop('genre_name')
-
-            task = VisionBoardTask(**task_data)
-            comments = [TaskComment(**dict(row)) for row in comments_rows]
-            attachments = [TaskAttachment(**dict(row)) for row in attachments_rows]
-            dependencies = [TaskDependency(**dict(row)) for row in dependencies_rows]
-
-            return VisionBoardTaskWithDetails(
-                **task.model_dump(),
-                user_name=user_name,
-                genre_name=genre_name,
-                comments=comments,
-                attachments=attachments,
-                dependencies=dependencies
+            return from_row(
+                VisionBoardTaskWithDetails,
+                task_row,
+                comments=from_rows(TaskComment, comments_rows),
+                attachments=from_rows(TaskAttachment, attachments_rows),
+                dependencies=from_rows(TaskDependency, dependencies_rows)
             )
 
     # Statistics and Analytics
     async def get_visionboard_summary(self, visionboard_id: uuid.UUID) -> Optional[VisionBoardSummary]:
         """Get comprehensive summary of a vision board"""
-        async with self.pool.acquire() as conn:
+        return await self._cached(visionboard_id, "summary", lambda: self._fetch_visionboard_summary(visionboard_id))
+
+    async def _fetch_visionboard_summary(self, visionboard_id: uuid.UUID) -> Optional[VisionBoardSummary]:
+        async with acquire(self.pool) as conn:
+            # Each count is aggregated on its own so the joins never multiply rows
             query = """
                 SELECT 
                     vb.id, vb.name, vb.status, vb.start_date, vb.end_date, vb.created_by,
-                    COUNT(DISTINCT g.id) as total_genres,
-                    COUNT(DISTINCT ga.id) as total_assignments,
-                    COUNT(DISTINCT t.id) as total_tasks,
-                    COUNT(DISTINCT CASE WHEN t.status = 'Completed' THEN t.id END) as completed_tasks
+                    (SELECT COUNT(*) FROM genres g WHERE g.visionboard_id = vb.id) as total_genres,
+                    (SELECT COUNT(*) FROM genre_assignments ga
+                     JOIN genres g ON ga.genre_id = g.id
+                     WHERE g.visionboard_id = vb.id) as total_assignments,
+                    t.total_tasks,
+                    t.completed_tasks
                 FROM visionboards vb
-                LEFT JOIN genres g ON vb.id = g.visionboard_id
-                LEFT JOIN genre_assignments ga ON g.id = ga.genre_id
-                LEFT JOIN tasks t ON ga.id = t.genre_assignment_id
+                CROSS JOIN LATERAL (
+                    SELECT COUNT(*) as total_tasks,
+                           COUNT(*) FILTER (WHERE t.status = 'Completed') as completed_tasks
+                    FROM tasks t
+                    JOIN genre_assignments ga ON t.genre_assignment_id = ga.id
+                    JOIN genres g ON ga.genre_id = g.id
+                    WHERE g.visionboard_id = vb.id
+                ) t
                 WHERE vb.id = $1
-                GROUP BY vb.id, vb.name, vb.status, vb.start_date, vb.end_date, vb.created_by
             """
             row = await conn.fetchrow(query, visionboard_id)
             if not row:
                 return None
             
-            return VisionBoardSummary(**dict(row))
+            return from_row(VisionBoardSummary, row)
 
+    @read_only
     async def get_user_stats(self, user_id: uuid.UUID) -> VisionBoardStats:
         """Get comprehensive stats for a user"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
+            # Boards, assignments and tasks are counted independently; joining them
+            # together would scan the cross-product of a user's boards and tasks
             query = """
                 SELECT 
-                    COUNT(DISTINCT vb.id) as total_visionboards,
-                    COUNT(DISTINCT CASE WHEN vb.status = 'Active' THEN vb.id END) as active_visionboards,
-                    COUNT(DISTINCT CASE WHEN vb.status = 'Completed' THEN vb.id END) as completed_visionboards,
-                    COUNT(DISTINCT ga.id) as total_assignments,
-                    COUNT(DISTINCT CASE WHEN ga.status = 'Pending' THEN ga.id END) as pending_assignments,
-                    COUNT(DISTINCT t.id) as total_tasks,
-                    COUNT(DISTINCT CASE WHEN t.status = 'Completed' THEN t.id END) as completed_tasks,
-                    COUNT(DISTINCT CASE WHEN t.due_date < NOW() AND t.status != 'Completed' THEN t.id END) as overdue_tasks
-                FROM users u
-                LEFT JOIN visionboards vb ON u.id = vb.created_by
-                LEFT JOIN genre_assignments ga ON u.id = ga.user_id
-                LEFT JOIN tasks t ON ga.id = t.genre_assignment_id
-                WHERE u.id = $1
+                    vb.total_visionboards, vb.active_visionboards, vb.completed_visionboards,
+                    ga.total_assignments, ga.pending_assignments,
+                    t.total_tasks, t.completed_tasks, t.overdue_tasks
+                FROM (
+                    SELECT COUNT(*) as total_visionboards,
+                           COUNT(*) FILTER (WHERE status = 'Active') as active_visionboards,
+                           COUNT(*) FILTER (WHERE status = 'Completed') as completed_visionboards
+                    FROM visionboards WHERE created_by = $1
+                ) vb, (
+                    SELECT COUNT(*) as total_assignments,
+                           COUNT(*) FILTER (WHERE status = 'Pending') as pending_assignments
+                    FROM genre_assignments WHERE user_id = $1
+                ) ga, (
+                    SELECT COUNT(*) as total_tasks,
+                           COUNT(*) FILTER (WHERE t.status = 'Completed') as completed_tasks,
+                           COUNT(*) FILTER (WHERE t.due_date < NOW() AND t.status != 'Completed') as overdue_tasks
+                    FROM tasks t
+                    JOIN genre_assignments ga ON t.genre_assignment_id = ga.id
+                    WHERE ga.user_id = $1
+                ) t
             """
             row = await conn.fetchrow(query, user_id)
-            return VisionBoardStats(**dict(row))
+            return from_row(VisionBoardStats, row)
 
     # Complex Queries (as specified in the requirements)
     async def get_visionboard_assignments(self, visionboard_id: uuid.UUID) -> List[Dict[str, Any]]:
         """Get all people assigned to a vision board"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 SELECT u.name as first_name, u.name as last_name, g.name as genre, 
                        ga.status, ga.work_type, ga.payment_type, ga.payment_amount, ga.currency
@@ -598,7 +726,7 @@ class VisionBoardHandler:
 
     async def get_user_tasks_in_visionboard(self, user_id: uuid.UUID, visionboard_id: uuid.UUID) -> List[Dict[str, Any]]:
         """Get all tasks for a specific person in a vision board"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 SELECT t.title, t.description, t.status, t.due_date, t.priority, g.name as genre
                 FROM tasks t
@@ -612,7 +740,7 @@ class VisionBoardHandler:
 
     async def get_visionboard_equipment_requirements(self, visionboard_id: uuid.UUID) -> List[Dict[str, Any]]:
         """Get equipment requirements for a vision board"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 SELECT 
                     e.name as equipment_name,
@@ -636,78 +764,41 @@ class VisionBoardHandler:
             rows = await conn.fetch(query, visionboard_id)
             return [dict(row) for row in rows]
 
-    async def get_visionboard_users(self, visionboard_id: uuid.UUID) -> List[User]:
-        """Get all users involved in a vision board (creator + assigned users)"""
-        async with self.pool.acquire() as conn:
-            # Get the vision board creator
-            creator_query = "SELECT created_by FROM visionboards WHERE id = $1"
-            creator_row = await conn.fetchrow(creator_query, visionboard_id)
-            if not creator_row:
-                return []
-            
-            creator_id = creator_row['created_by']
-            
-            # Get all assigned users
-            assigned_users_query = """
-                SELECT DISTINCT u.*
+    async def get_visionboard_users(self, visionboard_id: uuid.UUID) -> List[UserCard]:
+        """Get all users involved in a vision board (creator + assigned users).
+
+        Profile edits do not bump board versions, so cached users can lag them by the cache TTL.
+        """
+        return await self._cached(visionboard_id, "users", lambda: self._fetch_visionboard_users(visionboard_id))
+
+    async def _fetch_visionboard_users(self, visionboard_id: uuid.UUID) -> List[UserCard]:
+        async with acquire(self.pool) as conn:
+            query = """
+                SELECT u.id, u.name, u.username, u.description, u.profile_image_url, u.genres,
+                       u.payment_mode, u.work_mode, u.location, u.rating, u.city, u.country
                 FROM users u
-                JOIN genre_assignments ga ON u.id = ga.user_id
-                JOIN genres g ON ga.genre_id = g.id
-                WHERE g.visionboard_id = $1
+                WHERE u.id IN (
+                    SELECT created_by FROM visionboards WHERE id = $1
+                    UNION
+                    SELECT ga.user_id
+                    FROM genre_assignments ga
+                    JOIN genres g ON ga.genre_id = g.id
+                    WHERE g.visionboard_id = $1
+                )
+                ORDER BY u.name
             """
-            assigned_rows = await conn.fetch(assigned_users_query, visionboard_id)
-            assigned_users = []
-            for row in assigned_rows:
-                row_dict = dict(row)
-                # Parse location field
-                if 'location' in row_dict and isinstance(row_dict['location'], str):
-                    try:
-                        row_dict['location'] = json.loads(row_dict['location'])
-                    except Exception:
-                        row_dict['location'] = None
-                # Parse genres field
-                if 'genres' in row_dict and isinstance(row_dict['genres'], str):
-                    try:
-                        row_dict['genres'] = json.loads(row_dict['genres'])
-                    except Exception:
-                        row_dict['genres'] = None
-                assigned_users.append(User(**row_dict))
-            
-            # Get creator user details
-            creator_query = "SELECT * FROM users WHERE id = $1"
-            creator_row = await conn.fetchrow(creator_query, creator_id)
-            creator_user = None
-            if creator_row:
-                creator_dict = dict(creator_row)
-                # Parse location field
-                if 'location' in creator_dict and isinstance(creator_dict['location'], str):
-                    try:
-                        creator_dict['location'] = json.loads(creator_dict['location'])
-                    except Exception:
-                        creator_dict['location'] = None
-                # Parse genres field
-                if 'genres' in creator_dict and isinstance(creator_dict['genres'], str):
-                    try:
-                        creator_dict['genres'] = json.loads(creator_dict['genres'])
-                    except Exception:
-                        creator_dict['genres'] = None
-                creator_user = User(**creator_dict)
-            
-            # Combine creator and assigned users, removing duplicates
-            all_users = assigned_users
-            if creator_user and not any(user.id == creator_user.id for user in assigned_users):
-                all_users.append(creator_user)
-            
-            return all_users
+            rows = await conn.fetch(query, visionboard_id)
+            return from_rows(UserCard, rows)
 
+    @read_only
     async def get_notifications_for_user(self, user_id: uuid.UUID):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch("SELECT * FROM notifications WHERE receiver_id = $1 ORDER BY created_at DESC", user_id)
             from src.models.notification import Notification
-            return [Notification(**dict(row)) for row in rows]
+            return from_rows(Notification, rows)
 
     async def respond_to_notification(self, notification_id: uuid.UUID, responder_id: uuid.UUID, response: str, comment: str = None):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             # Fetch the notification
             notif_row = await conn.fetchrow("SELECT * FROM notifications WHERE id = $1 AND receiver_id = $2", notification_id, responder_id)
             if not notif_row:
@@ -729,12 +820,12 @@ class VisionBoardHandler:
             )
             from src.models.notification import Notification
             notif_row = await conn.fetchrow("SELECT * FROM notifications WHERE id = $1", notification_id)
-            return Notification(**dict(notif_row)) 
+            return from_row(Notification, notif_row) 
 
     # Invitation Operations
     async def create_invitation(self, sender_id: uuid.UUID, invitation: InvitationCreate) -> Invitation:
         """Create a new invitation"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = """
                 INSERT INTO invitations (receiver_id, sender_id, object_type, object_id, status, data)
                 VALUES ($1, $2, $3, $4, 'pending', $5)
@@ -746,55 +837,32 @@ class VisionBoardHandler:
                 sender_id,
                 invitation.object_type,
                 invitation.object_id,
-                json.dumps(invitation.data) if invitation.data else None
+                invitation.data or None
             )
-            row_dict = dict(row)
-            if isinstance(row_dict.get('data'), str):
-                try:
-                    row_dict['data'] = json.loads(row_dict['data'])
-                except Exception:
-                    row_dict['data'] = None
-            return Invitation(**row_dict)
+            return from_row(Invitation, row)
 
+    @read_only
     async def get_invitations_for_user(self, user_id: uuid.UUID, status: InvitationStatus | None = None) -> list[Invitation]:
         """Get all invitations for a user (optionally filter by status)"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             if status:
                 query = "SELECT * FROM invitations WHERE receiver_id = $1 AND status = $2 ORDER BY created_at DESC"
                 rows = await conn.fetch(query, user_id, status.value)
             else:
                 query = "SELECT * FROM invitations WHERE receiver_id = $1 ORDER BY created_at DESC"
                 rows = await conn.fetch(query, user_id)
-            invitations = []
-            for row in rows:
-                row_dict = dict(row)
-                if isinstance(row_dict.get('data'), str):
-                    try:
-                        row_dict['data'] = json.loads(row_dict['data'])
-                    except Exception:
-                        row_dict['data'] = None
-                invitations.append(Invitation(**row_dict))
-            return invitations
+            return from_rows(Invitation, rows)
 
     async def get_invitations_for_object(self, object_type: str, object_id: uuid.UUID) -> list[Invitation]:
         """Get all invitations for a given object (e.g., visionboard, genre, etc.)"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             query = "SELECT * FROM invitations WHERE object_type = $1 AND object_id = $2 ORDER BY created_at DESC"
             rows = await conn.fetch(query, object_type, object_id)
-            invitations = []
-            for row in rows:
-                row_dict = dict(row)
-                if isinstance(row_dict.get('data'), str):
-                    try:
-                        row_dict['data'] = json.loads(row_dict['data'])
-                    except Exception:
-                        row_dict['data'] = None
-                invitations.append(Invitation(**row_dict))
-            return invitations
+            return from_rows(Invitation, rows)
 
     async def respond_to_invitation(self, invitation_id: uuid.UUID, responder_id: uuid.UUID, status: InvitationStatus, data: dict | None = None) -> Invitation | None:
         """Accept or reject an invitation (only receiver can respond)"""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             # Only allow receiver to respond
             query = """
                 UPDATE invitations
@@ -805,20 +873,15 @@ class VisionBoardHandler:
             row = await conn.fetchrow(
                 query,
                 status.value,
-                json.dumps(data) if data else None,
+                data or None,
                 invitation_id,
                 responder_id
             )
             if not row:
-                print(f"DEBUG: Invitation not found or not allowed for id={invitation_id}, responder_id={responder_id}")
+                logger.debug("Invitation %s not found or not for responder %s", invitation_id, responder_id)
                 return None
             row_dict = dict(row)
-            print(f"DEBUG: Invitation after update: {row_dict}")
-            if isinstance(row_dict.get('data'), str):
-                try:
-                    row_dict['data'] = json.loads(row_dict['data'])
-                except Exception:
-                    row_dict['data'] = None
+            logger.debug("Invitation after update: %s", row_dict)
 
             # Update assignment status if this is a genre invitation
             if row_dict.get('object_type') == 'genre':
@@ -828,7 +891,10 @@ class VisionBoardHandler:
                 elif status == InvitationStatus.REJECTED:
                     assignment_status = 'Rejected'
                 if assignment_status:
-                    print(f"DEBUG: Attempting to update assignment for genre_id={row_dict['object_id']} and user_id={row_dict['receiver_id']} to status={assignment_status}")
+                    logger.debug(
+                        "Updating assignment for genre %s and user %s to %s",
+                        row_dict['object_id'], row_dict['receiver_id'], assignment_status,
+                    )
                     result = await conn.execute(
                         """
                         UPDATE genre_assignments
@@ -839,13 +905,14 @@ class VisionBoardHandler:
                         row_dict['object_id'],
                         row_dict['receiver_id']
                     )
-                    print(f"DEBUG: Assignment update result: {result}")
+                    logger.debug("Assignment update result: %s", result)
+                    await self.cache.bump(await self._visionboard_id_for_genre(conn, row_dict['object_id']))
 
-            return Invitation(**row_dict)
+            return from_row(Invitation, row)
 
     async def send_group_message(self, visionboard_id: uuid.UUID, sender_id: uuid.UUID, message: str) -> 'GroupMessage':
         """Send a group chat message to a vision board group."""
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             # Security: check sender is a member (creator or assigned)
             member_query = """
                 SELECT 1 FROM visionboards WHERE id = $1 AND created_by = $2
@@ -863,11 +930,18 @@ class VisionBoardHandler:
                 RETURNING id, visionboard_id, sender_id, message, created_at
             """
             row = await conn.fetchrow(query, visionboard_id, sender_id, message)
-            return GroupMessage(**dict(row))
+        # Chat arrives over a websocket, which the stickiness middleware does not count as writing
+        replica_router.note_write(uuid.UUID(str(sender_id)))
+        return from_row(GroupMessage, row)
+
+    @read_only
+    async def get_group_messages(self, visionboard_id: uuid.UUID, user_id: uuid.UUID, limit: int = 50, before: datetime.datetime = None, cursor: Optional[str] = None) -> list['GroupMessage']:
+        """Fetch group chat messages for a vision board (paginated, newest first).
 
-    async def get_group_messages(self, visionboard_id: uuid.UUID, user_id: uuid.UUID, limit: int = 50, before: datetime.datetime = None) -> list['GroupMessage']:
-        """Fetch group chat messages for a vision board (paginated, newest first)."""
-        async with self.pool.acquire() as conn:
+        ``cursor`` continues after a previous page; ``before`` is the older
+        timestamp-only filter. Raises ValueError for a malformed cursor.
+        """
+        async with acquire(self.pool) as conn:
             # Security: check user is a member
             member_query = """
                 SELECT 1 FROM visionboards WHERE id = $1 AND created_by = $2
@@ -888,23 +962,27 @@ class VisionBoardHandler:
             if before:
                 query += " AND created_at < $2"
                 params.append(before)
-            query += " ORDER BY created_at DESC LIMIT $%d" % (len(params) + 1)
+            if cursor:
+                condition, values = keyset_condition(["created_at", "id"], decode_cursor(cursor), len(params) + 1)
+                query += f" AND {condition}"
+                params.extend(values)
+            query += " ORDER BY created_at DESC, id DESC LIMIT $%d" % (len(params) + 1)
             params.append(limit)
             rows = await conn.fetch(query, *params)
-            return [GroupMessage(**dict(row)) for row in rows] 
+            return from_rows(GroupMessage, rows) 
 
     # --- Drafts ---
     async def list_drafts(self, visionboard_id: uuid.UUID) -> list:
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch(
                 """
                 SELECT * FROM drafts WHERE visionboard_id = $1 ORDER BY updated_at DESC
                 """, visionboard_id
             )
-            return [Draft(**dict(row)) for row in rows]
+            return from_rows(Draft, rows)
 
     async def create_draft(self, visionboard_id: uuid.UUID, user_id: uuid.UUID, media_url: str, media_type: str = None, description: str = None):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             row = await conn.fetchrow(
                 """
                 INSERT INTO drafts (visionboard_id, user_id, media_url, media_type, description)
@@ -913,14 +991,14 @@ class VisionBoardHandler:
                 """,
                 visionboard_id, user_id, media_url, media_type, description
             )
-            return Draft(**dict(row))
+            return from_row(Draft, row)
 
     async def get_draft(self, draft_id: uuid.UUID):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             row = await conn.fetchrow(
                 "SELECT * FROM drafts WHERE id = $1", draft_id
             )
-            return Draft(**dict(row)) if row else None
+            return from_row(Draft, row) if row else None
 
     async def update_draft(self, draft_id: uuid.UUID, user_id: uuid.UUID, **fields):
         if not fields:
@@ -941,12 +1019,12 @@ class VisionBoardHandler:
             WHERE id = ${param_count} AND user_id = ${param_count+1}
             RETURNING *
         """
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             row = await conn.fetchrow(query, *values)
-            return Draft(**dict(row)) if row else None
+            return from_row(Draft, row) if row else None
 
     async def delete_draft(self, draft_id: uuid.UUID, user_id: uuid.UUID) -> bool:
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             result = await conn.execute(
                 "DELETE FROM drafts WHERE id = $1 AND user_id = $2", draft_id, user_id
             )
@@ -954,14 +1032,14 @@ class VisionBoardHandler:
 
     # --- Draft Comments ---
     async def list_draft_comments(self, draft_id: uuid.UUID) -> list:
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             rows = await conn.fetch(
                 "SELECT * FROM draft_comments WHERE draft_id = $1 ORDER BY created_at ASC", draft_id
             )
-            return [DraftComment(**dict(row)) for row in rows]
+            return from_rows(DraftComment, rows)
 
     async def create_draft_comment(self, draft_id: uuid.UUID, user_id: uuid.UUID, comment: str):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             row = await conn.fetchrow(
                 """
                 INSERT INTO draft_comments (draft_id, user_id, comment)
@@ -970,10 +1048,10 @@ class VisionBoardHandler:
                 """,
                 draft_id, user_id, comment
             )
-            return DraftComment(**dict(row))
+            return from_row(DraftComment, row)
 
     async def update_draft_comment(self, comment_id: uuid.UUID, user_id: uuid.UUID, comment: str):
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             row = await conn.fetchrow(
                 """
                 UPDATE draft_comments SET comment = $1, updated_at = $2
@@ -982,23 +1060,38 @@ class VisionBoardHandler:
                 """,
                 comment, datetime.datetime.utcnow(), comment_id, user_id
             )
-            return DraftComment(**dict(row)) if row else None
+            return from_row(DraftComment, row) if row else None
 
     async def delete_draft_comment(self, comment_id: uuid.UUID, user_id: uuid.UUID) -> bool:
-        async with self.pool.acquire() as conn:
+        async with acquire(self.pool) as conn:
             result = await conn.execute(
                 "DELETE FROM draft_comments WHERE id = $1 AND user_id = $2", comment_id, user_id
             )
             return result.startswith("DELETE 1") 
 
-    async def get_visionboard_collaborators(self, visionboard_id: uuid.UUID):
-        """Get all collaborators (user_id, role) for a vision board. Role is the genre name."""
-        async with self.pool.acquire() as conn:
+    async def get_collaborator_index(self, visionboard_id: uuid.UUID) -> Dict[uuid.UUID, VisionBoardCollaborator]:
+        """Accepted collaborators of a vision board keyed by user id.
+
+        Cached per board and dropped whenever an assignment or genre invitation
+        on the board changes. The dict is shared between callers; do not mutate it.
+        """
+        return await self._cached(visionboard_id, "collaborator_index", lambda: self._fetch_collaborator_index(visionboard_id))
+
+    async def _fetch_collaborator_index(self, visionboard_id: uuid.UUID) -> Dict[uuid.UUID, VisionBoardCollaborator]:
+        async with acquire(self.pool) as conn:
             query = """
-                SELECT ga.user_id, g.name as role
+                SELECT ga.user_id,
+                       (array_agg(ga.work_type ORDER BY ga.invited_at, ga.id))[1] AS work_type,
+                       array_agg(g.name ORDER BY ga.invited_at, ga.id) AS roles
                 FROM genre_assignments ga
                 JOIN genres g ON ga.genre_id = g.id
                 WHERE g.visionboard_id = $1 AND ga.status = 'Accepted'
+                GROUP BY ga.user_id
             """
             rows = await conn.fetch(query, visionboard_id)
-            return [(row['user_id'], row['role']) for row in rows] 
\ No newline at end of file
+            return {collaborator.user_id: collaborator for collaborator in from_rows(VisionBoardCollaborator, rows)}
+
+    async def get_visionboard_collaborators(self, visionboard_id: uuid.UUID):
+        """Get all collaborators (user_id, role) for a vision board. Role is the genre name."""
+        index = await self.get_collaborator_index(visionboard_id)
+        return [(user_id, role) for user_id, collaborator in index.items() for role in collaborator.roles]
\ No newline at end of file
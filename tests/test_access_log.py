@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from src.utils.access_log import AccessLog, AccessLogMiddleware, note_query
+from src.utils.log import recent
+
+
+def make_app(log: AccessLog) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/posts/{post_id}/comments")
+    async def comment(post_id: str, request: Request):
+        note_query(0.002)
+        note_query(0.003)
+        return {"post_id": post_id}
+
+    @app.get("/boom")
+    async def boom():
+        raise HTTPException(status_code=500, detail="boom")
+
+    app.add_middleware(AccessLogMiddleware, log=log)
+    return app
+
+
+def records(stream: io.StringIO) -> list:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_one_structured_record_per_request():
+    stream = io.StringIO()
+    log = AccessLog(stream=stream)
+    client = TestClient(make_app(log))
+    log.start()
+    try:
+        response = client.post("/posts/abc/comments?token=secret&page=2", json={"comment": "hi"})
+        client.get("/nowhere")
+    finally:
+        log.stop()
+
+    first, missing = records(stream)
+    assert first["event"] == "request"
+    assert first["method"] == "POST"
+    assert first["route"] == "/posts/{post_id}/comments"
+    assert first["status"] == 200
+    assert first["query"] == "token=%5Bredacted%5D&page=2"
+    assert first["db_queries"] == 2 and first["db_ms"] == 5.0
+    assert first["bytes_in"] == len(b'{"comment":"hi"}')
+    assert first["bytes_out"] == len(response.content)
+    assert first["duration_ms"] >= 0 and "timestamp" in first
+    assert missing["route"] == "<unmatched>" and missing["status"] == 404
+    # Written by the application's log writer, to their own channel only
+    assert logging.getLogger("access").handlers == []
+    assert not [record for record in recent.snapshot() if record.name == "access"]
+
+
+def test_sampling_keeps_errors():
+    stream = io.StringIO()
+    log = AccessLog(sample_rate=0, stream=stream)
+    client = TestClient(make_app(log))
+    log.start()
+    try:
+        client.post("/posts/abc/comments")
+        client.get("/boom")
+    finally:
+        log.stop()
+    assert [(r["route"], r["status"]) for r in records(stream)] == [("/boom", 500)]
+
+
+def test_records_are_dropped_until_started():
+    stream = io.StringIO()
+    log = AccessLog(stream=stream)
+    TestClient(make_app(log)).post("/posts/abc/comments")
+    assert stream.getvalue() == ""
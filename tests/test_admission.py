@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.utils.admission import AdaptiveLimit, AdmissionMiddleware, route_class
+
+
+def test_route_classes():
+    assert route_class("GET", "/health/db") == "health"
+    assert route_class("GET", "/") == "health"
+    assert route_class("POST", "/auth/signin") == "auth"
+    assert route_class("POST", "/posts") == "writes"
+    assert route_class("GET", "/v1/message/123") == "chat"
+    assert route_class("GET", "/v1/visionboard/1/group-chat/messages") == "chat"
+    assert route_class("GET", "/posts/feed") == "feeds"
+    assert route_class("GET", "/posts/following-feed/123") == "feeds"
+    assert route_class("GET", "/posts/123") == "reads"
+    assert route_class("POST", "/posts/batch") == "bulk"
+
+
+def test_limit_grows_when_fast_and_shrinks_once_per_round_when_slow():
+    limit = AdaptiveLimit("reads", initial=4, min_limit=2, max_limit=6, tolerance=2, slack=0)
+    for _ in range(50):
+        started = [limit.try_acquire() for _ in range(int(limit.limit))]
+        for admitted in started:
+            limit.release(admitted - 0.001)
+    assert limit.limit == 6
+
+    # A round of slow requests admitted together shrinks the limit once
+    started = [limit.try_acquire() for _ in range(6)]
+    assert limit.try_acquire() is None and limit.rejected == 1
+    for admitted in started:
+        limit.release(admitted - 1.0)
+    assert limit.limit == pytest.approx(5.4)
+
+    for _ in range(20):
+        limit.release(limit.try_acquire(), dropped=True)
+    assert limit.limit == 2
+
+
+def test_slow_routes_do_not_shrink_the_limit_of_fast_ones_in_the_same_class():
+    limit = AdaptiveLimit("reads", initial=20, tolerance=2, slack=0.02)
+    for i in range(400):
+        route, latency = ("/posts/{post_id}", 0.002) if i % 2 else ("/posts/search", 0.08)
+        limit.release(limit.try_acquire() - latency, route=route)
+    assert limit.limit >= 20
+    assert limit.stats()["baseline_ms"] == {"/posts/search": pytest.approx(80, rel=0.01), "/posts/{post_id}": pytest.approx(2, rel=0.01)}
+
+    # A route slower than its own baseline still shrinks the limit
+    limit.release(limit.try_acquire() - 0.5, route="/posts/search")
+    assert limit.limit < 20
+
+
+@pytest.mark.asyncio
+async def test_requests_over_the_limit_are_shed_with_retry_after():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/posts/feed")
+    async def feed():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    limits = {"feeds": AdaptiveLimit("feeds", initial=2, min_limit=2)}
+    app.add_middleware(AdmissionMiddleware, limits=limits, retry_after=3)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        held = [asyncio.create_task(client.get("/posts/feed")) for _ in range(2)]
+        while limits["feeds"].in_flight < 2:
+            await asyncio.sleep(0.001)
+
+        shed = await client.get("/posts/feed")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "3"
+        assert shed.json()["class"] == "feeds"
+        assert (await client.get("/health")).status_code == 200
+
+        release.set()
+        assert [r.status_code for r in await asyncio.gather(*held)] == [200, 200]
+    assert limits["feeds"].in_flight == 0
+    assert list(limits["feeds"].stats()["baseline_ms"]) == ["/posts/feed"]
@@ -64,7 +64,7 @@ def test_fetch_direct_messages(monkeypatch):
     monkeypatch.setattr("src.utils.user_handler.UserHandler.user_exists", lambda self, user_id: True)
 
     # Patch get_direct_messages to return a fake message
-    async def async_get_direct_messages(self, user_id, other_user_id, limit=50, before=None):
+    async def async_get_direct_messages(self, user_id, other_user_id, limit=50, before=None, cursor=None):
         return [{
             "sender_id": sender_id,
             "receiver_id": receiver_id,
@@ -73,12 +73,12 @@ def test_fetch_direct_messages(monkeypatch):
         }]
     monkeypatch.setattr("src.utils.user_handler.UserHandler.get_direct_messages", async_get_direct_messages)
 
-    # Patch fetch_user to return a fake user with avatar
-    async def async_fetch_user(self, user_id):
+    # Patch the batched user lookup to return fake users with avatars
+    async def async_fetch_user_cards(executor, user_ids):
         class DummyUser:
             profile_image_url = "https://example.com/avatar.png"
-        return DummyUser()
-    monkeypatch.setattr("src.utils.user_handler.UserHandler.fetch_user", async_fetch_user)
+        return {user_id: DummyUser() for user_id in user_ids}
+    monkeypatch.setattr("src.utils.loaders.fetch_user_cards", async_fetch_user_cards)
 
     # Fetch direct messages
     response = client.get(f"/v1/message/{sender_id}", headers={"Authorization": f"Bearer {token}"})
@@ -213,7 +213,7 @@ def test_group_chat_rest_fetch_messages(monkeypatch):
     # Patch get_visionboard_handler to always return dummy handler
     from src.routes import visionboard as visionboard_routes
     class DummyHandler:
-        async def get_group_messages(self, visionboard_id, user_id, limit=50, before=None):
+        async def get_group_messages(self, visionboard_id, user_id, limit=50, before=None, cursor=None):
             return [GroupMessage(
                 id=str(uuid.uuid4()),
                 visionboard_id=visionboard_id,
@@ -231,12 +231,12 @@ def test_group_chat_rest_fetch_messages(monkeypatch):
         return DummyToken(sender_id)
     monkeypatch.setattr("src.utils.token_handler.TokenHandler.decode_token", staticmethod(dummy_decode_token))
 
-    # Patch fetch_user to return a fake user with avatar
-    async def async_fetch_user(self, user_id):
+    # Patch the batched user lookup to return fake users with avatars
+    async def async_fetch_user_cards(executor, user_ids):
         class DummyUser:
             profile_image_url = "https://example.com/avatar.png"
-        return DummyUser()
-    monkeypatch.setattr("src.utils.user_handler.UserHandler.fetch_user", async_fetch_user)
+        return {user_id: DummyUser() for user_id in user_ids}
+    monkeypatch.setattr("src.utils.loaders.fetch_user_cards", async_fetch_user_cards)
 
     # Fetch group messages
     response = client.get(f"/v1/visionboard/{visionboard_id}/group-chat/messages", headers={"Authorization": f"Bearer {token}"})
@@ -309,4 +309,296 @@ def test_group_chat_websocket(monkeypatch):
     
     # Test basic app functionality
     response = client.get("/docs")
-    assert response.status_code == 200 
\ No newline at end of file
+    assert response.status_code == 200 
+
+
+def test_visionboard_full_field_selection(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+    import uuid
+
+    app.state.jwt_secret = "test_secret_key"
+    app.state.pool = None  # Mock pool
+
+    client = TestClient(app)
+    user_id = "1b8280ba-b64f-4590-a1d6-185c69cd4709"
+    visionboard_id = str(uuid.uuid4())
+    token = "testtoken"
+
+    # Patch get_visionboard_handler to record the requested fields
+    from src.routes import visionboard as visionboard_routes
+    requested = {}
+    class DummyHandler:
+        async def visionboard_exists(self, visionboard_id):
+            return True
+
+        async def get_visionboard_full(self, visionboard_id, fields=None):
+            requested["fields"] = fields
+            return {"id": str(visionboard_id), "name": "Board", "genres": []}
+    monkeypatch.setattr(visionboard_routes, "get_visionboard_handler", lambda: DummyHandler())
+
+    class DummyToken:
+        def __init__(self, sub):
+            self.sub = sub
+    def dummy_decode_token(token_str):
+        return DummyToken(user_id)
+    monkeypatch.setattr("src.utils.token_handler.TokenHandler.decode_token", staticmethod(dummy_decode_token))
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get(f"/v1/visionboard/{visionboard_id}/full?fields=genres, tasks", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["visionboard"]["id"] == visionboard_id
+    assert requested["fields"] == {"genres", "tasks"}
+
+    response = client.get(f"/v1/visionboard/{visionboard_id}/full?fields=genres,comments", headers=headers)
+    assert response.status_code == 400
+
+
+def test_visionboard_etag_not_modified(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+    import uuid
+
+    app.state.jwt_secret = "test_secret_key"
+    app.state.pool = None  # Mock pool
+
+    client = TestClient(app)
+    user_id = "1b8280ba-b64f-4590-a1d6-185c69cd4709"
+    visionboard_id = str(uuid.uuid4())
+    missing_id = str(uuid.uuid4())
+    token = "testtoken"
+
+    from src.routes import visionboard as visionboard_routes
+    class DummyHandler:
+        async def visionboard_exists(self, visionboard_id):
+            return str(visionboard_id) != missing_id
+
+        async def get_visionboard_summary(self, visionboard_id):
+            from src.models.visionboard import VisionBoardSummary
+            return VisionBoardSummary(
+                id=visionboard_id, name="Board", status="Draft",
+                start_date="2024-07-08T00:00:00Z", end_date="2024-07-09T00:00:00Z",
+                created_by=user_id, total_genres=0, total_assignments=0,
+                total_tasks=0, completed_tasks=0
+            )
+    monkeypatch.setattr(visionboard_routes, "get_visionboard_handler", lambda: DummyHandler())
+
+    class DummyToken:
+        def __init__(self, sub):
+            self.sub = sub
+    def dummy_decode_token(token_str):
+        return DummyToken(user_id)
+    monkeypatch.setattr("src.utils.token_handler.TokenHandler.decode_token", staticmethod(dummy_decode_token))
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get(f"/v1/visionboard/{visionboard_id}/summary", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get(f"/v1/visionboard/{visionboard_id}/summary", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    import asyncio
+    asyncio.run(visionboard_routes.visionboard_cache.bump(uuid.UUID(visionboard_id)))
+    response = client.get(f"/v1/visionboard/{visionboard_id}/summary", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    # No 304 (and no version kept) for a board that does not exist
+    response = client.get(f"/v1/visionboard/{missing_id}/summary", headers={**headers, "If-None-Match": "*"})
+    assert response.status_code == 404
+    assert uuid.UUID(missing_id) not in visionboard_routes.visionboard_cache._versions
+
+
+def test_record_post_views_is_buffered(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+    import uuid
+
+    app.state.jwt_secret = "test_secret_key"
+    app.state.pool = None  # Mock pool
+
+    client = TestClient(app)
+    user_id = "1b8280ba-b64f-4590-a1d6-185c69cd4709"
+    token = "testtoken"
+
+    from src.utils.view_buffer import ViewBuffer
+    from src.utils import post_handler
+    buffer = ViewBuffer()
+    monkeypatch.setattr(post_handler, "view_buffer", buffer)
+
+    class DummyToken:
+        def __init__(self, sub):
+            self.sub = uuid.UUID(sub)
+    def dummy_decode_token(token_str):
+        return DummyToken(user_id)
+    monkeypatch.setattr("src.utils.token_handler.TokenHandler.decode_token", staticmethod(dummy_decode_token))
+
+    headers = {"Authorization": f"Bearer {token}"}
+    post_id = str(uuid.uuid4())
+    response = client.post("/posts/views", json={"post_ids": [post_id, post_id]}, headers=headers)
+    assert response.status_code == 202
+    assert response.json() == {"recorded": 1}
+    assert buffer.pending_views(uuid.UUID(post_id)) == 1
+
+    response = client.post("/posts/views", json={"post_ids": [str(uuid.uuid4()) for _ in range(501)]}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_database_health_reports_pool_stats():
+    from fastapi.testclient import TestClient
+    from src.app import app
+
+    client = TestClient(app)
+    app.state.pool = None
+    assert client.get("/health/db").status_code == 503
+
+    class DummyPool:
+        def stats(self):
+            return {"size": 2, "idle": 1, "in_use": 1, "timeouts": 0}
+    app.state.pool = DummyPool()
+    try:
+        response = client.get("/health/db")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok", "size": 2, "idle": 1, "in_use": 1, "timeouts": 0}
+    finally:
+        app.state.pool = None
+
+
+def test_writes_keep_the_user_on_the_primary(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+    from src.utils.replicas import router
+
+    client = TestClient(app)
+    user_id = uuid.uuid4()
+
+    class DummyToken:
+        def __init__(self, sub):
+            self.sub = sub
+    monkeypatch.setattr("src.utils.token_handler.TokenHandler.decode_token", staticmethod(lambda token: DummyToken(user_id)))
+
+    class DummyReplica:
+        def stats(self):
+            return {"size": 1}
+    router.configure(None, [DummyReplica()])
+    headers = {"Authorization": "Bearer testtoken"}
+    try:
+        client.get("/no-such-route", headers=headers)
+        assert not router.is_sticky(user_id)
+        client.post("/no-such-route", headers=headers)
+        assert router.is_sticky(user_id)
+
+        response = client.get("/health/replicas")
+        assert response.status_code == 200
+        assert response.json()["sticky_users"] == 1
+        assert response.json()["pools"] == [{"size": 1}]
+    finally:
+        router.configure(None, [])
+
+
+def test_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    from src.app import app
+
+    client = TestClient(app)
+    client.get("/health")
+
+    class DummyPool:
+        def stats(self):
+            return {"size": 2, "idle": 1, "in_use": 1, "max_size": 10, "acquires": 5, "timeouts": 0,
+                    "wait_seconds": {"sum": 0.25}}
+    app.state.pool = DummyPool()
+    try:
+        response = client.get("/metrics")
+    finally:
+        app.state.pool = None
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert 'db_pool_in_use{pool="primary"} 1' in body
+    assert 'db_pool_acquire_wait_seconds_total{pool="primary"} 0.25' in body
+    assert 'cache_lookups_total{cache="cache",result="miss"}' in body
+    assert 'websocket_connections{room_type="group"} 0' in body
+
+
+def test_trace_health_lists_sampled_requests(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+    from src.utils import tracing
+
+    memory = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(memory, sample_rate=1.0))
+    client = TestClient(app)
+    client.get("/health")
+    traces = client.get("/health/traces").json()["traces"]
+    assert [span["name"] for span in traces[0]["spans"]] == ["GET /health"]
+
+
+def test_admin_query_routes_need_the_admin_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+
+    client = TestClient(app)
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/admin/queries").status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "admin-secret")
+    assert client.get("/admin/queries").status_code == 401
+    assert client.get("/admin/queries", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    headers = {"Authorization": "Bearer admin-secret"}
+    response = client.get("/admin/queries?limit=5", headers=headers)
+    assert response.status_code == 200
+    assert "statements" in response.json()
+    assert client.get("/admin/queries?order=nonsense", headers=headers).status_code == 400
+    assert client.get("/admin/queries/slow", headers=headers).json().keys() == {"slow", "plans"}
+
+
+def test_admin_loop_route(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+
+    client = TestClient(app)
+    monkeypatch.setenv("ADMIN_TOKEN", "admin-secret")
+    assert client.get("/admin/loop").status_code == 401
+    headers = {"Authorization": "Bearer admin-secret"}
+    body = client.get("/admin/loop", headers=headers).json()
+    assert {"last_lag_ms", "max_lag_ms", "blocks", "sites", "captures"} <= body.keys()
+    assert client.post("/admin/loop/reset", headers=headers).json() == {"message": "Event loop statistics reset"}
+
+
+def test_post_import_needs_the_admin_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import app
+    from src.utils.post_handler import PostHandler
+
+    imported = []
+
+    async def fake_import(self, posts, user_id):
+        imported.append((len(posts), user_id))
+        return [uuid.uuid4() for _ in posts]
+
+    monkeypatch.setattr(PostHandler, "import_posts", fake_import)
+    monkeypatch.setenv("ADMIN_TOKEN", "admin-secret")
+    client = TestClient(app)
+    author = uuid.uuid4()
+    body = [{"caption": "Imported"}]
+    assert client.post(f"/posts/batch?user_id={author}", json=body, headers={"Authorization": "Bearer a.user.jwt"}).status_code == 401
+    response = client.post(f"/posts/batch?user_id={author}", json=body, headers={"Authorization": "Bearer admin-secret"})
+    assert response.status_code == 200 and response.json()["count"] == 1
+    assert imported == [(1, author)]
+
+
+def test_malformed_post_ids_are_rejected_before_the_cursor():
+    from fastapi.testclient import TestClient
+    from src.app import app
+
+    client = TestClient(app)
+    response = client.get("/posts/user/not-a-uuid")
+    assert response.status_code == 400 and "user_id" in response.json()["detail"]
+    for path in ("/posts/not-a-uuid/comments", f"/posts/{uuid.uuid4()}/comments?parent_id=nope"):
+        response = client.get(path)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid post or comment ID"
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import pickle
+import uuid
+from typing import Optional
+
+import pytest
+
+from src.models import UserProfile
+from src.utils.cache import Cache, cached, invalidates
+from src.utils.single_flight import coalescing_stats
+
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL")
+requires_redis = pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set")
+
+
+class Counter:
+    def __init__(self):
+        self.loads = 0
+
+    async def __call__(self):
+        self.loads += 1
+        await asyncio.sleep(0.01)
+        return {"load": self.loads}
+
+
+@pytest.mark.asyncio
+async def test_tags_invalidate_entries_and_misses_share_one_load():
+    cache = Cache(max_entries=16, ttl=60)
+    load = Counter()
+    results = await asyncio.gather(*(cache.get_or_load("a", load, tags=["user:1"]) for _ in range(5)))
+    assert load.loads == 1 and all(r == {"load": 1} for r in results)
+    await cache.get_or_load("b", load, tags=["user:1", "post:2"])
+    await cache.get_or_load("c", load, tags=["post:3"])
+    assert cache.hits == 0 and cache.misses == 3
+
+    await cache.invalidate("user:1")
+    assert await cache.get_or_load("c", load) == {"load": 3}
+    assert await cache.get_or_load("a", load) == {"load": 4}
+    assert cache.stats()["entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_cached():
+    cache = Cache(max_entries=16, ttl=60)
+    load = Counter()
+    pending = asyncio.create_task(cache.get_or_load("a", load, tags=["post:1"]))
+    while not load.loads:
+        await asyncio.sleep(0)
+    await cache.invalidate("post:1")
+    assert await pending == {"load": 1}
+    assert await cache.get_or_load("a", load, tags=["post:1"]) == {"load": 2}
+
+
+@pytest.mark.asyncio
+async def test_entry_and_memory_limits_evict_least_recently_used():
+    cache = Cache(max_entries=2, max_bytes=10_000, ttl=60)
+    for key in "abc":
+        await cache.get_or_load(key, Counter())
+    assert cache.stats()["entries"] == 2 and "a" not in cache._entries
+
+    await cache.get_or_load("big", lambda: asyncio.sleep(0, "x" * 20_000))
+    assert "big" not in cache._entries
+    await cache.get_or_load("d", lambda: asyncio.sleep(0, "x" * 6_000))
+    await cache.get_or_load("e", lambda: asyncio.sleep(0, "x" * 6_000))
+    assert list(cache._entries) == ["e"] and cache.stats()["bytes"] <= 10_000
+
+
+class Profiles:
+    store = Cache(max_entries=16, ttl=60)
+
+    def __init__(self):
+        self.names = {}
+        self.reads = 0
+
+    @cached(tags=["user:{user_id}"], store=store)
+    async def get(self, user_id: uuid.UUID, full: bool = False):
+        self.reads += 1
+        return self.names.get(user_id)
+
+    @invalidates("user:{user_id}", store=store)
+    async def rename(self, user_id: uuid.UUID, name: str):
+        self.names[user_id] = name
+
+
+@pytest.mark.asyncio
+async def test_none_is_not_cached_and_result_tags_invalidate():
+    cache = Cache(max_entries=16, ttl=60)
+    found = {}
+
+    @cached(tags=["post:{post_id}", "user:{result[author]}"], store=cache)
+    async def get_post(source, post_id: int) -> Optional[dict]:
+        return found.get(post_id)
+
+    assert await get_post(None, 1) is None
+    found[1] = {"author": 7}
+    assert await get_post(None, 1) == {"author": 7}
+    assert cache.misses == 2 and await get_post(None, 1) == {"author": 7} and cache.hits == 1
+    await cache.invalidate("user:7")
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_decorators_cache_by_arguments_and_invalidate_on_write():
+    profiles, user_id = Profiles(), uuid.uuid4()
+    await profiles.rename(user_id, "Ada")
+    assert await profiles.get(user_id) == await profiles.get(user_id, full=False) == "Ada"
+    assert profiles.reads == 1
+    assert coalescing_stats()["Profiles.get"]["cached"] >= 1
+    await profiles.rename(user_id=user_id, name="Grace")
+    assert await profiles.get(user_id) == "Grace"
+    assert profiles.reads == 2
+
+
+class MemoryRedis:
+    """The few Redis commands the L2 tier uses, over a dict"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, nx=False, ex=None, px=None):
+        if not (nx and key in self.data):
+            self.data[key] = value.encode() if isinstance(value, str) else value
+
+    def pipeline(self, transaction=True):
+        return self
+
+    async def execute(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+async def fetch_user(row: dict, user_id: uuid.UUID) -> Optional[UserProfile]:
+    return UserProfile(**row)
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_stores_validated_json_without_credentials():
+    redis = MemoryRedis()
+    first, second = Cache("users", ttl=60, redis_url="redis://memory"), Cache("users", ttl=60, redis_url="redis://memory")
+    first._redis = second._redis = redis
+    # Keyed on the arguments after the first, like a handler method's after self
+    user_id = uuid.uuid4()
+    row = {"id": str(user_id), "name": "Ada", "email": "ada@example.com", "password": "secret"}
+
+    assert (await cached(store=first)(fetch_user)(row, user_id)).name == "Ada"
+    (key,) = [key for key in redis.data if key.startswith("cache:users:")]
+    payload = redis.data[key]
+    header, _, value = payload.partition(b"\n")
+    assert json.loads(value)["email"] == "ada@example.com" and b"secret" not in payload
+    cached_user = await cached(store=second)(fetch_user)({}, user_id)
+    assert isinstance(cached_user, UserProfile) and cached_user.id == user_id and second.l2_hits == 1
+
+    # Whatever else is in Redis is validated, never unpickled
+    redis.data[key] = header + b"\n" + pickle.dumps(cached_user)
+    third = Cache("users", ttl=60, redis_url="redis://memory")
+    third._redis = redis
+    assert (await cached(store=third)(fetch_user)(row, user_id)).name == "Ada"
+    assert third.l2_hits == 0 and third.misses == 1
+
+
+@requires_redis
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_and_invalidations_reach_other_processes():
+    name = f"test-{uuid.uuid4().hex}"
+    first, second = Cache(name, ttl=60, redis_url=TEST_REDIS_URL), Cache(name, ttl=60, redis_url=TEST_REDIS_URL)
+    first.start()
+    await asyncio.sleep(0.1)
+    tag = f"post:{uuid.uuid4()}"
+    load = Counter()
+    try:
+        assert await first.get_or_load("k", load, tags=[tag]) == {"load": 1}
+        assert await second.get_or_load("k", load, tags=[tag]) == {"load": 1}
+        assert second.l2_hits == 1 and load.loads == 1
+
+        await second.invalidate(tag)
+        await asyncio.sleep(0.1)
+        assert "k" not in first._entries
+        assert await first.get_or_load("k", load, tags=[tag]) == {"load": 2}
+    finally:
+        await first.stop()
+        await second.stop()
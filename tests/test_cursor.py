@@ -0,0 +1,47 @@
+import datetime
+import uuid
+
+import pytest
+
+from src.utils.cursor import decode_cursor, encode_cursor, keyset_condition, page_cursor
+
+
+def test_round_trip_preserves_key_id_and_direction():
+    created_at = datetime.datetime(2024, 7, 8, 12, 30, 0, 123456, tzinfo=datetime.timezone.utc)
+    row_id = uuid.uuid4()
+    cursor = decode_cursor(encode_cursor(created_at, row_id, "asc"), "asc")
+    assert cursor.key == (created_at,) and cursor.id == row_id and cursor.direction == "asc"
+
+    token = encode_cursor((12, 40, created_at), row_id)
+    assert "+" not in token and "/" not in token and "=" not in token
+    assert decode_cursor(token, key_size=3).values == [12, 40, created_at, row_id]
+
+
+def test_rejects_tampered_foreign_and_malformed_cursors():
+    token = encode_cursor(datetime.datetime.now(datetime.timezone.utc), uuid.uuid4())
+    payload, signature = token.split(".")
+    forged = encode_cursor(datetime.datetime(2000, 1, 1), uuid.uuid4()).split(".")[0]
+    for bad in [f"{forged}.{signature}", f"{payload}.{signature[:-2]}AA", "2024-07-08T00:00:00+00:00", "", "a.b.c"]:
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+    with pytest.raises(ValueError):
+        decode_cursor(token, "asc")
+    with pytest.raises(ValueError):
+        decode_cursor(token, key_size=3)
+
+
+def test_keyset_condition_follows_direction():
+    row_id = uuid.uuid4()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    sql, params = keyset_condition(["p.created_at", "p.id"], decode_cursor(encode_cursor(now, row_id)), 3)
+    assert sql == "(p.created_at, p.id) < ($3, $4)" and params == [now, row_id]
+    sql, _ = keyset_condition(["created_at", "id"], decode_cursor(encode_cursor(now, row_id, "asc"), "asc"), 1)
+    assert sql == "(created_at, id) > ($1, $2)"
+
+
+def test_page_cursor_only_for_full_pages():
+    rows = [{"id": str(uuid.uuid4()), "created_at": "2024-07-08T00:00:00Z"} for _ in range(3)]
+    assert page_cursor(rows, 4) is None
+    cursor = decode_cursor(page_cursor(rows, 3))
+    assert cursor.id == uuid.UUID(rows[-1]["id"])
+    assert cursor.key == (datetime.datetime(2024, 7, 8, tzinfo=datetime.timezone.utc),)
@@ -0,0 +1,825 @@
+import datetime
+import os
+import uuid
+
+import asyncpg
+import pytest
+
+from src.utils.db import init_connection
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+requires_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_json_codecs_round_trip_python_objects():
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    try:
+        payload = {"work_type": "Online", "id": uuid.UUID(int=1), "nested": [1, {"a": None}]}
+        row = await pool.fetchrow("SELECT $1::jsonb AS b, $1::json AS j, json_build_object('k', 1) AS built", payload)
+        expected = {"work_type": "Online", "id": str(uuid.UUID(int=1)), "nested": [1, {"a": None}]}
+        assert row["b"] == expected
+        assert row["j"] == expected
+        assert row["built"] == {"k": 1}
+    finally:
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_post_child_rows_batched_and_imported():
+    from src.models.post import PostCreate, PostImport
+    from src.utils.post_handler import PostHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    handler = PostHandler(pool)
+    user_id, collaborator_id = uuid.uuid4(), uuid.uuid4()
+    media = [{"url": f"https://example.com/{i}.jpg", "type": "image", "order": i} for i in range(3)]
+    post_ids = []
+    try:
+        post_ids.append(await handler.create_post(
+            PostCreate(caption="Created", media=media, tags=["a", "b", "a"]), user_id
+        ))
+        post_ids += await handler.import_posts([
+            PostImport(caption="Imported", media=media[:1], tags=["x", "x"],
+                       collaborators=[{"user_id": collaborator_id, "role": "editor"},
+                                      {"user_id": collaborator_id, "role": "collaborator"}]),
+            PostImport(caption="Imported bare"),
+        ], user_id)
+        with pytest.raises(ValueError):
+            await handler.import_posts([PostImport(caption="")], user_id)
+        tomorrow = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+        with pytest.raises(ValueError):
+            await handler.import_posts([PostImport(caption="Pinned", created_at=tomorrow)], user_id)
+        with pytest.raises(PermissionError):
+            await handler.import_posts([PostImport(caption="Not mine", visionboard_id=uuid.uuid4())], user_id)
+
+        async def count(table):
+            return await pool.fetchval(f"SELECT count(*) FROM {table} WHERE post_id = ANY($1::uuid[])", post_ids)
+
+        assert await pool.fetchval("SELECT count(*) FROM posts WHERE id = ANY($1::uuid[])", post_ids) == 3
+        assert await count("post_media") == 4
+        assert await count("post_tags") == 3
+        assert await pool.fetchval(
+            "SELECT role FROM post_collaborators WHERE post_id = $1", post_ids[1]
+        ) == "editor"
+        assert await pool.fetchval("SELECT is_collaborative FROM posts WHERE id = $1", post_ids[1])
+
+        hydrated = await handler.get_post_by_id(post_ids[1])
+        assert [m.url for m in hydrated.media] == ["https://example.com/0.jpg"] and hydrated.tags == ["x"]
+        assert [(c.user_id, c.role.value) for c in hydrated.collaborators] == [(collaborator_id, "editor")]
+        assert (hydrated.like_count, hydrated.comment_count, hydrated.top_comments) == (0, 0, [])
+    finally:
+        for table in ("post_media", "post_tags", "post_collaborators"):
+            await pool.execute(f"DELETE FROM {table} WHERE post_id = ANY($1::uuid[])", post_ids)
+        await pool.execute("DELETE FROM posts WHERE id = ANY($1::uuid[])", post_ids)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_a_page_of_posts_is_hydrated_in_a_fixed_number_of_queries():
+    from src.utils.post_handler import PostHandler
+
+    statements = []
+
+    async def init(conn):
+        await init_connection(conn)
+        conn.add_query_logger(lambda query: statements.append(query.query))
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init)
+    handler = PostHandler(pool)
+    author, fan = uuid.uuid4(), uuid.uuid4()
+    start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    post_ids = [uuid.uuid4() for _ in range(5)]
+    try:
+        await pool.executemany(
+            "INSERT INTO posts (id, user_id, caption, created_at) VALUES ($1, $2, 'Page', $3)",
+            [(post_id, author, start + datetime.timedelta(minutes=i)) for i, post_id in enumerate(post_ids)],
+        )
+        busy = post_ids[-1]
+        await pool.execute("INSERT INTO post_tags (post_id, tag) VALUES ($1, 'busy')", busy)
+        await pool.execute("INSERT INTO post_likes (user_id, post_id, created_at) VALUES ($1, $2, now())", fan, busy)
+        await pool.executemany(
+            "INSERT INTO post_comments (id, post_id, user_id, content, created_at) VALUES ($1, $2, $3, $4, $5)",
+            [(uuid.uuid4(), busy, fan, f"comment {i}", start + datetime.timedelta(minutes=i)) for i in range(4)],
+        )
+
+        async def page(limit):
+            statements.clear()
+            posts = (await handler.get_user_posts(author, limit=limit))["posts"]
+            return posts, len(statements)
+
+        await page(5)  # the first query introspects the column types
+        (one,), single = await page(1)
+        posts, many = await page(5)
+        assert single == many
+        assert one.id == busy and posts[0] == one
+        assert (one.tags, one.like_count, one.comment_count) == (["busy"], 1, 4)
+        assert [c.content for c in one.top_comments] == ["comment 0", "comment 1", "comment 2"]
+        assert [(p.tags, p.like_count, p.top_comments) for p in posts[1:]] == [([], 0, [])] * 4
+    finally:
+        await pool.execute("DELETE FROM post_comments WHERE post_id = ANY($1::uuid[])", post_ids)
+        await pool.execute("DELETE FROM post_likes WHERE post_id = ANY($1::uuid[])", post_ids)
+        await pool.execute("DELETE FROM post_tags WHERE post_id = ANY($1::uuid[])", post_ids)
+        await pool.execute("DELETE FROM posts WHERE id = ANY($1::uuid[])", post_ids)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_cached_post_keeps_views_fresh_and_is_tagged_with_its_author():
+    from src.utils import post_handler as post_module
+    from src.utils.cache import cache
+    from src.utils.post_handler import PostHandler
+    from src.utils.view_buffer import ViewBuffer
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    handler = PostHandler(pool)
+    post_id, author = uuid.uuid4(), uuid.uuid4()
+    buffer, post_module.view_buffer = post_module.view_buffer, ViewBuffer()
+    try:
+        # A miss is not cached, so the post shows up as soon as it exists
+        assert await handler.get_post_by_id(post_id) is None
+        await pool.execute("INSERT INTO posts (id, user_id, caption) VALUES ($1, $2, 'Cached')", post_id, author)
+        assert (await handler.get_post_by_id(post_id)).view_count == 0
+
+        post_module.view_buffer.record([post_id], uuid.uuid4())
+        hits = cache.hits
+        post = await handler.get_post_by_id(post_id)
+        assert cache.hits == hits + 1 and post.view_count == 1
+
+        await cache.invalidate(f"user:{author}")
+        await handler.get_post_by_id(post_id)
+        assert cache.hits == hits + 1
+    finally:
+        post_module.view_buffer = buffer
+        await cache.invalidate(f"post:{post_id}")
+        await pool.execute("DELETE FROM posts WHERE id = $1", post_id)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_collaborator_index_shared_and_invalidated():
+    from src.models.post import PostCreate
+    from src.models.visionboard import AssignmentStatus
+    from src.utils.post_handler import PostHandler
+    from src.utils.visionboard_handler import VisionBoardHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=2, init=init_connection)
+    user_ids = []
+    try:
+        for name in ("Owner", "Editor", "Invitee"):
+            user_ids.append(await pool.fetchval(
+                "INSERT INTO users (name, email, password) VALUES ($1, $2, 'x') RETURNING id",
+                name, f"{uuid.uuid4().hex}@test.local",
+            ))
+        owner, editor, invitee = user_ids
+        board_id = await pool.fetchval(
+            """
+            INSERT INTO visionboards (name, start_date, end_date, status, created_by)
+            VALUES ('Board', now(), now() + interval '1 day', 'Draft', $1) RETURNING id
+            """,
+            owner,
+        )
+        genre_ids = [
+            await pool.fetchval("INSERT INTO genres (visionboard_id, name) VALUES ($1, $2) RETURNING id", board_id, name)
+            for name in ("Editing", "Sound")
+        ]
+        assignment = """
+            INSERT INTO genre_assignments (genre_id, user_id, status, work_type, payment_type, assigned_by)
+            VALUES ($1, $2, $3, 'Online', 'Unpaid', $4) RETURNING id
+        """
+        for genre_id in genre_ids:
+            await pool.execute(assignment, genre_id, editor, "Accepted", owner)
+        pending_id = await pool.fetchval(assignment, genre_ids[1], invitee, "Pending", owner)
+
+        handler = VisionBoardHandler(pool)
+        index = await handler.get_collaborator_index(board_id)
+        assert list(index) == [editor]
+        assert sorted(index[editor].roles) == ["Editing", "Sound"]
+        assert sorted(await handler.get_visionboard_collaborators(board_id)) == [(editor, "Editing"), (editor, "Sound")]
+
+        await handler.update_assignment_status(pending_id, AssignmentStatus.ACCEPTED, invitee)
+        assert set(await handler.get_collaborator_index(board_id)) == {editor, invitee}
+
+        post_id = await PostHandler(pool).create_post(
+            PostCreate(caption="From board", visionboard_id=board_id,
+                       collaborators=[{"user_id": editor, "role": "editor"}]),
+            owner,
+        )
+        rows = await pool.fetch("SELECT user_id, role FROM post_collaborators WHERE post_id = $1", post_id)
+        assert {row["user_id"]: row["role"] for row in rows} == {editor: "editor", invitee: "collaborator"}
+        await pool.execute("DELETE FROM post_collaborators WHERE post_id = $1", post_id)
+        await pool.execute("DELETE FROM posts WHERE id = $1", post_id)
+    finally:
+        await pool.execute(
+            "DELETE FROM genre_assignments WHERE user_id = ANY($1::uuid[]) OR assigned_by = ANY($1::uuid[])", user_ids
+        )
+        await pool.execute(
+            "DELETE FROM genres WHERE visionboard_id IN (SELECT id FROM visionboards WHERE created_by = ANY($1::uuid[]))",
+            user_ids,
+        )
+        await pool.execute("DELETE FROM visionboards WHERE created_by = ANY($1::uuid[])", user_ids)
+        await pool.execute("DELETE FROM users WHERE id = ANY($1::uuid[])", user_ids)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_comment_thread_bounded_with_cursors():
+    from src.utils.post_handler import PostHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    post_id, user_id = uuid.uuid4(), uuid.uuid4()
+    seq = iter(range(100))
+
+    async def comment(parent=None, deleted=False):
+        return await pool.fetchval(
+            """
+            INSERT INTO post_comments (id, post_id, user_id, content, parent_comment_id, created_at, deleted_at)
+            VALUES ($1, $2, $3, 'c', $4, now() + $5 * interval '1 second', CASE WHEN $6 THEN now() END)
+            RETURNING id
+            """,
+            uuid.uuid4(), post_id, user_id, parent, next(seq), deleted,
+        )
+
+    try:
+        roots = [await comment() for _ in range(3)]
+        await comment(deleted=True)
+        replies = [await comment(roots[0]) for _ in range(4)]
+        await comment(replies[0], deleted=True)
+        nested = [await comment(replies[0]) for _ in range(2)]
+
+        handler = PostHandler(pool)
+        page = await handler.get_comment_thread(post_id, limit=2, depth=2, replies=2)
+        first, second = page["comments"]
+        assert [first.id, second.id] == roots[:2]
+        assert page["nextCursor"]
+        assert first.reply_count == 4 and [r.id for r in first.replies] == replies[:2]
+        assert first.replies[0].reply_count == 2 and first.replies[0].replies == []
+        assert first.next_cursor and second.next_cursor is None
+
+        rest = await handler.get_comment_thread(post_id, parent_id=roots[0], cursor=first.next_cursor)
+        assert [c.id for c in rest["comments"]] == replies[2:]
+        assert rest["nextCursor"] is None
+        last = await handler.get_comment_thread(post_id, cursor=page["nextCursor"])
+        assert [c.id for c in last["comments"]] == roots[2:]
+
+        deep = await handler.get_comment_thread(post_id, limit=1, depth=3)
+        assert [c.id for c in deep["comments"][0].replies[0].replies] == nested
+
+        assert [c.id for c in await handler.get_comments(post_id, roots[0], limit=2, cursor=first.next_cursor)] == replies[2:]
+        with pytest.raises(ValueError):
+            await handler.get_comment_thread(post_id, cursor="not-a-cursor")
+    finally:
+        await pool.execute("DELETE FROM post_comments WHERE post_id = $1", post_id)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_view_buffer_flushes_counters_and_unique_viewers():
+    from pathlib import Path
+    from src.utils.view_buffer import ViewBuffer
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    post_id, missing_id = uuid.uuid4(), uuid.uuid4()
+    try:
+        await pool.execute((Path(__file__).parent.parent / "migrations" / "003_post_view_stats.sql").read_text())
+        await pool.execute("INSERT INTO posts (id, user_id, caption) VALUES ($1, $2, 'viewed')", post_id, uuid.uuid4())
+
+        buffer = ViewBuffer()
+        viewers = [uuid.UUID(int=i) for i in range(1, 31)]
+        for viewer in viewers:
+            buffer.record([post_id, missing_id], viewer)
+        # A viewer counts once per post per flush window
+        assert buffer.record([post_id], viewers[0]) == 0
+        assert buffer.pending_views(post_id) == 30
+        assert await buffer.flush(pool) == 2
+        assert buffer.pending_views(post_id) == 0
+
+        for viewer in viewers[:10]:
+            buffer.record([post_id], viewer)
+        buffer.record([post_id], uuid.UUID(int=31))
+        await buffer.flush(pool)
+
+        row = await pool.fetchrow("SELECT view_count, unique_viewers FROM post_view_stats WHERE post_id = $1", post_id)
+        assert row["view_count"] == 41
+        assert abs(row["unique_viewers"] - 31) <= 1
+        assert await pool.fetchval("SELECT count(*) FROM post_view_stats WHERE post_id = $1", missing_id) == 0
+    finally:
+        await pool.execute("DELETE FROM post_view_stats WHERE post_id = $1", post_id)
+        await pool.execute("DELETE FROM posts WHERE id = $1", post_id)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_user_posts_and_search_end_on_the_last_full_page():
+    from src.utils.post_handler import PostHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    handler = PostHandler(pool)
+    author, marker = uuid.uuid4(), uuid.uuid4().hex
+    try:
+        await pool.executemany(
+            "INSERT INTO posts (id, user_id, caption) VALUES ($1, $2, $3)",
+            [(uuid.uuid4(), author, f"{marker} {i}") for i in range(3)],
+        )
+        assert (await handler.get_user_posts(author, limit=3))["nextCursor"] is None
+        first = await handler.search_posts(marker, limit=2)
+        assert len(first["posts"]) == 2 and first["nextCursor"]
+        last = await handler.search_posts(marker, limit=2, cursor=first["nextCursor"])
+        assert len(last["posts"]) == 1 and last["nextCursor"] is None
+    finally:
+        await pool.execute("DELETE FROM posts WHERE user_id = $1", author)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_keyset_pages_do_not_skip_or_repeat_under_concurrent_inserts():
+    import asyncio
+    from src.utils.post_handler import PostHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=2, max_size=4, init=init_connection)
+    author = uuid.uuid4()
+    base = await pool.fetchval("SELECT date_trunc('second', now())")
+    try:
+        # Several posts share a timestamp so pages must break ties on id
+        original = [uuid.uuid4() for _ in range(30)]
+        await pool.executemany(
+            "INSERT INTO posts (id, user_id, caption, created_at) VALUES ($1, $2, 'p', $3)",
+            [(post_id, author, base - datetime.timedelta(seconds=i // 4)) for i, post_id in enumerate(original)],
+        )
+        await pool.executemany(
+            "INSERT INTO post_likes (user_id, post_id) VALUES ($1, $2)",
+            [(uuid.uuid4(), post_id) for post_id in original[::3]],
+        )
+        comment_ids = [uuid.uuid4() for _ in range(30)]
+        await pool.executemany(
+            "INSERT INTO post_comments (id, post_id, user_id, content, created_at) VALUES ($1, $2, $2, 'c', $3)",
+            [(comment_id, original[0], base + datetime.timedelta(seconds=i // 4)) for i, comment_id in enumerate(comment_ids)],
+        )
+
+        async def insert_while_paging(stop: asyncio.Event):
+            i = 0
+            while not stop.is_set():
+                # New rows land at the head, inside already-read tied groups and at the tail
+                created_at = base + datetime.timedelta(seconds=(i % 3) - 3)
+                await pool.execute(
+                    "INSERT INTO posts (id, user_id, caption, created_at) VALUES ($1, $2, 'new', $3)",
+                    uuid.uuid4(), author, created_at,
+                )
+                await pool.execute(
+                    "INSERT INTO post_comments (id, post_id, user_id, content, created_at) VALUES ($1, $2, $2, 'new', $3)",
+                    uuid.uuid4(), original[0], base + datetime.timedelta(seconds=(i % 3) * 4),
+                )
+                i += 1
+                await asyncio.sleep(0)
+
+        async def collect(fetch_page):
+            seen, cursor = [], None
+            while True:
+                items, cursor = await fetch_page(cursor)
+                seen += items
+                if not cursor:
+                    return seen
+
+        handler = PostHandler(pool)
+
+        async def feed_page(cursor):
+            page = await handler.get_feed(limit=4, cursor=cursor)
+            return [p.id for p in page["posts"] if p.user_id == author], page["nextCursor"]
+
+        async def trending_page(cursor):
+            page = await handler.get_trending_posts(limit=4, cursor=cursor)
+            return [p.id for p in page["posts"] if p.user_id == author], page["nextCursor"]
+
+        async def comments_page(cursor):
+            from src.utils.cursor import page_cursor
+            comments = await handler.get_comments(original[0], None, 4, cursor)
+            return [c.id for c in comments], page_cursor(comments, 4, "asc")
+
+        for fetch_page, expected in ((feed_page, original), (trending_page, original), (comments_page, comment_ids)):
+            stop = asyncio.Event()
+            writer = asyncio.create_task(insert_while_paging(stop))
+            try:
+                seen = await collect(fetch_page)
+            finally:
+                stop.set()
+                await writer
+            assert len(seen) == len(set(seen)), "a row was returned twice"
+            assert set(expected) <= set(seen), "a row was skipped"
+    finally:
+        await pool.execute("DELETE FROM post_comments WHERE user_id = $1 OR post_id IN (SELECT id FROM posts WHERE user_id = $1)", author)
+        await pool.execute("DELETE FROM post_likes WHERE post_id IN (SELECT id FROM posts WHERE user_id = $1)", author)
+        await pool.execute("DELETE FROM posts WHERE user_id = $1", author)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_loaders_batch_lookups_by_id():
+    from src.utils.loaders import loader_scope, post_loader, user_loader, visionboard_loader
+    from src.utils.post_handler import PostHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=2, init=init_connection)
+    user_ids, post_ids, board_id = [], [uuid.uuid4() for _ in range(3)], None
+    try:
+        for i in range(2):
+            user_ids.append(await pool.fetchval(
+                "INSERT INTO users (name, email, password) VALUES ($1, $2, 'x') RETURNING id",
+                f"Author {i}", f"loader-{uuid.uuid4()}@example.com",
+            ))
+        board_id = await pool.fetchval(
+            "INSERT INTO visionboards (name, start_date, end_date, created_by) VALUES ('Board', now(), now() + interval '1 day', $1) RETURNING id",
+            user_ids[0],
+        )
+        await pool.executemany(
+            "INSERT INTO posts (id, user_id, caption) VALUES ($1, $2, 'p')",
+            [(post_id, user_ids[i % 2]) for i, post_id in enumerate(post_ids)],
+        )
+
+        with loader_scope():
+            users = user_loader(pool)
+            missing = uuid.uuid4()
+            cards = await users.load_many([user_ids[0], missing, user_ids[1], user_ids[0]])
+            assert [card.name if card else None for card in cards] == ["Author 0", None, "Author 1", "Author 0"]
+            assert users.batches == 1
+            assert user_loader(pool) is users
+
+            posts = await post_loader(pool).load_many(post_ids)
+            assert [post.user_id for post in posts] == [user_ids[0], user_ids[1], user_ids[0]]
+            assert (await visionboard_loader(pool).load(board_id)).created_by == user_ids[0]
+
+        page = await PostHandler(pool).get_user_posts(user_ids[0], limit=10)
+        assert {post.author_name for post in page["posts"]} == {"Author 0"}
+    finally:
+        await pool.execute("DELETE FROM posts WHERE id = ANY($1::uuid[])", post_ids)
+        if board_id:
+            await pool.execute("DELETE FROM visionboards WHERE id = $1", board_id)
+        await pool.execute("DELETE FROM users WHERE id = ANY($1::uuid[])", user_ids)
+        await pool.close()
+
+
+class CountingPool:
+    """Pool wrapper counting connections taken from the pool"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        return self.pool.acquire()
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_nested_handler_calls_share_one_connection_under_pool_pressure():
+    import asyncio
+    from src.models.visionboard import VisionBoardCreate
+    from src.utils.visionboard_handler import VisionBoardHandler
+
+    # Every request is in flight at once against a pool far smaller than the burst
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=2, max_size=2, init=init_connection)
+    counting = CountingPool(pool)
+    handler = VisionBoardHandler(counting)
+    user_id = await pool.fetchval(
+        "INSERT INTO users (name, email, password) VALUES ('Owner', $1, 'x') RETURNING id",
+        f"uow-{uuid.uuid4()}@example.com",
+    )
+    requests = 20
+    try:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        board = VisionBoardCreate(name="Burst", start_date=now, end_date=now + datetime.timedelta(days=1))
+        boards = await asyncio.wait_for(
+            asyncio.gather(*(handler.create_visionboard(board, user_id) for _ in range(requests))), timeout=10
+        )
+        assert counting.acquired == requests
+
+        notifications = await pool.fetch(
+            "SELECT id FROM notifications WHERE receiver_id = $1 AND object_id = ANY($2::uuid[])",
+            user_id, [b.id for b in boards],
+        )
+        assert len(notifications) == requests
+
+        counting.acquired = 0
+        await asyncio.wait_for(
+            asyncio.gather(*(handler.respond_to_notification(n["id"], user_id, "ok") for n in notifications)), timeout=10
+        )
+        assert counting.acquired == requests
+        assert await pool.fetchval(
+            "SELECT count(*) FROM notifications WHERE receiver_id = $1 AND event_type = 'response'", user_id
+        ) == requests
+    finally:
+        await pool.execute("DELETE FROM notifications WHERE receiver_id = $1 OR sender_id = $1", user_id)
+        await pool.execute("DELETE FROM visionboards WHERE created_by = $1", user_id)
+        await pool.execute("DELETE FROM users WHERE id = $1", user_id)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_loader_batches_use_the_callers_connection_or_acquire_their_own():
+    import asyncio
+    from src.models.visionboard import VisionBoardUpdate
+    from src.utils.loaders import loader_scope, user_loader
+    from src.utils.visionboard_handler import VisionBoardHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    counting = CountingPool(pool)
+    user_id = await pool.fetchval(
+        "INSERT INTO users (name, email, password) VALUES ('Loader', $1, 'x') RETURNING id",
+        f"loader-{uuid.uuid4()}@example.com",
+    )
+    board_id = await pool.fetchval(
+        "INSERT INTO visionboards (name, start_date, end_date, created_by) VALUES ('Held', now(), now(), $1) RETURNING id",
+        user_id,
+    )
+    try:
+        # The only connection is held by the update, so a batch taking another one would wait forever
+        board = await asyncio.wait_for(VisionBoardHandler(counting).update_visionboard(board_id, VisionBoardUpdate()), timeout=5)
+        assert board.id == board_id and counting.acquired == 1
+
+        with loader_scope():
+            assert (await user_loader(counting).load(user_id)).name == "Loader"
+        assert counting.acquired == 2
+    finally:
+        await pool.execute("DELETE FROM visionboards WHERE id = $1", board_id)
+        await pool.execute("DELETE FROM users WHERE id = $1", user_id)
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_instrumented_pool_is_warm_and_reports_telemetry():
+    import asyncio
+    from src.utils.db import PoolSettings, create_pool
+
+    settings = PoolSettings(min_size=2, max_size=2, acquire_timeout=0.05)
+    pool = await create_pool(TEST_DATABASE_URL, settings)
+    try:
+        assert pool.get_size() == 2
+        assert all(count >= 1 for count in pool.telemetry.queries.values())
+
+        await pool.fetchval("SELECT 1")
+        async with pool.acquire() as first, pool.acquire() as second:
+            assert pool.stats()["in_use"] == 2 and pool.stats()["idle"] == 0
+            with pytest.raises(asyncio.TimeoutError):
+                async with pool.acquire():
+                    pass
+            await first.fetchval("SELECT 1")
+            await second.fetchval("SELECT 1")
+            pids = sorted(c.get_server_pid() for c in (first, second))
+
+        stats = pool.stats()
+        assert stats["in_use"] == 0 and stats["timeouts"] == 1
+        assert stats["acquires"] == 5  # two warm-up pings, fetchval and the two held connections
+        assert stats["wait_seconds"]["buckets"]["+Inf"] == stats["acquires"]
+        assert sorted(stats["queries_per_connection"]) == pids
+        assert sum(stats["queries_per_connection"].values()) >= 5
+    finally:
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_statement_modes_and_caching():
+    from src.utils.db import PoolSettings, create_pool, statement_cache_size
+
+    assert PoolSettings().statement_mode == "transaction"
+    assert statement_cache_size("session", 100) == 100 and statement_cache_size("transaction", 100) == 0
+    with pytest.raises(ValueError):
+        statement_cache_size("auto", 100)
+
+    for mode, prepared in (("direct", True), ("transaction", False)):
+        pool = await create_pool(TEST_DATABASE_URL, PoolSettings(min_size=1, max_size=1, statement_mode=mode))
+        try:
+            assert pool.stats()["statement_mode"] == mode
+            async with pool.acquire() as conn:
+                for _ in range(3):
+                    await conn.fetchval("SELECT count(*) FROM posts WHERE id = $1", uuid.uuid4())
+                named = await conn.fetchval(
+                    "SELECT count(*) FROM pg_prepared_statements WHERE statement LIKE 'SELECT count(*) FROM posts%'"
+                )
+            assert (named == 1) is prepared
+        finally:
+            await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_fetch_batch_runs_queries_in_one_statement():
+    from src.utils.db import PoolSettings, create_pool, fetch_batch
+
+    pool = await create_pool(TEST_DATABASE_URL, PoolSettings(min_size=1, max_size=1))
+    try:
+        async with pool.acquire() as conn:
+            statements = []
+            conn.add_query_logger(lambda query: statements.append(query.query))
+            ids, empty, counted = await fetch_batch(
+                conn,
+                ("SELECT i AS n, $1::text AS label FROM generate_series(1, $2) i ORDER BY i DESC", "x", 3),
+                ("SELECT 1 AS n WHERE $1", False),
+                ("SELECT COUNT(*) FROM posts WHERE id = $1", uuid.uuid4()),
+            )
+        assert ids == [{"n": 3, "label": "x"}, {"n": 2, "label": "x"}, {"n": 1, "label": "x"}]
+        assert empty == [] and counted == [{"count": 0}]
+        assert len([query for query in statements if "generate_series" in query]) == 1
+    finally:
+        await pool.close()
+
+
+class FailingReplica:
+    def __init__(self, error):
+        self.error = error
+
+    def acquire(self):
+        raise self.error
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_read_only_methods_use_replicas_with_stickiness_and_fallback():
+    import asyncio
+    from src.utils import replicas
+    from src.utils.post_handler import PostHandler
+
+    # Stand-in replica: a schema whose posts table never receives the primary's writes
+    schema = f"replica_{uuid.uuid4().hex[:8]}"
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=2, init=init_connection)
+    await pool.execute(f"CREATE SCHEMA {schema}; CREATE TABLE {schema}.posts (LIKE public.posts INCLUDING DEFAULTS)")
+    replica = await asyncpg.create_pool(
+        TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection,
+        server_settings={"search_path": f"{schema},public"},
+    )
+    # Nothing listens on port 1, so its connections are refused
+    unreachable = await asyncpg.create_pool("postgresql://postgres@127.0.0.1:1/postgres", min_size=0)
+    router = replicas.router
+    router.configure(pool, [replica])
+    handler = PostHandler(pool)
+    user_id = uuid.uuid4()
+    actor = replicas._actor.set(user_id)
+    try:
+        await pool.execute("INSERT INTO posts (id, user_id, caption) VALUES ($1, $2, 'Fresh')", uuid.uuid4(), user_id)
+
+        assert (await handler.get_user_posts(user_id))["posts"] == []
+        assert router.stats()["replica_reads"] == 1
+
+        router.note_write()
+        assert [p.caption for p in (await handler.get_user_posts(user_id))["posts"]] == ["Fresh"]
+        replicas._actor.reset(actor)
+        actor = None
+        assert (await handler.get_user_posts(user_id))["posts"] == []
+
+        # A replica that times out is busy and one raising InterfaceError is misused: neither is down
+        for error in (asyncio.TimeoutError(), asyncpg.InterfaceError("another operation is in progress")):
+            router.replicas = [FailingReplica(error)]
+            with pytest.raises(type(error)):
+                await handler.get_user_posts(user_id)
+        stats = router.stats()
+        assert stats["fallbacks"] == 0 and stats["healthy"] == 1
+
+        router.replicas = [unreachable]
+        assert [p.caption for p in (await handler.get_user_posts(user_id))["posts"]] == ["Fresh"]
+        stats = router.stats()
+        assert stats["fallbacks"] == 1 and stats["healthy"] == 0
+        assert (await handler.get_feed(limit=1))["posts"]
+        assert router.stats()["fallbacks"] == 1
+    finally:
+        if actor is not None:
+            replicas._actor.reset(actor)
+        router.configure(None, [])
+        await pool.execute("DELETE FROM posts WHERE user_id = $1", user_id)
+        await pool.execute(f"DROP SCHEMA {schema} CASCADE")
+        await replica.close()
+        await unreachable.close()
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_group_messages_keep_the_sender_on_the_primary():
+    from src.utils import replicas
+    from src.utils.visionboard_handler import VisionBoardHandler
+
+    pool = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=2, init=init_connection)
+    replica = await asyncpg.create_pool(TEST_DATABASE_URL, min_size=1, max_size=1, init=init_connection)
+    router = replicas.router
+    router.configure(pool, [replica])
+    user_id = await pool.fetchval(
+        "INSERT INTO users (name, email, password) VALUES ('Sender', $1, 'x') RETURNING id",
+        f"chat-{uuid.uuid4()}@example.com",
+    )
+    try:
+        board_id = await pool.fetchval(
+            "INSERT INTO visionboards (name, start_date, end_date, created_by) VALUES ('Board', now(), now() + interval '1 day', $1) RETURNING id",
+            user_id,
+        )
+        # As the websocket chat sends it: no request actor, and the sender id as a string
+        message = await VisionBoardHandler(pool).send_group_message(board_id, str(user_id), "Hi")
+        assert message.message == "Hi"
+        assert router.is_sticky(user_id)
+    finally:
+        router.configure(None, [])
+        await pool.execute("DELETE FROM visionboards WHERE created_by = $1", user_id)
+        await pool.execute("DELETE FROM users WHERE id = $1", user_id)
+        await replica.close()
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_queries_stop_when_the_request_deadline_runs_out():
+    from src.utils import deadline
+    from src.utils.db import PoolSettings, create_pool
+
+    pool = await create_pool(TEST_DATABASE_URL, PoolSettings(min_size=1, max_size=1, statement_mode="direct"))
+    budget = deadline.Deadline(0.2)
+    token = deadline._current.set(budget)
+    try:
+        with pytest.raises(deadline.DeadlineExceeded) as raised:
+            async with pool.acquire() as conn:
+                await conn.execute("SELECT pg_sleep(5)")
+        assert raised.value.dependency == "db"
+        assert budget.spent["db"] < 1
+    finally:
+        deadline._current.reset(token)
+    try:
+        # The statement was cancelled on the server and the connection went back usable
+        assert await pool.fetchval("SELECT 1") == 1
+        assert await pool.fetchval(
+            "SELECT count(*) FROM pg_stat_activity WHERE query = 'SELECT pg_sleep(5)' AND state = 'active'"
+        ) == 0
+        assert pool.stats()["in_use"] == 0
+    finally:
+        await pool.close()
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_queries_become_spans_of_the_current_trace(monkeypatch):
+    import asyncio
+    from src.utils import tracing
+    from src.utils.db import PoolSettings, create_pool
+
+    memory = tracing.InMemoryExporter()
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer(memory))
+    pool = await create_pool(TEST_DATABASE_URL, PoolSettings(min_size=1, max_size=1))
+    root = tracing.tracer.root("GET /posts/feed")
+    token = tracing._current.set(root)
+    try:
+        async with pool.acquire() as conn:
+            await conn.fetchval("SELECT count(*) FROM generate_series(1, $1) WHERE 7 > 3", 10)
+        # Query loggers run on the next loop iteration
+        await asyncio.sleep(0)
+    finally:
+        tracing._current.reset(token)
+        await pool.close()
+
+    spans = memory.spans()
+    (query,) = [s for s in spans if "generate_series" in s.attributes.get("db.statement", "")]
+    assert query.name == "SELECT"
+    assert query.parent_id == root.span_id and query.trace_id == root.trace_id
+    assert query.attributes == {
+        "db.system": "postgresql",
+        "db.statement": "SELECT count(*) FROM generate_series(?, $1) WHERE ? > ?",
+    }
+    assert [s.parent_id for s in spans if s.name == "db.pool.acquire"] == [root.span_id]
+
+
+@requires_database
+@pytest.mark.asyncio
+async def test_slow_queries_get_their_plan_captured(monkeypatch, tmp_path):
+    import asyncio
+    from src.utils import db
+    from src.utils.query_log import QueryLog
+
+    log = QueryLog(threshold=0.05, explain_rate=1.0, explain_file=str(tmp_path / "explain.log"))
+    monkeypatch.setattr(db, "query_log", log)
+    pool = await db.create_pool(TEST_DATABASE_URL, db.PoolSettings(min_size=1, max_size=2))
+    try:
+        await pool.fetchval("SELECT count(*) FROM pg_sleep(0.1), generate_series(1, $1)", 3)
+        for _ in range(100):
+            if log.plans:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await pool.close()
+
+    (slow,) = log.slow
+    assert slow["statement"] == "SELECT count(*) FROM pg_sleep(?), generate_series(?, $1)"
+    assert slow["params"] == ["int"]
+    (plan,) = log.plans
+    assert "actual time=" in plan["plan"]
+    assert slow["statement"] in (tmp_path / "explain.log").read_text()
+    assert [s["statement"] for s in log.top()][0] == slow["statement"]
@@ -0,0 +1,119 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.utils import deadline
+from src.utils.deadline import Deadline, DeadlineExceeded, DeadlineMiddleware, DeadlinePolicy, dependency
+
+
+@pytest.mark.asyncio
+async def test_dependency_blocks_are_bounded_and_charged():
+    async with dependency("redis"):
+        pass  # no request: unbounded
+
+    budget = Deadline(0.05)
+    token = deadline._current.set(budget)
+    try:
+        async with dependency("db"):
+            await asyncio.sleep(0.01)
+        with pytest.raises(DeadlineExceeded) as raised:
+            async with dependency("redis"):
+                await asyncio.sleep(1)
+        assert raised.value.dependency == "redis"
+        with pytest.raises(DeadlineExceeded):
+            async with dependency("db"):
+                pass
+    finally:
+        deadline._current.reset(token)
+    assert budget.exhausted_by == "redis"
+    assert budget.spent["db"] >= 0.01 and budget.spent["redis"] >= 0.03
+    assert budget.inflight == []
+
+
+def test_route_budgets_use_the_longest_prefix(monkeypatch):
+    monkeypatch.setenv("REQUEST_DEADLINE", "7")
+    monkeypatch.setenv("ROUTE_DEADLINES", "/posts=5, /posts/feed=2,/otp=0")
+    policy = DeadlinePolicy.from_env()
+    assert policy.budget_for("/posts/feed") == ("/posts/feed", 2)
+    assert policy.budget_for("/posts/123") == ("/posts", 5)
+    assert policy.budget_for("/otp/send") == ("/otp", 0)
+    assert policy.budget_for("/users") == ("", 7)
+    assert policy.budget_for("/posts/batch") == ("/posts/batch", 120)
+
+    monkeypatch.setenv("ROUTE_DEADLINES", "/posts/batch=0")
+    assert DeadlinePolicy.from_env().budget_for("/posts/batch") == ("/posts/batch", 0)
+
+
+def test_requests_out_of_budget_answer_503_naming_the_dependency():
+    app = FastAPI()
+
+    @app.get("/fast")
+    async def fast():
+        async with dependency("db"):
+            pass
+        return {"ok": True}
+
+    @app.get("/slow")
+    async def slow():
+        async with dependency("supabase"):
+            await asyncio.sleep(1)
+
+    @app.get("/swallowed")
+    async def swallowed():
+        try:
+            async with dependency("redis"):
+                await asyncio.sleep(1)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    app.add_middleware(DeadlineMiddleware, policy=DeadlinePolicy(0.05, {"/fast": 5}))
+    client = TestClient(app)
+    before = deadline.stats.snapshot()
+
+    assert client.get("/fast").json() == {"ok": True}
+
+    response = client.get("/slow")
+    assert response.status_code == 503
+    assert response.json()["dependency"] == "supabase"
+
+    response = client.get("/swallowed")
+    assert response.status_code == 503
+    assert response.headers["x-deadline-exceeded"] == "redis"
+
+    after = deadline.stats.snapshot()
+    assert after["requests"] == before["requests"] + 3
+    assert after["exceeded"]["supabase"] == before["exceeded"].get("supabase", 0) + 1
+    assert after["exceeded"]["redis"] == before["exceeded"].get("redis", 0) + 1
+
+
+@pytest.mark.asyncio
+async def test_httpx_requests_get_the_remaining_budget_as_timeout():
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions.get("timeout"))
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        deadline.install_httpx_hooks(client, "supabase")
+        await client.get("https://example.com/")
+        budget = Deadline(2)
+        token = deadline._current.set(budget)
+        try:
+            await client.get("https://example.com/")
+            # A failed request is finished too, so it is not blamed for a later exhaustion
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://example.com/down")
+            assert budget.inflight == []
+            budget.expires = 0
+            assert budget.exhaust().dependency == deadline.APP
+        finally:
+            deadline._current.reset(token)
+
+    assert 0 < seen[1]["read"] <= 2 and seen[1]["connect"] == seen[1]["read"]
+    assert "supabase" in budget.spent and budget.inflight == []
@@ -0,0 +1,32 @@
+import uuid
+
+import pytest
+
+from src.utils.hyperloglog import HyperLogLog
+
+
+@pytest.mark.parametrize("n", [1, 50, 1000, 50000])
+def test_estimate_within_error(n):
+    sketch = HyperLogLog()
+    for _ in range(2):
+        for i in range(n):
+            sketch.add(str(i).encode())
+    assert abs(sketch.count() - n) <= max(1, 0.05 * n)
+
+
+def test_merge_is_union_and_round_trips():
+    a, b = HyperLogLog(), HyperLogLog()
+    ids = [uuid.uuid4().bytes for _ in range(3000)]
+    for key in ids[:2000]:
+        a.add(key)
+    for key in ids[1000:]:
+        b.add(key)
+    a.merge(b)
+    assert abs(a.count() - 3000) <= 150
+
+    restored = HyperLogLog(registers=a.to_bytes())
+    assert restored.count() == a.count()
+    with pytest.raises(ValueError):
+        HyperLogLog(registers=b"\x00" * 10)
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(precision=10))
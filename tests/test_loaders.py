@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from src.utils.loaders import DataLoader, get_loader, loader_scope
+
+
+class Source:
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def __call__(self, keys):
+        self.batches.append(sorted(keys))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("down")
+        return {key: key * 10 for key in keys if key >= 0}
+
+
+@pytest.mark.asyncio
+async def test_loads_in_one_tick_share_one_batch_and_are_cached():
+    source = Source()
+    loader = DataLoader(source)
+    assert await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(-1)) == [10, 20, 10, None]
+    assert source.batches == [[-1, 1, 2]]
+
+    assert await loader.load_many([2, 3]) == [20, 30]
+    assert source.batches == [[-1, 1, 2], [3]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_reach_every_caller_and_are_retried():
+    source = Source(fail=True)
+    loader = DataLoader(source)
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    source.fail = False
+    assert await loader.load(1) == 10
+    assert len(source.batches) == 2
+
+
+@pytest.mark.asyncio
+async def test_scope_shares_loaders_until_exit():
+    source = Source()
+    assert get_loader("numbers", source) is not get_loader("numbers", source)
+    with loader_scope():
+        await get_loader("numbers", source).load(1)
+        with loader_scope():
+            assert await get_loader("numbers", source).load(1) == 10
+        assert len(source.batches) == 1
+    await get_loader("numbers", source).load(1)
+    assert len(source.batches) == 2
+
+
+@pytest.mark.asyncio
+async def test_middleware_scopes_http_requests_but_not_websocket_connections():
+    from src.utils import loaders
+
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen[scope["type"]] = loaders._scope.get() is not None
+
+    middleware = loaders.LoaderScopeMiddleware(app)
+    await middleware({"type": "http"}, None, None)
+    await middleware({"type": "websocket"}, None, None)
+    assert seen == {"http": True, "websocket": False}
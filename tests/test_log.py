@@ -0,0 +1,117 @@
+import logging
+import queue
+import time
+
+import pytest
+
+from src.utils.log import (
+    DeferredQueueHandler,
+    RingBuffer,
+    configure_logging,
+    get_logger,
+    module_levels,
+    parse_levels,
+)
+
+
+def wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "log record was not written"
+        time.sleep(0.005)
+
+
+def test_ring_buffer_keeps_the_most_recent_items_in_order():
+    ring = RingBuffer(3)
+    assert ring.snapshot() == []
+    for item in range(5):
+        ring.append(item)
+    assert ring.snapshot() == [2, 3, 4]
+
+
+def test_get_logger_is_cached_and_adds_no_handlers():
+    first = get_logger("tests.log.cached")
+    assert get_logger("tests.log.cached") is first
+    assert first.logger.handlers == []
+    assert sum(isinstance(h, DeferredQueueHandler) for h in logging.getLogger().handlers) == 1
+
+
+def test_recent_logs_come_from_the_writer_thread():
+    logger = get_logger("tests.log.recent")
+    logger.info("saved %d rows for %s", 3, "alice")
+    wait_for(lambda: list(logger.recent_logs))
+    (record,) = logger.recent_logs
+    assert record.name == "tests.log.recent"
+    assert record.levelname == "INFO"
+    assert record.msg == "saved 3 rows for alice"
+    assert record.time.tzinfo is not None
+
+
+def test_per_module_levels():
+    assert parse_levels("src.routes.ws_chat=debug, httpx=WARNING,") == {
+        "src.routes.ws_chat": logging.DEBUG,
+        "httpx": logging.WARNING,
+    }
+    with pytest.raises(ValueError):
+        parse_levels("httpx")
+
+    try:
+        configure_logging("tests.log.quiet=ERROR")
+        quiet = get_logger("tests.log.quiet")
+        assert quiet.logger.level == logging.ERROR
+        assert not quiet.logger.isEnabledFor(logging.WARNING)
+        assert logging.getLogger("tests.log.quiet.child").getEffectiveLevel() == logging.ERROR
+    finally:
+        module_levels.pop("tests.log.quiet", None)
+
+
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+
+def test_formatting_is_left_to_the_writer():
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    logger = logging.getLogger("tests.log.deferred")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = DeferredQueueHandler(records)
+    logger.addHandler(handler)
+    try:
+        logger.debug("value %s", Expensive())
+        logger.info("value %s", Expensive())
+    finally:
+        logger.removeHandler(handler)
+
+    assert Expensive.formatted == 0
+    record = records.get_nowait()
+    assert records.empty()
+    assert record.getMessage() == "value expensive"
+    assert Expensive.formatted == 1
+
+
+def test_mutable_args_and_tracebacks_are_captured_when_logged():
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    logger = logging.getLogger("tests.log.frozen")
+    logger.propagate = False
+    handler = DeferredQueueHandler(records)
+    logger.addHandler(handler)
+    tags = ["a"]
+    try:
+        logger.warning("tags %s", tags)
+        try:
+            raise KeyError("missing")
+        except KeyError:
+            logger.exception("lookup failed")
+    finally:
+        logger.removeHandler(handler)
+    tags.append("b")
+
+    record = records.get_nowait()
+    assert record.getMessage() == "tags ['a']" and record.args is None
+    record = records.get_nowait()
+    assert record.exc_info is None and "KeyError: 'missing'" in record.exc_text
+    assert "KeyError: 'missing'" in logging.Formatter().format(record)
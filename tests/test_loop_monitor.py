@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+
+from src.utils import metrics
+from src.utils.loop_monitor import LoopMonitor
+
+
+def parse_thumbnail_synchronously():
+    time.sleep(0.25)
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_measured_and_its_stack_captured():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    blocks_before = metrics.registry.get("event_loop_blocks_total").labels().value
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        parse_thumbnail_synchronously()
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert not stats["running"]
+    assert stats["blocks"] == 1 and stats["max_lag_ms"] >= 200
+    (site,) = stats["sites"]
+    assert site["site"].startswith("tests/test_loop_monitor.py:")
+    assert site["site"].endswith("in parse_thumbnail_synchronously")
+    assert site["count"] == 1 and site["max_ms"] >= 200
+    (capture,) = stats["captures"]
+    assert capture["blocked_ms"] == site["max_ms"]
+    assert any("time.sleep(0.25)" in line for line in capture["stack"])
+    assert metrics.registry.get("event_loop_blocks_total").labels().value == blocks_before + 1
+    assert "event_loop_lag_seconds_bucket" in metrics.registry.render()
+
+    monitor.reset()
+    assert monitor.stats()["sites"] == [] and monitor.stats()["blocks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_debug_mode_is_restored_on_stop():
+    loop = asyncio.get_running_loop()
+    debug, slow = loop.get_debug(), loop.slow_callback_duration
+    monitor = LoopMonitor(threshold=0.02, debug=True)
+    monitor.start()
+    assert loop.get_debug() and loop.slow_callback_duration == 0.02
+    await monitor.stop()
+    assert (loop.get_debug(), loop.slow_callback_duration) == (debug, slow)
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("LOOP_LAG_INTERVAL_MS", "250")
+    monkeypatch.setenv("LOOP_BLOCK_THRESHOLD_MS", "0")
+    monkeypatch.setenv("LOOP_DEBUG", "true")
+    monitor = LoopMonitor.from_env()
+    assert (monitor.interval, monitor.threshold, monitor.debug) == (0.25, 0.0, True)
@@ -0,0 +1,77 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+from src.models.notification import Notification
+from src.models.user import UserCard
+from src.models.visionboard import GenreAssignment, Invitation, InvitationStatus
+from src.utils import mapping
+
+
+def invitation_row(**overrides):
+    row = {
+        "id": uuid.uuid4(),
+        "receiver_id": uuid.uuid4(),
+        "sender_id": uuid.uuid4(),
+        "object_type": "genre",
+        "object_id": uuid.uuid4(),
+        "status": "pending",
+        "data": {"work_type": "Online"},
+        "created_at": datetime.datetime.now(datetime.timezone.utc),
+        "responded_at": None,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_fast_path_matches_validation():
+    rows = [invitation_row(), invitation_row(status="accepted"), invitation_row(data=None)]
+    built = mapping.from_rows(Invitation, rows)
+    assert [b.model_dump() for b in built] == [Invitation(**r).model_dump() for r in rows]
+    assert built[1].status is InvitationStatus.ACCEPTED
+
+
+def test_fast_path_converts_nested_and_numeric_columns():
+    user_rows = [
+        {"id": uuid.uuid4(), "name": name, "genres": ["photographer"], "location": {"latitude": 1, "longitude": 2}, "rating": Decimal("4.5")}
+        for name in ("First", "Second")
+    ]
+    second = mapping.from_rows(UserCard, user_rows)[1]
+    assert second.model_dump() == UserCard(**user_rows[1]).model_dump()
+    assert second.location.latitude == 1.0
+    assert isinstance(second.rating, float)
+
+
+def test_bad_row_after_first_still_raises_validation_error():
+    base = {
+        "genre_id": uuid.uuid4(), "user_id": uuid.uuid4(), "status": "Pending", "work_type": "Online",
+        "payment_type": "Unpaid", "payment_amount": None, "currency": None,
+        "invited_at": datetime.datetime.now(datetime.timezone.utc), "responded_at": None, "assigned_by": uuid.uuid4(),
+    }
+    mapping.from_row(GenreAssignment, {"id": uuid.uuid4(), **base})
+    with pytest.raises(ValidationError):
+        mapping.from_row(GenreAssignment, {"id": uuid.uuid4(), **base, "status": "Unknown"})
+
+
+def test_validate_all_rows_mode(monkeypatch):
+    monkeypatch.setattr(mapping, "VALIDATE_ALL_ROWS", True)
+    row = {
+        "id": uuid.uuid4(), "receiver_id": uuid.uuid4(), "sender_id": uuid.uuid4(), "object_type": "post",
+        "object_id": uuid.uuid4(), "event_type": "like", "status": "unread", "data": None, "message": None,
+        "created_at": datetime.datetime.now(datetime.timezone.utc), "updated_at": datetime.datetime.now(datetime.timezone.utc),
+    }
+    first, second = mapping.from_rows(Notification, [row, dict(row, id=str(uuid.uuid4()))])
+    assert isinstance(second.id, uuid.UUID)
+
+
+def test_container_columns_are_converted_even_if_first_row_is_empty():
+    rows = [
+        {"id": uuid.uuid4(), "name": "Empty", "genres": []},
+        {"id": uuid.uuid4(), "name": "Full", "genres": ["dancer"]},
+    ]
+    _, full = mapping.from_rows(UserCard, rows)
+    assert full.model_dump() == UserCard(**rows[1]).model_dump()
+    assert full.model_dump(mode="json")["genres"] == ["dancer"]
@@ -0,0 +1,88 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.utils.metrics import (
+    Collected,
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    instrumented,
+    observe_query,
+    query_latency,
+    request_latency,
+)
+
+
+def test_render_text_exposition_format():
+    registry = Registry()
+    hits = registry.register(Counter("hits_total", "Hits", ("route",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency", (), buckets=(0.1, 1.0)))
+    registry.register(Collected("open", "gauge", "Open things", ("kind",), lambda: [(('a"b',), 3)]))
+
+    hits.labels("/posts/{post_id}").inc()
+    hits.labels("/posts/{post_id}").inc(2)
+    for value in (0.05, 0.1, 0.5, 7.0):
+        latency.labels().observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP hits_total Hits",
+        "# TYPE hits_total counter",
+        'hits_total{route="/posts/{post_id}"} 3.0',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 7.65",
+        "latency_seconds_count 4",
+        "# HELP open Open things",
+        "# TYPE open gauge",
+        'open{kind="a\\"b"} 3',
+    ]
+
+
+def test_labels_must_match_label_names():
+    with pytest.raises(ValueError):
+        Counter("c_total", "C", ("a", "b")).labels("only-one")
+
+
+@pytest.mark.asyncio
+async def test_queries_are_attributed_to_the_outermost_handler_operation():
+    @instrumented("outer")
+    class Outer:
+        async def run(self):
+            observe_query(0.002)
+            await Inner().run()
+
+        async def _private(self):
+            pass
+
+    @instrumented("inner")
+    class Inner:
+        async def run(self):
+            observe_query(0.004)
+
+    before = query_latency.labels("outer.run").sum
+    await Outer().run()
+    assert query_latency.labels("outer.run").sum - before == pytest.approx(0.006)
+    assert query_latency.labels("inner.run").sum == 0
+    assert query_latency.labelnames == ("operation",)
+    assert not hasattr(Outer._private, "__wrapped__")
+
+
+def test_request_latency_uses_the_route_template():
+    app = FastAPI()
+
+    @app.get("/things/{thing_id}")
+    async def thing(thing_id: str):
+        return {"id": thing_id}
+
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+    child = request_latency.labels("GET", "/things/{thing_id}", 200)
+    before = sum(child.counts)
+    client.get("/things/1")
+    client.get("/things/2")
+    assert sum(child.counts) - before == 2
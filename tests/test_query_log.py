@@ -0,0 +1,71 @@
+import uuid
+
+from asyncpg.connection import LoggedQuery
+
+from src.utils import metrics
+from src.utils.query_log import OTHER, QueryLog, redact_args
+
+
+def logged(query: str, elapsed: float, args=(), exception=None) -> LoggedQuery:
+    return LoggedQuery(query=query, args=args, timeout=None, elapsed=elapsed, exception=exception,
+                       conn_addr=None, conn_params=None)
+
+
+def test_statements_are_ranked_by_total_time():
+    log = QueryLog(threshold=1.0)
+    for _ in range(10):
+        log.observe(logged("SELECT * FROM posts WHERE id = $1", 0.01))
+    log.observe(logged("SELECT  *  FROM users\n WHERE id = 'abc'", 0.05))
+    log.observe(logged("SELECT * FROM users WHERE id = 'xyz'", 0.03, exception=ValueError()))
+
+    by_total = log.top(order="total")
+    assert [s["statement"] for s in by_total] == ["SELECT * FROM posts WHERE id = $1", "SELECT * FROM users WHERE id = ?"]
+    assert by_total[0]["calls"] == 10 and by_total[0]["total_ms"] == 100.0
+    assert by_total[1] == {
+        "statement": "SELECT * FROM users WHERE id = ?",
+        "calls": 2,
+        "total_ms": 80.0,
+        "mean_ms": 40.0,
+        "max_ms": 50.0,
+        "slow": 0,
+        "errors": 1,
+        "operations": {"other": 2},
+    }
+    assert [s["calls"] for s in log.top(limit=1, order="mean")] == [2]
+    assert log.slow == type(log.slow)()
+
+
+def test_slow_queries_are_logged_with_redacted_params_and_operation():
+    log = QueryLog(threshold=0.1)
+    token = metrics._operation.set("post.get_feed")
+    try:
+        log.observe(logged("SELECT * FROM users WHERE email = $1 AND id = $2", 0.25, ("someone@example.com", uuid.uuid4())))
+    finally:
+        metrics._operation.reset(token)
+    (entry,) = log.slow
+    assert entry["operation"] == "post.get_feed"
+    assert entry["params"] == ["str[19]", "UUID"]
+    assert "someone" not in repr(entry)
+    assert entry["duration_ms"] == 250.0
+    assert log.top()[0]["operations"] == {"post.get_feed": 1} and log.top()[0]["slow"] == 1
+
+
+def test_distinct_statements_are_bounded():
+    log = QueryLog(max_statements=2)
+    for table in ("a", "b", "c", "d"):
+        log.observe(logged(f"SELECT * FROM {table}", 0.001))
+    assert sorted(s["statement"] for s in log.top()) == [OTHER, "SELECT * FROM a", "SELECT * FROM b"]
+    assert {s["statement"]: s["calls"] for s in log.top()}[OTHER] == 2
+
+
+def test_plans_are_sampled_at_most_once_per_interval():
+    log = QueryLog(explain_rate=1.0, explain_interval=60)
+    assert log._should_explain("SELECT ?")
+    assert not log._should_explain("SELECT ?")
+    assert log._should_explain("SELECT ? FROM t")
+    assert not QueryLog(explain_rate=0)._should_explain("SELECT ?")
+
+
+def test_redact_args():
+    assert redact_args(None) == []
+    assert redact_args(("secret", b"xy", [1, 2, 3], 5, None)) == ["str[6]", "bytes[2]", "list[3]", "int", "NoneType"]
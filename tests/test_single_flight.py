@@ -0,0 +1,78 @@
+import asyncio
+import inspect
+
+import pytest
+
+from src.utils.single_flight import SingleFlight, coalesce
+
+
+class Reader:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def read(self, item_id: int, limit: int = 10) -> dict:
+        self.calls += 1
+        await self.release.wait()
+        if item_id < 0:
+            raise ValueError("bad id")
+        return {"id": item_id, "limit": limit}
+
+
+class CoalescedReader(Reader):
+    @coalesce(ttl=0)
+    async def read(self, item_id: int, limit: int = 10) -> dict:
+        return await super().read(item_id, limit)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    reader = CoalescedReader()
+    tasks = [asyncio.create_task(reader.read(1)) for _ in range(5)]
+    tasks.append(asyncio.create_task(reader.read(item_id=1, limit=10)))
+    other = asyncio.create_task(reader.read(2))
+    await asyncio.sleep(0)
+    reader.release.set()
+    results = await asyncio.gather(*tasks)
+    assert all(result is results[0] for result in results)
+    assert (await other)["id"] == 2
+    assert reader.calls == 2
+    assert CoalescedReader.read.flight.shared >= 5
+
+    # Nothing is kept once the flight has landed when ttl is 0
+    await reader.read(1)
+    assert reader.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_failures_reach_every_caller_and_are_not_cached():
+    flight = SingleFlight("test", ttl=60)
+    reader = Reader()
+    tasks = [asyncio.create_task(flight.do(-1, lambda: reader.read(-1))) for _ in range(3)]
+    await asyncio.sleep(0)
+    reader.release.set()
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        assert isinstance(result, ValueError)
+    with pytest.raises(ValueError):
+        await flight.do(-1, lambda: reader.read(-1))
+    assert reader.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_micro_cache_and_cancelled_callers():
+    flight = SingleFlight("test", ttl=60)
+    reader = Reader()
+    first = asyncio.create_task(flight.do(1, lambda: reader.read(1)))
+    second = asyncio.create_task(flight.do(1, lambda: reader.read(1)))
+    await asyncio.sleep(0)
+    first.cancel()
+    reader.release.set()
+    assert (await second)["id"] == 1
+    assert (await flight.do(1, lambda: reader.read(1)))["id"] == 1
+    assert reader.calls == 1
+    assert flight.stats() == {"calls": 3, "executions": 1, "shared": 1, "cached": 1, "coalescing_ratio": 0.6667}
+
+
+def test_wrapped_method_keeps_its_signature():
+    assert inspect.signature(CoalescedReader.read) == inspect.signature(Reader.read)
+    assert CoalescedReader.read.__name__ == "read"
@@ -0,0 +1,168 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.utils import tracing
+from src.utils.tracing import (
+    FileExporter,
+    InMemoryExporter,
+    Span,
+    Tracer,
+    TracingMiddleware,
+    install_httpx_tracing,
+    instrument_redis,
+    normalize_sql,
+    parse_traceparent,
+    record_span,
+    span,
+)
+
+PARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    memory = InMemoryExporter()
+    monkeypatch.setattr(tracing, "tracer", Tracer(memory, sample_rate=1.0))
+    return memory
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(PARENT) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+    assert parse_traceparent(PARENT[:-2] + "00")[2] is False
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_normalize_sql():
+    query = """
+        SELECT p.id, t1.caption FROM posts p
+        WHERE p.status = 'public' AND p.id IN (1, 2, 3) AND p.user_id = $1
+        LIMIT 20 OFFSET $2
+    """
+    assert normalize_sql(query) == (
+        "SELECT p.id, t1.caption FROM posts p WHERE p.status = ? AND p.id IN (?) AND p.user_id = $1 LIMIT ? OFFSET $2"
+    )
+    assert normalize_sql("UPDATE users SET name = 'it''s'") == "UPDATE users SET name = ?"
+
+
+class FakeRedis:
+    async def execute_command(self, *args, **options):
+        return "OK"
+
+    def pipeline(self, transaction=True):
+        return FakePipeline()
+
+
+class FakePipeline:
+    def __init__(self):
+        self.command_stack = [(("SET", "a", 1), {}), (("PUBLISH", "c", "m"), {})]
+
+    async def execute(self):
+        return [True, 1]
+
+
+@pytest.mark.asyncio
+async def test_request_span_with_children_and_propagation(exporter):
+    redis_client = instrument_redis(FakeRedis())
+    outgoing = []
+
+    def upstream(request):
+        outgoing.append(request.headers.get("traceparent"))
+        return httpx.Response(200, json=[])
+
+    supabase = httpx.AsyncClient(transport=httpx.MockTransport(upstream), base_url="http://supabase.test")
+    install_httpx_tracing(supabase, "supabase")
+
+    app = FastAPI()
+
+    @app.get("/posts/{post_id}")
+    async def get_post(post_id: str):
+        record_span("db.pool.acquire", 0.002)
+        await redis_client.execute_command("GET", "cache:key")
+        await redis_client.pipeline().execute()
+        await supabase.get("/rest/v1/users", params={"email": "eq.someone@example.com"})
+        with span("hydrate", rows=3):
+            pass
+        return {"id": post_id}
+
+    app.add_middleware(TracingMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/posts/42", headers={"traceparent": PARENT})
+        assert response.status_code == 200
+
+    spans = {s.name: s for s in exporter.spans()}
+    root = spans["GET /posts/{post_id}"]
+    assert root.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert root.parent_id == "00f067aa0ba902b7"
+    assert root.attributes["http.route"] == "/posts/{post_id}"
+    assert root.attributes["http.response.status_code"] == 200
+
+    children = [spans[name] for name in ("db.pool.acquire", "redis GET", "redis PIPELINE", "supabase GET", "hydrate")]
+    assert all(child.parent_id == root.span_id and child.trace_id == root.trace_id for child in children)
+    assert spans["redis PIPELINE"].attributes["db.operation"] == "SET PUBLISH"
+    assert spans["supabase GET"].attributes["url.path"] == "/rest/v1/users"
+    assert spans["supabase GET"].attributes["http.response.status_code"] == 200
+    assert spans["hydrate"].attributes == {"rows": 3}
+    assert outgoing == [spans["supabase GET"].traceparent]
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_record_nothing(monkeypatch):
+    memory = InMemoryExporter()
+    monkeypatch.setattr(tracing, "tracer", Tracer(memory, sample_rate=0.0))
+    app = FastAPI()
+    inner_spans = []
+
+    @app.get("/boom")
+    async def boom():
+        with span("inner") as inner:
+            inner_spans.append(inner)
+        return {}
+
+    app.add_middleware(TracingMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/boom")
+        assert memory.spans() == [] and inner_spans == [None]
+        # A sampled caller still gets its trace continued
+        await client.get("/boom", headers={"traceparent": PARENT})
+    assert [s.name for s in memory.spans()] == ["inner", "GET /boom"]
+
+
+def test_failed_spans_carry_the_error(exporter):
+    root = Span("job", "4bf92f3577b34da6a3ce929d0e0e4736")
+    token = tracing._current.set(root)
+    try:
+        with pytest.raises(ValueError):
+            with span("step"):
+                raise ValueError("bad")
+    finally:
+        tracing._current.reset(token)
+    (step,) = exporter.spans()
+    assert step.status == tracing.STATUS_ERROR and "bad" in step.message
+
+
+def test_file_exporter_writes_otlp_json_lines(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    exporter = FileExporter(str(path))
+    tracer = Tracer(exporter)
+    exporter.start()
+    root = tracer.root("GET /health")
+    child = Span("SELECT", root.trace_id, root.span_id, tracing.CLIENT, {"db.statement": "SELECT ?", "rows": 1})
+    tracer.end(child)
+    tracer.end(root)
+    exporter.stop()
+
+    spans = [
+        s
+        for line in path.read_text().splitlines()
+        for s in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+    assert [s["name"] for s in spans] == ["SELECT", "GET /health"]
+    assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+    assert spans[0]["kind"] == tracing.CLIENT
+    assert {"key": "rows", "value": {"intValue": "1"}} in spans[0]["attributes"]
+    assert int(spans[1]["endTimeUnixNano"]) >= int(spans[1]["startTimeUnixNano"])
@@ -0,0 +1,33 @@
+import uuid
+
+import pytest
+
+from src.utils.view_buffer import ViewBuffer
+
+
+class DownPool:
+    def acquire(self):
+        raise ConnectionError("database is down")
+
+
+@pytest.mark.asyncio
+async def test_failed_flushes_keep_views_without_growing_past_the_cap():
+    buffer = ViewBuffer(max_posts=2)
+    viewer, other = uuid.uuid4(), uuid.uuid4()
+    posts = [uuid.uuid4() for _ in range(6)]
+    assert buffer.record(posts[:3], viewer) == 3
+
+    with pytest.raises(ConnectionError):
+        await buffer.flush(DownPool())
+    assert [buffer.pending_views(post_id) for post_id in posts[:3]] == [1, 1, 1]
+
+    # Resent impressions do not count again; new viewers and posts do, up to twice max_posts posts
+    assert buffer.record(posts, viewer) == 1
+    assert buffer.record(posts[:1], other) == 1
+    assert [buffer.pending_views(post_id) for post_id in posts] == [2, 1, 1, 1, 0, 0]
+    assert buffer.dropped_views == 2
+
+    with pytest.raises(ConnectionError):
+        await buffer.flush(DownPool())
+    assert [buffer.pending_views(post_id) for post_id in posts] == [2, 1, 1, 1, 0, 0]
+    assert buffer.dropped_views == 2
@@ -0,0 +1,66 @@
+import asyncio
+import uuid
+
+import pytest
+
+from src.utils.visionboard_cache import VisionBoardCache
+
+
+@pytest.mark.asyncio
+async def test_bump_invalidates_snapshots_and_etag():
+    cache = VisionBoardCache(max_entries=16, ttl=60)
+    board_id = uuid.uuid4()
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return {"name": f"v{len(loads)}"}
+
+    first = await cache.get_or_load(board_id, "visionboard", loader)
+    second = await cache.get_or_load(board_id, "visionboard", loader)
+    assert second.value == {"name": "v1"}
+    assert first.etag == second.etag == await cache.etag(board_id)
+    assert len(loads) == 1
+
+    await cache.bump(board_id)
+    third = await cache.get_or_load(board_id, "visionboard", loader)
+    assert third.value == {"name": "v2"}
+    assert third.etag != first.etag
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_and_ttl_expires():
+    cache = VisionBoardCache(max_entries=2, ttl=60)
+    boards = [uuid.uuid4() for _ in range(3)]
+
+    async def loader():
+        return object()
+
+    for board_id in boards:
+        await cache.get_or_load(board_id, "summary", loader)
+    assert cache.misses == 3
+    await cache.get_or_load(boards[0], "summary", loader)
+    assert cache.misses == 4  # evicted as least recently used
+
+    short_lived = VisionBoardCache(max_entries=2, ttl=0.001)
+    await short_lived.get_or_load(boards[0], "summary", loader)
+    await asyncio.sleep(0.01)
+    await short_lived.get_or_load(boards[0], "summary", loader)
+    assert short_lived.misses == 2
+
+    disabled = VisionBoardCache(max_entries=2, ttl=0)
+    snapshot = await disabled.get_or_load(boards[0], "summary", loader)
+    assert snapshot.etag is None
+
+
+@pytest.mark.asyncio
+async def test_versions_are_bounded():
+    cache = VisionBoardCache(max_entries=2, ttl=60)
+    boards = [uuid.uuid4() for _ in range(3)]
+    first = await cache.etag(boards[0])
+    for board_id in boards[1:]:
+        await cache.bump(board_id)
+    assert list(cache._versions) == boards[1:]
+    # An evicted board gets a fresh version, so its old ETags no longer match
+    assert await cache.etag(boards[0]) != first
+    assert len(cache._versions) == 2